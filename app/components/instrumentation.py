@@ -0,0 +1,138 @@
+import os
+import uuid
+from collections import deque
+from functools import wraps
+import streamlit as st
+from core import metrics
+from core.dataset import SchoolDataset
+
+# 缓存函数的数据集参数按 (dataset_id, version) 哈希，而不是逐条哈希记录内容
+DATASET_HASH_FUNCS = {SchoolDataset: lambda dataset: dataset.cache_key}
+
+# 侧边栏面板显示的最近运行次数
+HISTORY_SIZE = 20
+
+# 性能日志路径；只有设置了环境变量 TIAOJI_PERF_LOG 才写日志
+def get_log_path():
+    return os.environ.get("TIAOJI_PERF_LOG") or None
+
+# 替代 st.cache_data 的装饰器：缓存行为不变，额外记录每次调用的命中/未命中和耗时；
+# SchoolDataset 类型的参数自动使用 DATASET_HASH_FUNCS
+def cache_data(func=None, **cache_kwargs):
+    cache_kwargs["hash_funcs"] = {**DATASET_HASH_FUNCS, **cache_kwargs.get("hash_funcs", {})}
+
+    def decorator(func):
+        name = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+        # 只有缓存未命中时 Streamlit 才会执行函数体
+        @wraps(func)
+        def compute(*args, **kwargs):
+            metrics.record_cache(name, hit=False)
+            return func(*args, **kwargs)
+
+        cached_func = st.cache_data(**cache_kwargs)(compute)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            rerun = metrics.current()
+            if rerun is None:
+                return cached_func(*args, **kwargs)
+            misses = rerun.cache_misses(name)
+            with metrics.timer(name):
+                result = cached_func(*args, **kwargs)
+            if rerun.cache_misses(name) == misses:
+                rerun.record_cache(name, hit=True)
+            return result
+
+        wrapper.clear = cached_func.clear
+        return wrapper
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+# 开始统计本次运行；上一次运行被 st.rerun()/st.stop() 中断时先补记上一次
+def begin_rerun():
+    log_path = get_log_path()
+    if log_path:
+        metrics.add_sink(metrics.JsonlLog(log_path))
+
+    if "perf_session" not in st.session_state:
+        st.session_state.perf_session = uuid.uuid4().hex[:8]
+        st.session_state.perf_history = deque(maxlen=HISTORY_SIZE)
+
+    previous = st.session_state.get("perf_rerun")
+    if previous is not None and not previous.finished:
+        _finish(previous, "interrupted")
+
+    st.session_state.perf_rerun = metrics.start_rerun(session=st.session_state.perf_session)
+    return st.session_state.perf_rerun
+
+# 记录本次运行进入的页面分支
+def enter_page(page):
+    rerun = st.session_state.get("perf_rerun")
+    if rerun is not None:
+        rerun.enter_page(page)
+
+# 正常结束本次运行的统计
+def end_rerun():
+    rerun = st.session_state.get("perf_rerun")
+    if rerun is not None and not rerun.finished:
+        _finish(rerun, "ok")
+
+def _finish(rerun, status):
+    metrics.finish_rerun(rerun, status)
+    st.session_state.perf_history.append(rerun.to_dict())
+
+# 侧边栏性能面板（默认关闭），显示最近几次运行的耗时分布和缓存命中情况
+def display_panel():
+    if not st.sidebar.checkbox("显示性能面板", False, key="perf_panel"):
+        return
+
+    history = list(st.session_state.get("perf_history", ()))
+    with st.sidebar.expander(f"最近 {len(history)} 次运行", expanded=True):
+        if not history:
+            st.caption("暂无记录，下一次运行后显示")
+            return
+
+        st.dataframe(
+            [
+                {
+                    "时间": record["started_at"][11:23],
+                    "页面": record["page"],
+                    "总耗时(ms)": record["total_ms"],
+                    "状态": record["status"],
+                    "缓存命中": sum(stats["hits"] for stats in record["cache"].values()),
+                    "缓存未命中": sum(stats["misses"] for stats in record["cache"].values()),
+                }
+                for record in reversed(history)
+            ],
+            hide_index=True,
+        )
+
+        latest = history[-1]
+        st.markdown("**上一次运行耗时最多的步骤**")
+        st.dataframe(
+            sorted(
+                (
+                    {
+                        "步骤": name,
+                        "调用次数": timing["calls"],
+                        "耗时(ms)": timing["ms"],
+                        "命中/未命中": (
+                            f"{latest['cache'][name]['hits']}/{latest['cache'][name]['misses']}"
+                            if name in latest["cache"] else ""
+                        ),
+                    }
+                    for name, timing in latest["timers"].items()
+                ),
+                key=lambda row: row["耗时(ms)"],
+                reverse=True,
+            ),
+            hide_index=True,
+        )
+        if latest["counters"]:
+            st.markdown("**计数**")
+            st.json(latest["counters"])
+        if get_log_path():
+            st.caption(f"完整记录写入 {get_log_path()}")
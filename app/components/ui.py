@@ -1,7 +1,11 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
-from . import utils
+import plotly.io as pio
+from . import utils, instrumentation
+from core import aggregates, analytics, export, figure_cache, metrics
+from core.columnar import YEARS
 
 # 自定义CSS样式
 def load_css():
@@ -78,114 +82,211 @@ def load_css():
 def page_header(title):
     st.markdown(f'<h1 class="main-header">{title}</h1>', unsafe_allow_html=True)
 
-# 显示学校卡片
-@st.cache_data(ttl=300, show_spinner=False)
-def _prepare_school_card_data(school):
-    """准备学校卡片展示所需的数据"""
-    # 招生人数处理：可能是整数或字符串（如"2-4"）
-    recruitment_display = ""
-    recruitment_count = school['recruitment_count']
-    if isinstance(recruitment_count, int):
-        recruitment_display = f"👨‍🎓 **招生人数**: {recruitment_count}人"
-    else:
-        recruitment_display = f"👨‍🎓 **招生人数**: {recruitment_count}"
-    
-    # 分数数据
-    score_data = {
-        "年份": ["2024", "2023", "2022", "2021"],
-        "最高分": [
-            school["scores"]["2024"]["max"],
-            school["scores"]["2023"]["max"],
-            school["scores"]["2022"]["max"],
-            school["scores"]["2021"]["max"]
-        ],
-        "最低分": [
-            school["scores"]["2024"]["min"],
-            school["scores"]["2023"]["min"],
-            school["scores"]["2022"]["min"],
-            school["scores"]["2021"]["min"]
-        ]
-    }
-    
-    return {
-        "name": school['name'],
-        "address": school['address'],
-        "major": school.get('major', '未提供'),
-        "recruitment_display": recruitment_display,
-        "score_data": score_data,
-        "email": school['contact']['email'],
-        "phone": school['contact']['phone'],
-        "remark": school.get("remark", ""),
-        "id": school.get("id")
-    }
+# 招生人数处理：可能是整数或字符串（如"2-4"）
+def _recruitment_display(school):
+    if isinstance(school.recruitment_count, int):
+        return f"👨‍🎓 **招生人数**: {school.recruitment_count}人"
+    return f"👨‍🎓 **招生人数**: {school.recruitment_count}"
 
+# 卡片中的历年分数线表
+def _score_frame(school):
+    return pd.DataFrame({
+        "年份": list(YEARS),
+        "最高分": school.scores[0::2].tolist(),
+        "最低分": school.scores[1::2].tolist()
+    })
+
+# 卡片正文：名称、地址、专业、招生人数、分数线、联系方式和备注，直接读取记录字段
+def _school_card_body(school):
+    st.markdown(f"### {school.name}")
+    st.markdown(f"📍 **地址**: {school.address}")
+    st.markdown(f"📚 **调剂专业**: {'未提供' if school.major is None else school.major}")
+    st.markdown(_recruitment_display(school))
+    
+    st.markdown("#### 历年分数线")
+    st.dataframe(_score_frame(school), hide_index=True)
+    
+    st.markdown("#### 联系方式")
+    st.markdown(f"📧 **邮箱**: {school.email}")
+    st.markdown(f"📞 **电话**: {school.phone}")
+    
+    # 显示备注字段，如果有备注内容则显示
+    if school.remark:
+        st.markdown(f"📝 **备注**: {school.remark}")
+
+# 显示学校卡片
+@metrics.timed()
 def display_school_card(school, col):
     with col:
-        # 准备数据
-        card_data = _prepare_school_card_data(school)
-        
-        # 显示卡片
         st.markdown('<div class="card">', unsafe_allow_html=True)
-        st.markdown(f"### {card_data['name']}")
-        st.markdown(f"📍 **地址**: {card_data['address']}")
-        st.markdown(f"📚 **调剂专业**: {card_data['major']}")
-        st.markdown(card_data['recruitment_display'])
-        
-        st.markdown("#### 历年分数线")
-        df = pd.DataFrame(card_data['score_data'])
-        st.dataframe(df, hide_index=True)
-        
-        st.markdown("#### 联系方式")
-        st.markdown(f"📧 **邮箱**: {card_data['email']}")
-        st.markdown(f"📞 **电话**: {card_data['phone']}")
-        
-        # 显示备注字段，如果有备注内容则显示
-        if card_data["remark"]:
-            st.markdown(f"📝 **备注**: {card_data['remark']}")
-            
+        _school_card_body(school)
         st.markdown("</div>", unsafe_allow_html=True)
 
 # 显示学校卡片（带删除按钮）
-def display_school_card_with_delete(school, col, schools_data):
+@metrics.timed()
+def display_school_card_with_delete(school, col, on_delete=None):
     with col:
-        # 准备数据
-        card_data = _prepare_school_card_data(school)
-        
-        # 显示卡片
         st.markdown('<div class="card">', unsafe_allow_html=True)
-        st.markdown(f"### {card_data['name']}")
-        st.markdown(f"📍 **地址**: {card_data['address']}")
-        st.markdown(f"📚 **调剂专业**: {card_data['major']}")
-        st.markdown(card_data['recruitment_display'])
-        
-        st.markdown("#### 历年分数线")
-        df = pd.DataFrame(card_data['score_data'])
-        st.dataframe(df, hide_index=True)
-        
-        st.markdown("#### 联系方式")
-        st.markdown(f"📧 **邮箱**: {card_data['email']}")
-        st.markdown(f"📞 **电话**: {card_data['phone']}")
-        
-        # 显示备注字段，如果有备注内容则显示
-        if card_data["remark"]:
-            st.markdown(f"📝 **备注**: {card_data['remark']}")
+        _school_card_body(school)
             
         # 添加删除按钮
         from components import utils
         delete_col1, delete_col2 = st.columns([4, 1])
         with delete_col2:
             st.markdown('<div class="delete-button">', unsafe_allow_html=True)
-            if st.button("删除", key=f"delete_{card_data['id']}"):
-                if utils.delete_school(card_data['id'], schools_data):
-                    st.success(f"已删除：{card_data['name']}")
+            if st.button("删除", key=f"delete_{school.id}"):
+                if utils.delete_school(school.id):
+                    st.success(f"已删除：{school.name}")
+                    # 通知调用方数据已变更
+                    if on_delete:
+                        on_delete()
                     st.rerun()
             st.markdown('</div>', unsafe_allow_html=True)
             
         st.markdown("</div>", unsafe_allow_html=True)
 
-# 创建学校分数线趋势图
-@st.cache_data(ttl=3600)
-def create_score_trend_chart(school_data):
+# 表格模式每次加载的行数。st.dataframe 在浏览器端只绘制可见的行，但数据要一次发送过去，
+# 也没有滚动到底时回调服务端的接口，所以按块发送，由「加载更多」追加下一块
+TABLE_BLOCK_SIZE = 500
+
+# 以单个表格显示筛选结果：按块加载行，选中一行后在表格下方显示详情卡片
+@metrics.timed()
+def display_results_table(schools, rows, show_delete=False, on_delete=None):
+    total = len(rows)
+    loaded = min(st.session_state.get("table_loaded_rows", TABLE_BLOCK_SIZE), total)
+    visible_schools = [schools[row] for row in rows[:loaded]]
+    metrics.count("view.table_rows", loaded)
+
+    st.markdown(f"### 找到 {total} 所学校（已加载 {loaded} 行，点击行查看详情）")
+    with metrics.timer("ui.results_table_frame"):
+        table_df = analytics.records_to_dataframe(visible_schools)
+        # 招生人数混有整数和范围字符串，统一为文本避免 Arrow 序列化回退到慢速路径
+        table_df["招生人数"] = table_df["招生人数"].astype(str)
+    event = st.dataframe(
+        table_df,
+        hide_index=True,
+        use_container_width=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key=f"results_table_{st.session_state.get('table_generation', 0)}"
+    )
+
+    if loaded < total:
+        if st.button(f"加载更多（剩余 {total - loaded} 行）"):
+            st.session_state.table_loaded_rows = loaded + TABLE_BLOCK_SIZE
+            st.rerun()
+
+    selected_rows = [row for row in event.selection.rows if row < loaded]
+    if selected_rows:
+        school = visible_schools[selected_rows[0]]
+        if show_delete:
+            display_school_card_with_delete(school, st.container(), on_delete)
+        else:
+            display_school_card(school, st.container())
+
+# 导出格式选项
+EXPORT_OPTIONS = {"CSV": "csv", "Excel (xlsx)": "xlsx", "Parquet": "parquet"}
+# 网页下载的文件上限：下载按钮会把整个文件读入 Streamlit 服务进程的内存，更大的导出请使用命令行
+EXPORT_MAX_BYTES = 100 * 1024 * 1024
+
+# 导出筛选结果（折叠面板）：点击后按块生成文件，再显示下载按钮
+@metrics.timed()
+def export_panel(dataset, rows, key):
+    with st.expander(f"📤 导出筛选结果（{len(rows)} 条）"):
+        col_format, col_button = st.columns([3, 1])
+        with col_format:
+            option = st.radio("导出格式", list(EXPORT_OPTIONS), horizontal=True, key=f"{key}_export_format")
+        export_format = EXPORT_OPTIONS[option]
+        with col_button:
+            generate = st.button("生成导出文件", key=f"{key}_export")
+        if not generate:
+            return
+        try:
+            with st.spinner(f"正在导出 {len(rows)} 条记录..."):
+                file = utils.export_results(dataset, rows, export_format)
+        except export.ExportError as e:
+            st.error(str(e))
+            return
+        extension, mime = export.FORMATS[export_format]
+        with file:
+            size = file.seek(0, 2)
+            if size > EXPORT_MAX_BYTES:
+                st.error(f"导出文件约 {size / 1024 / 1024:.0f}MB，超过网页下载上限 {EXPORT_MAX_BYTES // 1024 // 1024}MB。"
+                         f"请缩小筛选范围、改用 Parquet，或使用命令行导出：python -m core export 文件名{extension}")
+                return
+            file.seek(0)
+            st.download_button(
+                label=f"📥 下载 {len(rows)} 条记录",
+                data=file.raw,
+                file_name=f"调剂学校数据{extension}",
+                mime=mime,
+                key=f"{key}_download"
+            )
+
+# 高级筛选条件（折叠面板），返回 SchoolQuery 的关键字参数；分数填 0 表示不限
+def advanced_filters(dataset, key):
+    with st.expander("高级筛选"):
+        col_year, col_region, col_major, col_email = st.columns([1, 2, 2, 1])
+        with col_year:
+            year = st.selectbox("年份", YEARS, key=f"{key}_year")
+        with col_region:
+            regions = st.text_input("地区（多个关键词用空格分隔，满足其一即可）", "", key=f"{key}_regions")
+        with col_major:
+            majors = st.multiselect("调剂专业", utils.major_options(dataset), key=f"{key}_majors")
+        with col_email:
+            has_email = st.checkbox("仅显示有邮箱", False, key=f"{key}_email")
+
+        col_max_low, col_max_high, col_min_low, col_min_high, col_spread = st.columns(5)
+        with col_max_low:
+            max_low = st.number_input(f"{year}最高分不低于", min_value=0, value=0, key=f"{key}_max_low")
+        with col_max_high:
+            max_high = st.number_input(f"{year}最高分不高于", min_value=0, value=0, key=f"{key}_max_high")
+        with col_min_low:
+            min_low = st.number_input(f"{year}最低分不低于", min_value=0, value=0, key=f"{key}_min_low")
+        with col_min_high:
+            min_high = st.number_input(f"{year}最低分不高于", min_value=0, value=0, key=f"{key}_min_high")
+        with col_spread:
+            spread_high = st.number_input(f"{year}分差不超过", min_value=0, value=0, key=f"{key}_spread")
+
+    return {
+        "scores": [
+            (year, "max", max_low, max_high or None),
+            (year, "min", min_low, min_high or None),
+        ],
+        "spreads": [(year, 0, spread_high or None)],
+        "regions": regions.split(),
+        "majors": majors,
+        "has_email": True if has_email else None,
+    }
+
+# 图表磁盘缓存的版本号，修改图表样式后加一，使旧的缓存文件不再命中
+FIGURE_CACHE_VERSION = 1
+
+# 从磁盘缓存读取图表，键为图表名称和输入数据的内容指纹；未命中时构建并写入。
+# 指纹只取决于图表实际用到的数据，服务重启或其他学校的数据变化后仍能命中
+def _persistent_figure(name, inputs, build):
+    cache = figure_cache.get_figure_cache()
+    key = figure_cache.fingerprint(name, FIGURE_CACHE_VERSION, inputs)
+    payload = cache.get(key)
+    metrics.record_cache(f"figure_cache.{name}", payload is not None)
+    if payload is not None:
+        with metrics.timer("ui.figure_from_json"):
+            return pio.from_json(payload)
+    fig = build()
+    with metrics.timer("ui.figure_to_json"):
+        cache.put(key, fig.to_json())
+    return fig
+
+# 创建学校分数线趋势图（同名学校取第一条记录）
+@instrumentation.cache_data(ttl=3600)
+def create_score_trend_chart(dataset, school_name):
+    school = next(school for school in dataset.records if school.name == school_name)
+    inputs = (school.name, school.major or "", school.scores.tolist())
+    return _persistent_figure("score_trend", inputs, lambda: _build_score_trend_chart(school))
+
+def _build_score_trend_chart(school):
+    school_data = analytics.records_to_dataframe([school]).iloc[0]
+    
     # 准备数据
     years = ["2021", "2022", "2023", "2024"]
     max_scores = [
@@ -241,33 +342,33 @@ def create_score_trend_chart(school_data):
     return fig
 
 # 创建学校对比图
-@st.cache_data(ttl=3600)
-def create_school_comparison_chart(schools_df, selected_schools, compare_year):
-    # 过滤选中的学校数据
-    compare_df = schools_df[schools_df["学校名称"].isin(selected_schools)]
-    
-    # 准备对比数据
+@instrumentation.cache_data(ttl=3600)
+def create_school_comparison_chart(dataset, selected_schools, compare_year):
+    # 直接从选中的记录取出对比数据，不转换整个数据集
+    selected = set(selected_schools)
+    compare_schools = [school for school in dataset.records if school.name in selected]
     compare_data = {
-        "学校名称": compare_df["学校名称"].tolist(),
-        f"{compare_year}最高分": compare_df[f"{compare_year}最高分"].tolist(),
-        f"{compare_year}最低分": compare_df[f"{compare_year}最低分"].tolist()
+        "学校名称": [school.name for school in compare_schools],
+        f"{compare_year}最高分": [school.score(compare_year, "max") for school in compare_schools],
+        f"{compare_year}最低分": [school.score(compare_year, "min") for school in compare_schools],
+        "调剂专业": [school.major or "" for school in compare_schools],
     }
-    
-    # 如果存在调剂专业字段则添加
-    if "调剂专业" in compare_df.columns:
-        compare_data["调剂专业"] = compare_df["调剂专业"].tolist()
-        
     compare_chart_df = pd.DataFrame(compare_data)
     
     # 创建学校专业标签
-    if "调剂专业" in compare_chart_df.columns:
-        compare_chart_df["显示名称"] = compare_chart_df.apply(
-            lambda x: f"{x['学校名称']} - {x['调剂专业']}" if pd.notna(x['调剂专业']) and x['调剂专业'] else x['学校名称'], 
-            axis=1
-        )
-    else:
-        compare_chart_df["显示名称"] = compare_chart_df["学校名称"]
+    compare_chart_df["显示名称"] = [
+        f"{name} - {major}" if major else name
+        for name, major in zip(compare_data["学校名称"], compare_data["调剂专业"])
+    ]
     
+    inputs = (compare_year, compare_data)
+    fig = _persistent_figure(
+        "school_comparison", inputs,
+        lambda: _build_school_comparison_chart(compare_chart_df, compare_year)
+    )
+    return fig, compare_chart_df
+
+def _build_school_comparison_chart(compare_chart_df, compare_year):
     # 重塑数据用于条形图
     chart_df = pd.melt(
         compare_chart_df, 
@@ -303,23 +404,25 @@ def create_school_comparison_chart(schools_df, selected_schools, compare_year):
         hovermode='closest'
     )
     
-    return fig, compare_chart_df
+    return fig
 
 # 创建招生人数图表
-@st.cache_data(ttl=3600)
-def create_recruitment_chart(schools_df):
-    # 复制DataFrame避免修改原始数据
-    df = schools_df.copy()
+@instrumentation.cache_data(ttl=3600)
+def create_recruitment_chart(dataset):
+    # 在列式表上取招生人数（范围取下限）最多的 10 条记录，并列时按记录顺序
+    rows = np.argsort(-dataset.table.recruitment_low, kind="stable")[:10]
+    top_schools = [dataset.records[row] for row in rows.tolist()]
+    inputs = [
+        (school.name, school.major or "", school.recruitment_count)
+        for school in top_schools
+    ]
+    return _persistent_figure("recruitment", inputs, lambda: _build_recruitment_chart(top_schools))
+
+def _build_recruitment_chart(top_schools):
+    top_recruitment = analytics.records_to_dataframe(top_schools)
     
     # 处理招生人数字段，为了排序需要创建数值列
-    df['招生人数_排序'] = df['招生人数'].apply(lambda x: 
-        int(x) if isinstance(x, int) or (isinstance(x, str) and x.isdigit())
-        else int(x.split('-')[0]) if isinstance(x, str) and '-' in x
-        else 0
-    )
-    
-    # 按招生人数_排序排序
-    top_recruitment = df.sort_values(by="招生人数_排序", ascending=False).head(10)
+    top_recruitment['招生人数_排序'] = analytics.recruitment_numbers(top_recruitment)
     
     # 创建学校专业标签
     if "调剂专业" in top_recruitment.columns:
@@ -360,40 +463,49 @@ def create_recruitment_chart(schools_df):
     
     return fig
 
-# 显示招生人数统计
-@st.cache_data(ttl=3600)
-def _calculate_recruitment_stats(schools_df):
-    """计算招生人数统计数据，作为缓存函数"""
-    # 复制DataFrame避免修改原始数据
-    df = schools_df.copy()
+# 分组统计图：各分组的中位数，误差线为 25%~75% 分位（只显示学校数最多的 top_n 个分组）
+@instrumentation.cache_data(ttl=3600)
+def create_score_summary_chart(dataset, dimension, year, kind, top_n=20):
+    summary = utils.score_summary(dataset, dimension, year, kind).head(top_n)
+    inputs = (year, kind, summary.to_dict("split"))
+    return _persistent_figure("score_summary", inputs, lambda: _build_score_summary_chart(summary, year, kind))
+
+def _build_score_summary_chart(summary, year, kind):
+    label = summary.columns[0]
+    kind_label = aggregates.SCORE_KINDS[kind]
     
-    # 处理招生人数字段，为了计算需要创建数值列
-    df['招生人数_数值'] = df['招生人数'].apply(lambda x: 
-        int(x) if isinstance(x, int) or (isinstance(x, str) and x.isdigit())
-        else int(x.split('-')[0]) if isinstance(x, str) and '-' in x
-        else 0
+    fig = px.bar(
+        summary,
+        x=label,
+        y="中位数",
+        error_y=summary["75%分位"] - summary["中位数"],
+        error_y_minus=summary["中位数"] - summary["25%分位"],
+        hover_data=["学校数", "平均分", "最低", "最高"],
+        title=f"各{label}{'' if year is None else year + '年'}{kind_label}中位数（误差线为25%~75%分位）",
+        color="学校数",
+        color_continuous_scale="Blues",
     )
     
-    # 计算统计值
-    total_recruitment = df["招生人数_数值"].sum()
-    avg_recruitment = df["招生人数_数值"].mean()
-    max_recruitment = df["招生人数_数值"].max()
-    min_recruitment = df["招生人数_数值"].min()
-    
-    # 获取最大和最小招生人数的原始值
-    max_school = df.loc[df['招生人数_数值'] == max_recruitment, '招生人数'].iloc[0]
-    min_school = df.loc[df['招生人数_数值'] == min_recruitment, '招生人数'].iloc[0]
+    fig.update_layout(
+        height=500,
+        xaxis_title=label,
+        yaxis_title=kind_label,
+        modebar_remove=['lasso2d', 'select2d'],
+        hovermode='closest'
+    )
     
-    return {
-        "total": total_recruitment,
-        "avg": avg_recruitment,
-        "max": max_school,
-        "min": min_school
-    }
+    return fig
+
+# 显示招生人数统计
+@instrumentation.cache_data(ttl=3600)
+def _calculate_recruitment_stats(dataset):
+    """计算招生人数统计数据，作为缓存函数"""
+    return analytics.recruitment_stats(utils.json_to_dataframe(dataset))
 
-def display_recruitment_stats(schools_df):
+@metrics.timed()
+def display_recruitment_stats(dataset):
     # 获取缓存的统计数据
-    stats = _calculate_recruitment_stats(schools_df)
+    stats = _calculate_recruitment_stats(dataset)
     
     col1, col2, col3, col4 = st.columns(4)
     
@@ -0,0 +1 @@
+# 考研调剂系统的核心逻辑（存储、导入、查询和统计分析），不依赖 Streamlit
@@ -0,0 +1,170 @@
+# 批处理命令行入口，在 app 目录下运行 python -m core --help 查看用法
+import argparse
+import os
+import sys
+import time
+
+from . import snapshot, storage
+
+
+def cmd_info(args):
+    backend = storage.get_storage(args.backend)
+    print(f"存储后端：{backend.name}（{backend.path}）")
+    print(f"数据版本：{backend.generation()}")
+    print(f"学校数量：{len(backend.load_all())}")
+    binary_path = getattr(backend, "binary_path", None)
+    if binary_path and os.path.exists(binary_path):
+        current = snapshot.snapshot_source(binary_path) == snapshot.file_stamp(backend.path)
+        print(f"二进制快照：{os.path.getsize(binary_path) / 1024 / 1024:.1f}MB"
+              f"（JSON {os.path.getsize(backend.path) / 1024 / 1024:.1f}MB）{'' if current else '，已过期'}")
+    return 0
+
+
+def cmd_import(args):
+    from . import importer
+
+    backend = storage.get_storage(args.backend)
+    backend.ensure_initialized()
+    if args.jobs != 1:
+        return _import_parallel(args, backend)
+
+    failed = 0
+    for path in args.files:
+        try:
+            stats = importer.import_into_storage(path, backend, chunksize=args.chunksize)
+        except importer.ImportFormatError as e:
+            print(f"{path}：{e}", file=sys.stderr)
+            failed += 1
+            continue
+        except Exception as e:
+            print(f"{path}：导入数据时出错：{str(e)}", file=sys.stderr)
+            failed += 1
+            continue
+        print(f"{path}：导入 {stats.records} 条（{stats.rows} 行，{stats.seconds:.2f} 秒，{stats.rows_per_second:.0f} 行/秒）")
+    return 1 if failed else 0
+
+
+def _import_parallel(args, backend):
+    # 多进程解析全部文件（zip 压缩包展开），合并后一次写入存储
+    from . import importer
+
+    batch = importer.parse_files(args.files, max_workers=args.jobs or None, chunksize=args.chunksize)
+    for result in batch.files:
+        if result.ok:
+            print(f"{result.name}：解析 {len(result.records)} 条（{result.stats.rows} 行，{result.stats.seconds:.2f} 秒）")
+        else:
+            print(f"{result.name}：{result.error}", file=sys.stderr)
+
+    records = batch.records
+    if records:
+        backend.insert_many([school.to_json() for school in importer.assign_ids(records, backend)])
+    print(f"共导入 {len(records)} 条（{batch.rows} 行，{batch.seconds:.2f} 秒）")
+    return 1 if batch.failed else 0
+
+
+def cmd_export(args):
+    from . import export
+    from .columnar import SORT_OPTIONS
+    from .dataset import SchoolDataset
+    from .query import SchoolQuery, run_query
+    from .record import School
+
+    export_format = args.format or os.path.splitext(args.output)[1].lstrip(".").lower()
+    if export_format not in export.FORMATS:
+        print(f"无法确定导出格式，请用 --format 指定（{'/'.join(export.FORMATS)}）", file=sys.stderr)
+        return 1
+    if args.sort is not None and args.sort not in SORT_OPTIONS:
+        print(f"不支持的排序方式：{args.sort}（可选：{'、'.join(SORT_OPTIONS)}）", file=sys.stderr)
+        return 1
+
+    started = time.perf_counter()
+    backend = storage.get_storage(args.backend)
+    dataset = SchoolDataset([School.from_json(school) for school in backend.load_all()], backend.generation())
+    query = SchoolQuery(
+        text=args.text,
+        scores=[("2024", "min", args.min_score, None)],
+        regions=args.region,
+        majors=args.major,
+        has_email=True if args.has_email else None,
+    )
+    rows = run_query(dataset, query, args.sort)
+    try:
+        with open(args.output, "wb") as f:
+            count = export.export_records(dataset.records, f, export_format, rows)
+    except export.ExportError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    print(f"已导出 {count} 条到 {args.output}（{time.perf_counter() - started:.2f} 秒）")
+    return 0
+
+
+def cmd_migrate(args):
+    count, renumbered = storage.migrate_json_to_sqlite(args.json_path, args.db_path)
+    print(f"已迁移 {count} 所学校数据")
+    if renumbered:
+        print(f"其中 {len(renumbered)} 条记录的 id 与其他记录重复，已重新编号：" +
+              "、".join(f"{old} → {new}" for old, new in renumbered))
+    return 0
+
+
+def cmd_migrate_recruitment(args):
+    from . import schools
+
+    count = schools.migrate_recruitment(storage.get_storage(args.backend))
+    print(f"已为 {count} 条记录补全招生人数字段")
+    return 0
+
+
+def cmd_compact(args):
+    backend = storage.get_storage(storage.JsonStorage.name)
+    if backend.compact():
+        print("变更日志已合并进快照")
+    else:
+        print("变更日志为空，无需合并")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core", description="考研调剂系统批处理工具")
+    parser.add_argument("--backend", default=None, help="存储后端（json/sqlite），默认读取环境变量 TIAOJI_STORAGE")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("info", help="显示存储信息").set_defaults(func=cmd_info)
+
+    import_parser = subparsers.add_parser("import", help="将 Excel/CSV 文件流式导入存储")
+    import_parser.add_argument("files", nargs="+", help="要导入的文件")
+    import_parser.add_argument("--chunksize", type=int, default=5000, help="每批处理的行数")
+    import_parser.add_argument(
+        "--jobs", type=int, default=1,
+        help="并行解析的进程数（0 表示 CPU 核数）；大于 1 或为 0 时全部文件解析完成后一次写入，并支持 zip 压缩包"
+    )
+    import_parser.set_defaults(func=cmd_import)
+
+    export_parser = subparsers.add_parser("export", help="将（筛选后的）学校数据流式导出为 csv/xlsx/parquet")
+    export_parser.add_argument("output", help="输出文件，默认按扩展名确定格式")
+    export_parser.add_argument("--format", choices=["csv", "xlsx", "parquet"], default=None, help="导出格式")
+    export_parser.add_argument("--text", default="", help="学校、专业或地区包含的文字")
+    export_parser.add_argument("--region", action="append", default=[], help="地区关键词（可重复）")
+    export_parser.add_argument("--major", action="append", default=[], help="专业关键词（可重复）")
+    export_parser.add_argument("--min-score", type=int, default=0, help="2024年最低分不低于")
+    export_parser.add_argument("--has-email", action="store_true", help="只导出有邮箱的学校")
+    export_parser.add_argument("--sort", default=None, help="排序方式，如「名称 (A-Z)」，默认按记录顺序")
+    export_parser.set_defaults(func=cmd_export)
+
+    migrate_parser = subparsers.add_parser("migrate", help="将 schools.json 一次性迁移到 SQLite")
+    migrate_parser.add_argument("--json", dest="json_path", default=None, help="源 JSON 文件路径")
+    migrate_parser.add_argument("--db", dest="db_path", default=None, help="目标 SQLite 数据库路径")
+    migrate_parser.set_defaults(func=cmd_migrate)
+
+    subparsers.add_parser(
+        "migrate-recruitment", help="将招生人数解析为数值字段并写回存储"
+    ).set_defaults(func=cmd_migrate_recruitment)
+
+    subparsers.add_parser("compact", help="将 JSON 变更日志合并进快照").set_defaults(func=cmd_compact)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
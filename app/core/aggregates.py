@@ -0,0 +1,147 @@
+# 按省份、专业、年份分组的分数直方图，统计量由直方图算出，增删改时增量合并
+from collections import Counter
+
+import numpy as np
+
+from .columnar import YEARS, ScoreTable
+
+# 省级行政区简称，地址以其开头即归入该省份
+PROVINCES = (
+    "北京", "天津", "上海", "重庆", "河北", "山西", "辽宁", "吉林", "黑龙江", "江苏",
+    "浙江", "安徽", "福建", "江西", "山东", "河南", "湖北", "湖南", "广东", "海南",
+    "四川", "贵州", "云南", "陕西", "甘肃", "青海", "台湾", "内蒙古", "广西", "西藏",
+    "宁夏", "新疆", "香港", "澳门",
+)
+UNKNOWN_PROVINCE = "未知"
+
+# 分组维度 -> 显示名称；"all" 只有一个分组，用于按年份汇总
+DIMENSIONS = {"province": "省份", "major": "专业", "all": "全部"}
+ALL_GROUP = "全部"
+
+SCORE_KINDS = {"max": "最高分", "min": "最低分"}
+
+# 统计表中的分位数
+PERCENTILES = (25, 50, 75, 90)
+
+
+def province_of(address):
+    address = (address or "").strip()
+    for province in PROVINCES:
+        if address.startswith(province):
+            return province
+    return UNKNOWN_PROVINCE
+
+
+def _group_codes(table, dimension):
+    """返回 (分组名称数组, 每行的分组编号)"""
+    if dimension == "all":
+        return np.array([ALL_GROUP]), np.zeros(len(table), dtype=np.int64)
+    if dimension == "province":
+        # 只需对不重复的地址判断省份
+        addresses, codes = table.categories("addresses")
+        provinces = np.array([province_of(address) for address in addresses.tolist()], dtype=str)
+        groups, province_codes = np.unique(provinces, return_inverse=True)
+        return groups, province_codes.reshape(-1)[codes] if len(codes) else codes
+    values, codes = table.categories("majors")
+    return values, codes
+
+
+def _percentile(values, cumulative, total, q):
+    # 与 numpy.percentile 默认的线性插值一致，第 rank 小的值通过累计人数查找
+    position = (total - 1) * q / 100
+    lower, upper = int(np.floor(position)), int(np.ceil(position))
+    low_value = values[np.searchsorted(cumulative, lower, side="right")]
+    high_value = values[np.searchsorted(cumulative, upper, side="right")]
+    return float(low_value + (high_value - low_value) * (position - lower))
+
+
+def histogram_stats(histogram):
+    """由直方图计算 学校数/平均/最低/最高/分位数"""
+    values = np.array(sorted(histogram), dtype=np.int64)
+    counts = np.array([histogram[value] for value in values.tolist()], dtype=np.int64)
+    total = int(counts.sum())
+    cumulative = np.cumsum(counts)
+    stats = {
+        "count": total,
+        "mean": float((values * counts).sum() / total),
+        "min": int(values[0]),
+        "max": int(values[-1]),
+    }
+    for q in PERCENTILES:
+        stats[f"p{q}"] = _percentile(values, cumulative, total, q)
+    return stats
+
+
+class ScoreAggregates:
+    """分组分数直方图的集合 (维度, 分组, 年份, 最高分/最低分) -> Counter，创建后不再修改"""
+
+    def __init__(self, histograms=None):
+        self._histograms = histograms or {}
+        self._summaries = {}
+
+    @classmethod
+    def from_table(cls, table):
+        histograms = {}
+        for dimension in DIMENSIONS:
+            groups, codes = _group_codes(table, dimension)
+            # 取值编号可能是较窄的无符号类型，编码前先转为 int64
+            codes = codes.astype(np.int64, copy=False)
+            for year in YEARS:
+                column = YEARS.index(year)
+                for kind, scores in (("max", table.scores_max), ("min", table.scores_min)):
+                    scores = scores[:, column].astype(np.int64)
+                    valid = scores > 0
+                    if not valid.any():
+                        continue
+                    # (分组编号, 分数) 编码为一个整数后一次计数
+                    width = int(scores.max()) + 1
+                    pairs, counts = np.unique(codes[valid] * width + scores[valid], return_counts=True)
+                    for pair, count in zip(pairs.tolist(), counts.tolist()):
+                        group, score = divmod(pair, width)
+                        key = (dimension, str(groups[group]), year, kind)
+                        histograms.setdefault(key, Counter())[score] = count
+        return cls(histograms)
+
+    @classmethod
+    def from_records(cls, records):
+        return cls.from_table(ScoreTable.from_records(records))
+
+    def merged(self, delta, sign=1):
+        """返回加上（sign=-1 时减去）另一组直方图后的新对象"""
+        histograms = dict(self._histograms)
+        for key, changes in delta._histograms.items():
+            histogram = Counter(histograms.get(key, ()))
+            for score, count in changes.items():
+                histogram[score] += sign * count
+                if histogram[score] <= 0:
+                    del histogram[score]
+            if histogram:
+                histograms[key] = histogram
+            else:
+                histograms.pop(key, None)
+        return ScoreAggregates(histograms)
+
+    def added(self, records):
+        return self.merged(ScoreAggregates.from_records(records)) if records else self
+
+    def removed(self, records):
+        return self.merged(ScoreAggregates.from_records(records), -1) if records else self
+
+    def summary(self, dimension, year, kind):
+        """返回某个维度下每个分组的统计行，按学校数降序；year 为 None 时返回按年份汇总"""
+        key = (dimension, year, kind)
+        if key not in self._summaries:
+            if year is None:
+                rows = [
+                    {"group": year, **histogram_stats(self._histograms[("all", ALL_GROUP, year, kind)])}
+                    for year in YEARS if ("all", ALL_GROUP, year, kind) in self._histograms
+                ]
+            else:
+                rows = [
+                    {"group": group, **histogram_stats(histogram)}
+                    for (dim, group, hist_year, hist_kind), histogram in self._histograms.items()
+                    if dim == dimension and hist_year == year and hist_kind == kind
+                ]
+                rows.sort(key=lambda row: (-row["count"], row["group"]))
+            self._summaries[key] = rows
+        return self._summaries[key]
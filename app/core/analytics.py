@@ -0,0 +1,81 @@
+from .record import YEARS
+from .recruitment import parse_recruitment_series
+
+# 将学校记录（School 列表）按列转换为DataFrame，不为每条记录构造中间字典
+def records_to_dataframe(schools_data):
+    import numpy as np
+    import pandas as pd
+
+    if not schools_data:
+        return pd.DataFrame()
+
+    count = len(schools_data)
+    scores = np.frombuffer(
+        b"".join([school.scores.tobytes() for school in schools_data]), dtype=np.intc
+    ).reshape(count, len(YEARS), 2)
+    columns = {
+        "学校名称": [school.name for school in schools_data],
+        "学校地址": [school.address for school in schools_data],
+        "调剂专业": [school.major or "" for school in schools_data],
+        "招生人数": [school.recruitment_count for school in schools_data],
+        "招生人数下限": [school.recruitment_low for school in schools_data],
+        "招生人数上限": [school.recruitment_high for school in schools_data],
+    }
+    for year_index, year in enumerate(YEARS):
+        columns[f"{year}最高分"] = scores[:, year_index, 0].tolist()
+        columns[f"{year}最低分"] = scores[:, year_index, 1].tolist()
+    columns["邮箱"] = [school.email for school in schools_data]
+    columns["电话"] = [school.phone for school in schools_data]
+    columns["备注"] = [school.remark or "" for school in schools_data]
+    return pd.DataFrame(columns)
+
+# 创建示例模板数据
+def create_template_data():
+    import pandas as pd
+
+    template_data = {
+        "学校名称": ["示例大学", "示例理工大学"],
+        "学校地址": ["北京市海淀区XX路XX号", "上海市浦东新区XX路XX号"],
+        "调剂专业": ["计算机科学与技术", "软件工程"],
+        "招生人数": [20, 15],
+        "2024最高分": [380, 370],
+        "2024最低分": [350, 340],
+        "2023最高分": [375, 365],
+        "2023最低分": [345, 335],
+        "2022最高分": [370, 360],
+        "2022最低分": [340, 330],
+        "2021最高分": [365, 355],
+        "2021最低分": [335, 325],
+        "邮箱": ["example@university.edu.cn", "info@example.edu.cn"],
+        "电话": ["010-12345678", "021-87654321"],
+        "备注": ["270-310分", "300分左右"]
+    }
+    return pd.DataFrame(template_data)
+
+# 招生人数的数值（范围取下限）：优先使用记录中已解析的列，没有时按列向量化解析
+def recruitment_numbers(schools_df):
+    import pandas as pd
+
+    if "招生人数下限" in schools_df.columns:
+        return schools_df["招生人数下限"]
+    low, _, _, _ = parse_recruitment_series(schools_df["招生人数"])
+    return pd.Series(low, index=schools_df.index)
+
+# 计算招生人数统计数据（直接读取数值列，不复制 DataFrame）
+def recruitment_stats(schools_df):
+    numbers = recruitment_numbers(schools_df)
+
+    # 计算统计值
+    total_recruitment = numbers.sum()
+    avg_recruitment = numbers.mean()
+
+    # 获取最大和最小招生人数的原始值
+    max_school = schools_df["招生人数"].iloc[numbers.to_numpy().argmax()]
+    min_school = schools_df["招生人数"].iloc[numbers.to_numpy().argmin()]
+
+    return {
+        "total": total_recruitment,
+        "avg": avg_recruitment,
+        "max": max_school,
+        "min": min_school
+    }
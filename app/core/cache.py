@@ -0,0 +1,68 @@
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from . import metrics
+
+
+class LRUCache:
+    """线程安全的 LRU 缓存，记录命中和未命中次数"""
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+_MISSING = object()
+
+
+def cached(maxsize=128, copy=None):
+    """按参数缓存函数结果的装饰器，参数必须可哈希；copy 为返回前对缓存值做的复制函数（如 list）"""
+
+    def decorator(func):
+        cache = LRUCache(maxsize)
+        name = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            value = cache.get(key, _MISSING)
+            metrics.record_cache(name, value is not _MISSING)
+            if value is _MISSING:
+                value = func(*args, **kwargs)
+                cache.put(key, value)
+            return copy(value) if copy else value
+
+        wrapper.cache = cache
+        wrapper.cache_clear = cache.clear
+        return wrapper
+
+    return decorator
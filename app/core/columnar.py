@@ -0,0 +1,247 @@
+import numpy as np
+
+YEARS = ("2024", "2023", "2022", "2021")
+
+# 查看数据页面的排序方式
+SORT_OPTIONS = ["名称 (A-Z)", "名称 (Z-A)", "2024最高分 (高-低)", "2024最低分 (高-低)"]
+
+# 排序方式 -> (排序键, 是否降序)；排序键为 ("name", None) 或 ("max"/"min", 年份)
+SORT_KEYS = {
+    "名称 (A-Z)": (("name", None), False),
+    "名称 (Z-A)": (("name", None), True),
+    "2024最高分 (高-低)": (("max", "2024"), True),
+    "2024最低分 (高-低)": (("min", "2024"), True),
+}
+
+
+# 名称的排序键：GB18030 与 GB2312 兼容，常用汉字（一级字）按拼音顺序编码，
+# 按编码字节比较即近似按拼音排序，不依赖系统 locale
+def collation_keys(names):
+    return np.array([name.encode("gb18030", errors="replace") for name in names], dtype=bytes)
+
+
+def _stable_order(keys, descending):
+    if not descending:
+        return np.argsort(keys, kind="stable")
+    # 降序时键值相同的行仍按行号升序
+    _, rank = np.unique(keys, return_inverse=True)
+    return np.argsort(-rank.reshape(-1), kind="stable")
+
+
+class SortIndex:
+    """按某一排序键预先排好的行号排列，键值相同的行按行号升序；增删行时增量维护"""
+
+    def __init__(self, order, keys, descending):
+        # order 为排好序的行号，keys 为与之一一对应的键值
+        self.order = order
+        self.keys = keys
+        self.descending = descending
+
+    @classmethod
+    def build(cls, keys, descending=False, first_row=0):
+        order = _stable_order(keys, descending)
+        return cls(order + first_row, keys[order], descending)
+
+    def __len__(self):
+        return len(self.order)
+
+    def _positions(self, keys):
+        # 键值相同时新行（行号更大）排在已有行之后
+        if self.descending:
+            return len(self.keys) - np.searchsorted(self.keys[::-1], keys, side="left")
+        return np.searchsorted(self.keys, keys, side="right")
+
+    def inserted(self, keys, first_row):
+        """返回追加行号从 first_row 开始、键值为 keys 的若干行后的新排列"""
+        new = SortIndex.build(keys, self.descending, first_row)
+        positions = self._positions(new.keys)
+        # 文本键值的宽度可能超过已有键值，先统一类型避免截断
+        dtype = np.result_type(self.keys, new.keys)
+        return SortIndex(
+            np.insert(self.order, positions, new.order),
+            np.insert(self.keys.astype(dtype, copy=False), positions, new.keys),
+            self.descending,
+        )
+
+    def removed(self, removed):
+        """返回删除若干行后的新排列，removed 为按原行号的布尔掩码"""
+        keep = ~removed[self.order]
+        order = self.order[keep]
+        # 每行的新行号 = 原行号 - 它之前被删除的行数
+        shift = np.cumsum(removed)
+        return SortIndex(order - shift[order], self.keys[keep], self.descending)
+
+    def select(self, mask):
+        """返回 mask 为 True 的行号，按本排列的顺序"""
+        return self.order[mask[self.order]]
+
+class ScoreTable:
+    """与学校记录列表一一对应的列式数据（第 i 行对应第 i 条记录），创建后不再修改"""
+
+    # 所有按行存放的列，追加和删除行时逐列处理
+    COLUMNS = (
+        "ids", "names", "addresses", "majors", "has_email",
+        "scores_max", "scores_min", "recruitment_low", "recruitment_high",
+    )
+
+    def __init__(self, ids, names, addresses, majors, has_email,
+                 scores_max, scores_min, recruitment_low, recruitment_high):
+        self.ids = ids
+        # 文本列可以是每行取值的数组，也可以是 (排好序的不重复取值, 每行取值的编号)
+        # 或返回这一对数组的函数；后两者（如内存映射的快照）在首次使用时才解码和展开
+        self._text = {"names": names, "addresses": addresses, "majors": majors}
+        self.has_email = has_email
+        # scores_max/scores_min 的形状为 (行数, 年份数)，列顺序与 YEARS 一致
+        self.scores_max = scores_max
+        self.scores_min = scores_min
+        # 招生人数范围的上下限，精确人数的上下限相同
+        self.recruitment_low = recruitment_low
+        self.recruitment_high = recruitment_high
+        self._categories = {}
+        self._sort_indexes = {}
+
+    names = property(lambda self: self._text_column("names"))
+    addresses = property(lambda self: self._text_column("addresses"))
+    majors = property(lambda self: self._text_column("majors"))
+
+    def _encoded(self, column):
+        """返回文本列的 (不重复取值, 编号)，文本列是按行的数组时返回 None"""
+        values = self._text[column]
+        if callable(values):
+            values = self._text[column] = values()
+        return values if isinstance(values, tuple) else None
+
+    def _text_column(self, column):
+        encoded = self._encoded(column)
+        if encoded is not None:
+            self._categories.setdefault(column, encoded)
+            unique, codes = encoded
+            self._text[column] = unique[codes]
+        return self._text[column]
+
+    @classmethod
+    def from_records(cls, records):
+        """由 School 列表构建；分数数组按字节拼接后整体转换"""
+        count = len(records)
+        ids = np.fromiter((school.id for school in records), dtype=np.int64, count=count)
+        names = np.array([school.name for school in records], dtype=str)
+        addresses = np.array([school.address or "" for school in records], dtype=str)
+        majors = np.array([school.major or "" for school in records], dtype=str)
+        has_email = np.fromiter(
+            (bool(str(school.email or "").strip()) for school in records),
+            dtype=bool, count=count
+        )
+        # 每条记录的分数按 (年份, 最高/最低) 排列，与 YEARS 的顺序一致
+        scores = np.frombuffer(
+            b"".join([school.scores.tobytes() for school in records]), dtype=np.intc
+        ).astype(np.int32).reshape(count, len(YEARS), 2)
+        recruitment_low = np.fromiter((school.recruitment_low for school in records), dtype=np.int32, count=count)
+        recruitment_high = np.fromiter((school.recruitment_high for school in records), dtype=np.int32, count=count)
+        return cls(ids, names, addresses, majors, has_email,
+                   scores[:, :, 0].copy(), scores[:, :, 1].copy(), recruitment_low, recruitment_high)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def sort_keys(self, sort_key):
+        field, year = sort_key
+        if field == "name":
+            return collation_keys(self.names)
+        if field == "max":
+            return self.max_scores(year)
+        if field == "min":
+            return self.min_scores(year)
+        raise ValueError(f"不支持的排序键：{sort_key}")
+
+    def sort_index(self, sort_key, descending=False):
+        """返回按 sort_key 排好的 SortIndex，首次使用时构建，之后随增删增量维护"""
+        index = self._sort_indexes.get((sort_key, descending))
+        if index is None:
+            index = SortIndex.build(self.sort_keys(sort_key), descending)
+            self._sort_indexes[(sort_key, descending)] = index
+        return index
+
+    def categories(self, column):
+        """返回文本列的 (不重复取值, 每行取值的编号)，按取值的条件只需在不重复取值上计算"""
+        if column not in self._categories and column in self._text and self._encoded(column) is not None:
+            self._categories[column] = self._text[column]
+        if column not in self._categories:
+            values = getattr(self, column)
+            if len(values):
+                self._categories[column] = np.unique(values, return_inverse=True)
+            else:
+                self._categories[column] = (values, np.empty(0, dtype=np.int64))
+        return self._categories[column]
+
+    def extended(self, records):
+        """返回在末尾追加 records 后的新表"""
+        other = ScoreTable.from_records(records)
+        table = ScoreTable(**{
+            column: np.concatenate([getattr(self, column), getattr(other, column)])
+            if len(self) else getattr(other, column)
+            for column in self.COLUMNS
+        })
+        for (sort_key, descending), index in list(self._sort_indexes.items()):
+            table._sort_indexes[(sort_key, descending)] = index.inserted(other.sort_keys(sort_key), len(self))
+        return table
+
+    def with_rows(self, rows, records):
+        """返回把 rows 各行替换为 records 后的新表；排序排列和取值编号在下次使用时重建"""
+        other = ScoreTable.from_records(records)
+        columns = {}
+        for column in self.COLUMNS:
+            values, new_values = getattr(self, column), getattr(other, column)
+            # 文本列的宽度可能需要加宽，先统一类型再逐行替换
+            values = values.astype(np.result_type(values, new_values), copy=True)
+            values[rows] = new_values
+            columns[column] = values
+        return ScoreTable(**columns)
+
+    def without_ids(self, ids):
+        """返回删除指定 id 所在行后的新表"""
+        removed = np.isin(self.ids, np.fromiter(ids, dtype=np.int64))
+        keep = ~removed
+        table = ScoreTable(**{column: getattr(self, column)[keep] for column in self.COLUMNS})
+        for (sort_key, descending), index in list(self._sort_indexes.items()):
+            table._sort_indexes[(sort_key, descending)] = index.removed(removed)
+        return table
+
+    def rows_for_ids(self, ids):
+        """返回 id 集合对应行的布尔掩码"""
+        return np.isin(self.ids, np.fromiter(ids, dtype=np.int64, count=len(ids)))
+
+    def max_scores(self, year):
+        return self.scores_max[:, YEARS.index(year)]
+
+    def min_scores(self, year):
+        return self.scores_min[:, YEARS.index(year)]
+
+
+# 按搜索结果掩码、最低分、招生人数范围和排序方式筛选，返回记录列表中的行号；
+# recruitment_range 为 (下限, 上限)，招生人数范围与之有交集的学校被保留
+def filter_and_sort(table, min_score, sort_option, mask=None, recruitment_range=None):
+    mask = np.ones(len(table), dtype=bool) if mask is None else mask.copy()
+
+    if min_score > 0:
+        mask &= table.min_scores("2024") >= min_score
+
+    if recruitment_range is not None:
+        low, high = recruitment_range
+        mask &= (table.recruitment_high >= low) & (table.recruitment_low <= high)
+
+    return sorted_rows(table, mask, sort_option)
+
+
+# 按排序方式返回 mask 为 True 的行号：与预排好的排列求交集，不需要再排序
+def sorted_rows(table, mask, sort_option):
+    if sort_option not in SORT_KEYS:
+        return np.flatnonzero(mask)
+    sort_key, descending = SORT_KEYS[sort_option]
+    return table.sort_index(sort_key, descending).select(mask)
+
+
+# 按排序方式对行号排序
+def sort_rows(table, rows, sort_option):
+    mask = np.zeros(len(table), dtype=bool)
+    mask[rows] = True
+    return sorted_rows(table, mask, sort_option)
@@ -0,0 +1,284 @@
+import threading
+import uuid
+from contextlib import nullcontext
+
+from .search_index import BigramIndex, SEARCH_FIELDS
+from .upsert import add_to_key_index, build_key_index, dedup_key, remove_from_key_index
+
+
+class SchoolDataset:
+    """某个存储版本的学校记录及其派生结构的只读快照，增删改通过 with_* 派生新快照并增量更新派生结构"""
+
+    def __init__(self, records, version=None, dataset_id=None):
+        self.records = records
+        self.version = version
+        self.dataset_id = dataset_id or uuid.uuid4().hex
+        # id -> 记录 的索引（哈希表或映射快照中的有序 id 表）
+        id_index = getattr(records, "id_index", None)
+        self.by_id = id_index() if id_index else {school.id: school for school in records}
+        self._table = None
+        self._search_index = None
+        self._key_index = None
+        self._aggregates = None
+        # 派生结构在首次使用时构建，多个会话可能同时触发
+        self._build_lock = threading.Lock()
+
+    @property
+    def cache_key(self):
+        # 尚未对应存储版本的快照内容不确定，只能按对象区分
+        if self.version is None:
+            return (self.dataset_id, "object", id(self))
+        return (self.dataset_id, self.version)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __bool__(self):
+        return bool(self.records)
+
+    @property
+    def table(self):
+        if self._table is None:
+            with self._build_lock:
+                if self._table is None:
+                    from .columnar import ScoreTable
+                    score_table = getattr(self.records, "score_table", None)
+                    table = score_table() if score_table else None
+                    self._table = table if table is not None else ScoreTable.from_records(self.records)
+        return self._table
+
+    @property
+    def search_index(self):
+        if self._search_index is None:
+            with self._build_lock:
+                if self._search_index is None:
+                    search_index = getattr(self.records, "search_index", None)
+                    index = search_index() if search_index else None
+                    self._search_index = index if index is not None else BigramIndex.build(self.records)
+        return self._search_index
+
+    @property
+    def key_index(self):
+        """(学校名称, 调剂专业) 匹配键 -> 同键记录 id 元组的哈希索引，用于合并导入"""
+        if self._key_index is None:
+            with self._build_lock:
+                if self._key_index is None:
+                    key_index = getattr(self.records, "key_index", None)
+                    index = key_index() if key_index else None
+                    self._key_index = index if index is not None else build_key_index(self.records)
+        return self._key_index
+
+    @property
+    def aggregates(self):
+        """按省份/专业/年份分组的分数直方图（core.aggregates.ScoreAggregates）"""
+        if self._aggregates is None:
+            table = self.table
+            with self._build_lock:
+                if self._aggregates is None:
+                    from .aggregates import ScoreAggregates
+                    self._aggregates = ScoreAggregates.from_table(table)
+        return self._aggregates
+
+    def __contains__(self, school_id):
+        return school_id in self.by_id
+
+    def get(self, school_id):
+        return self.by_id.get(school_id)
+
+    def get_many(self, school_ids, fields=None):
+        """按 id 取出多条记录，不存在的为 None；fields 为只需要的字段，可能只返回带这些属性的对象"""
+        get_many = getattr(self.by_id, "get_many", None)
+        if get_many:
+            return get_many(school_ids, fields)
+        return [self.by_id.get(school_id) for school_id in school_ids]
+
+    def _derive(self, records, by_id, table, search_index, key_index=None, aggregates=None):
+        dataset = SchoolDataset.__new__(SchoolDataset)
+        dataset.records = records
+        dataset.version = None
+        dataset.dataset_id = self.dataset_id
+        dataset.by_id = by_id
+        dataset._table = table
+        dataset._search_index = search_index
+        dataset._key_index = key_index
+        dataset._aggregates = aggregates
+        dataset._build_lock = threading.Lock()
+        return dataset
+
+    def with_added(self, new_records):
+        """返回在末尾追加 new_records 后的新快照"""
+        by_id = self.by_id.copy()
+        for school in new_records:
+            by_id[school.id] = school
+
+        table = self._table.extended(new_records) if self._table is not None else None
+        search_index = None
+        if self._search_index is not None:
+            search_index = self._search_index.copy()
+            for school in new_records:
+                search_index.add(school)
+        key_index = None
+        if self._key_index is not None:
+            key_index = self._key_index.copy()
+            for school in new_records:
+                add_to_key_index(key_index, school)
+        aggregates = self._aggregates.added(new_records) if self._aggregates is not None else None
+        return self._derive(self.records + list(new_records), by_id, table, search_index, key_index, aggregates)
+
+    def with_updated(self, updated_records):
+        """返回按 id 替换若干条记录后的新快照，记录的位置不变；不存在的 id 被忽略"""
+        updated_records = [school for school in updated_records if school.id in self.by_id]
+        if not updated_records:
+            return self
+
+        by_id = self.by_id.copy()
+        replacements = {}
+        for school in updated_records:
+            by_id[school.id] = school
+            replacements[school.id] = school
+        records, rows = _replace_records(self.records, replacements)
+
+        table = None
+        if self._table is not None:
+            table = self._table.with_rows(rows, [records[row] for row in rows])
+        search_index = None
+        if self._search_index is not None:
+            search_index = self._search_index.copy()
+            for school in updated_records:
+                search_index.remove(self.by_id[school.id])
+                search_index.add(school)
+        # 合并导入的更新不改变匹配键，键索引可以沿用
+        key_index = self._key_index
+        changed = [school for school in updated_records if dedup_key(school) != dedup_key(self.by_id[school.id])]
+        if key_index is not None and changed:
+            key_index = key_index.copy()
+            for school in changed:
+                remove_from_key_index(key_index, self.by_id[school.id])
+                add_to_key_index(key_index, school)
+        aggregates = None
+        if self._aggregates is not None:
+            aggregates = self._aggregates.removed(
+                [self.by_id[school.id] for school in updated_records]
+            ).added(updated_records)
+        return self._derive(records, by_id, table, search_index, key_index, aggregates)
+
+    def without_ids(self, school_ids):
+        """返回 (删除指定 id 后的新快照, 实际删除的 id 列表)"""
+        school_ids = set(school_ids)
+        removed = [school_id for school_id in school_ids if school_id in self.by_id]
+        if not removed:
+            return self, []
+
+        by_id = self.by_id.copy()
+        for school_id in removed:
+            del by_id[school_id]
+        # 旧版本分配的 id 可能重复，按 id 过滤可同时删除所有重复记录
+        records, removed_records = _remove_records(self.records, school_ids)
+        aggregates = None
+        if self._aggregates is not None:
+            aggregates = self._aggregates.removed(removed_records)
+
+        table = self._table.without_ids(removed) if self._table is not None else None
+        search_index = None
+        if self._search_index is not None:
+            search_index = self._search_index.copy()
+            for school_id in removed:
+                search_index.remove(self.by_id[school_id])
+        key_index = None
+        if self._key_index is not None:
+            key_index = self._key_index.copy()
+            for school in removed_records:
+                remove_from_key_index(key_index, school)
+        return self._derive(records, by_id, table, search_index, key_index, aggregates), removed
+
+    def search_mask(self, query, fields=SEARCH_FIELDS):
+        """返回在指定字段中包含 query 的记录行掩码"""
+        if not query.strip():
+            import numpy as np
+            return np.ones(len(self), dtype=bool)
+        return self.table.rows_for_ids(self.search_index.search(query, self.get_many, fields))
+
+
+def _replace_records(records, replacements):
+    """按 id 替换记录，返回 (新记录序列, 被替换的行号列表)"""
+    if hasattr(records, "replaced"):
+        return records.replaced(replacements)
+    records = list(records)
+    rows = [row for row, school in enumerate(records) if school.id in replacements]
+    for row in rows:
+        records[row] = replacements[records[row].id]
+    return records, rows
+
+
+def _remove_records(records, school_ids):
+    """删除 id 在 school_ids 中的所有记录，返回 (新记录序列, 被删除的记录列表)"""
+    if hasattr(records, "without_ids"):
+        return records.without_ids(school_ids)
+    kept, removed = [], []
+    for school in records:
+        (removed if school.id in school_ids else kept).append(school)
+    return kept, removed
+
+
+class SharedDataset:
+    """进程内所有会话共享的当前数据快照，写操作先写存储再发布派生的新快照"""
+
+    # 乐观提交的最大尝试次数，仍然冲突时在写锁内派生并写入
+    MAX_OPTIMISTIC_ATTEMPTS = 3
+
+    def __init__(self, load, generation, dataset_id=None, write_lock=None):
+        self._load = load
+        self._generation = generation
+        self._write_lock = write_lock or nullcontext
+        self.dataset_id = dataset_id or uuid.uuid4().hex
+        self._snapshot = None
+        self._lock = threading.RLock()
+
+    def snapshot(self):
+        """返回与存储当前版本一致的快照，版本变化时重新加载"""
+        version = self._generation()
+        current = self._snapshot
+        if current is not None and current.version == version:
+            return current
+
+        with self._lock:
+            current = self._snapshot
+            if current is None or current.version != version:
+                # 先读取版本号再加载数据，保证快照不旧于版本号
+                current = SchoolDataset(self._load(version), version, self.dataset_id)
+                self._snapshot = current
+            return current
+
+    def commit(self, derive, write):
+        """执行一次写操作（乐观并发，冲突时重新派生），返回 (是否成功, derive 的结果)；derive 可能被调用多次"""
+        with self._lock:
+            for attempt in range(self.MAX_OPTIMISTIC_ATTEMPTS):
+                last_attempt = attempt == self.MAX_OPTIMISTIC_ATTEMPTS - 1
+                with self._write_lock() if last_attempt else nullcontext():
+                    base = self.snapshot()
+                    updated, result = derive(base)
+                    if updated is base:
+                        return True, result
+                    with self._write_lock():
+                        if not last_attempt and self._generation() != base.version:
+                            continue
+                        return self._write(base, updated, result, write)
+
+    def _write(self, base, updated, result, write):
+        try:
+            version = write(updated, result)
+        except Exception as e:
+            print(f"保存数据时出错: {str(e)}")
+            # 存储可能已部分写入，下次读取时重新加载
+            self._snapshot = None
+            return False, result
+
+        if version == base.version + 1:
+            updated.version = version
+            self._snapshot = updated
+        else:
+            self._snapshot = None
+        return True, result
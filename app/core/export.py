@@ -0,0 +1,118 @@
+# 把查询结果按块流式导出为 CSV、XLSX 或 Parquet 文件，CSV 和 XLSX 文件可以直接重新导入
+import io
+
+import numpy as np
+
+from . import analytics
+from .record import YEARS
+
+# 每块转换、写出的行数
+CHUNK_ROWS = 5000
+
+# 格式 -> (文件扩展名, MIME 类型)
+FORMATS = {
+    "csv": (".csv", "text/csv"),
+    "xlsx": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+
+# 导出的列，顺序与 analytics.records_to_dataframe 一致（结果为空时也写出表头）
+EXPORT_COLUMNS = [
+    "学校名称", "学校地址", "调剂专业", "招生人数", "招生人数下限", "招生人数上限",
+    *(f"{year}{label}" for year in YEARS for label in ("最高分", "最低分")),
+    "邮箱", "电话", "备注",
+]
+_INTEGER_COLUMNS = {column for column in EXPORT_COLUMNS if column.endswith(("分", "下限", "上限"))}
+
+# xlsx 工作表的最大行数（含表头）
+XLSX_MAX_ROWS = 1048576
+
+
+class ExportError(Exception):
+    """导出格式不支持、缺少依赖或行数超出格式限制"""
+
+
+def _take(records, rows):
+    # 按需解码的记录序列（core.mapped.MappedRecords）可以一次解码一批行
+    take = getattr(records, "take", None)
+    if take is not None:
+        return take(rows)
+    return [records[row] for row in rows.tolist()]
+
+
+def iter_frames(records, rows=None, chunk_rows=CHUNK_ROWS):
+    """按块产出 rows 各行记录的 DataFrame；rows 为行号序列或 QueryResult，None 表示全部记录"""
+    import pandas as pd
+
+    rows = np.arange(len(records)) if rows is None else np.asarray(rows, dtype=np.int64)
+    if len(rows) == 0:
+        yield pd.DataFrame({column: [] for column in EXPORT_COLUMNS})
+        return
+    for start in range(0, len(rows), chunk_rows):
+        yield analytics.records_to_dataframe(_take(records, rows[start:start + chunk_rows]))
+
+
+def write_csv(frames, file):
+    for index, frame in enumerate(frames):
+        text = frame.to_csv(index=False, header=index == 0)
+        file.write(text.encode("utf-8-sig" if index == 0 else "utf-8"))
+
+
+def write_xlsx(frames, file, sheet_name="学校数据"):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    written = 0
+    for index, frame in enumerate(frames):
+        if index == 0:
+            sheet.append(list(frame.columns))
+            written += 1
+        written += len(frame)
+        if written > XLSX_MAX_ROWS:
+            raise ExportError(f"xlsx 最多 {XLSX_MAX_ROWS - 1} 行数据，请改用 CSV 或 Parquet 导出")
+        for row in frame.itertuples(index=False, name=None):
+            sheet.append(row)
+    workbook.save(file)
+
+
+def write_parquet(frames, file):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportError("导出 Parquet 需要安装 pyarrow（pip install pyarrow）") from None
+
+    # 招生人数可能是整数或范围字符串，统一按文本保存；列类型固定，空结果和各块的结构一致
+    schema = pa.schema([
+        (column, pa.int64() if column in _INTEGER_COLUMNS else pa.string()) for column in EXPORT_COLUMNS
+    ])
+    with pq.ParquetWriter(file, schema) as writer:
+        for frame in frames:
+            frame = frame.astype({"招生人数": str})
+            writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+
+
+_WRITERS = {"csv": write_csv, "xlsx": write_xlsx, "parquet": write_parquet}
+
+
+def export_records(records, file, export_format, rows=None, chunk_rows=CHUNK_ROWS):
+    """把 rows 各行记录按 export_format 写入二进制文件对象 file，返回导出的行数"""
+    if export_format not in _WRITERS:
+        raise ExportError(f"不支持的导出格式：{export_format}")
+    count = len(records) if rows is None else len(rows)
+    _WRITERS[export_format](iter_frames(records, rows, chunk_rows), file)
+    return count
+
+
+_template_bytes = None
+
+
+def template_bytes():
+    """导入模板 xlsx 文件的内容；只在首次使用时生成，之后直接返回内存中的字节"""
+    global _template_bytes
+    if _template_bytes is None:
+        buffer = io.BytesIO()
+        write_xlsx([analytics.create_template_data()], buffer, sheet_name="Sheet1")
+        _template_bytes = buffer.getvalue()
+    return _template_bytes
@@ -0,0 +1,138 @@
+# 磁盘上的图表缓存，按输入数据的内容指纹保存，超过上限时淘汰最久未用的文件
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+from .storage import get_data_dir
+
+# 缓存目录和大小上限（MB）可通过环境变量覆盖
+CACHE_DIR_ENV = "TIAOJI_FIGURE_CACHE_DIR"
+CACHE_SIZE_ENV = "TIAOJI_FIGURE_CACHE_MB"
+DEFAULT_MAX_MB = 64
+
+
+# 计算内容指纹：parts 需可 JSON 序列化（无法序列化的值按 str 处理）
+def fingerprint(*parts):
+    text = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=20).hexdigest()
+
+
+class FigureCache:
+    """按键保存图表 JSON 的磁盘 LRU 缓存，线程安全"""
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # 文件名 -> 大小，按最近使用时间从旧到新排列；首次使用时从目录加载
+        self._entries = None
+        self._total = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        files = []
+        if os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, entry.name, stat.st_size))
+        files.sort()
+        self._entries = OrderedDict((name, size) for _, name, size in files)
+        self._total = sum(self._entries.values())
+
+    def __len__(self):
+        with self._lock:
+            self._load()
+            return len(self._entries)
+
+    @property
+    def size(self):
+        with self._lock:
+            self._load()
+            return self._total
+
+    def get(self, key):
+        """返回缓存的 JSON 文本，不存在时返回 None"""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                payload = f.read()
+            # 更新修改时间，记录最近一次使用
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            self._load()
+            name = os.path.basename(path)
+            if name not in self._entries:
+                # 其他进程写入的缓存
+                self._entries[name] = len(payload.encode("utf-8"))
+                self._total += self._entries[name]
+            self._entries.move_to_end(name)
+        return payload
+
+    def put(self, key, payload):
+        data = payload.encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        temp_file = f"{path}.{os.getpid()}.{threading.get_ident()}.temp"
+        with open(temp_file, "wb") as f:
+            f.write(data)
+        os.replace(temp_file, path)
+
+        with self._lock:
+            self._load()
+            name = os.path.basename(path)
+            self._total += len(data) - self._entries.pop(name, 0)
+            self._entries[name] = len(data)
+            self._evict()
+
+    def _evict(self):
+        while self._total > self.max_bytes and self._entries:
+            name, size = self._entries.popitem(last=False)
+            self._total -= size
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._load()
+            for name in self._entries:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+            self._entries.clear()
+            self._total = 0
+            self.hits = 0
+            self.misses = 0
+
+
+_caches_lock = threading.Lock()
+_caches = {}
+
+
+# 获取当前数据目录对应的图表缓存（同一进程内复用同一个实例）
+def get_figure_cache():
+    directory = os.environ.get(CACHE_DIR_ENV) or os.path.join(get_data_dir(), "figure_cache")
+    max_bytes = int(float(os.environ.get(CACHE_SIZE_ENV) or DEFAULT_MAX_MB) * 1024 * 1024)
+    with _caches_lock:
+        if directory not in _caches:
+            _caches[directory] = FigureCache(directory, max_bytes)
+        return _caches[directory]
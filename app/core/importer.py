@@ -0,0 +1,320 @@
+import io
+import os
+import time
+import zipfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from .record import YEARS, SCORE_KINDS, School
+from .recruitment import parse_recruitment_series
+
+# 导入文件必须包含的列
+REQUIRED_COLUMNS = [
+    "学校名称", "学校地址", "调剂专业", "招生人数",
+    "2024最高分", "2024最低分", "2023最高分", "2023最低分",
+    "2022最高分", "2022最低分", "2021最高分", "2021最低分",
+    "邮箱", "电话"
+]
+
+TEXT_COLUMNS = ["学校名称", "学校地址", "调剂专业", "邮箱", "电话", "备注"]
+
+SCORE_LABELS = {"max": "最高分", "min": "最低分"}
+
+# 每批处理的行数
+DEFAULT_CHUNK_SIZE = 5000
+
+# 支持导入的文件类型；zip 压缩包中的这些文件会被逐个导入
+SUPPORTED_EXTENSIONS = (".xlsx", ".xls", ".csv")
+
+
+class ImportFormatError(ValueError):
+    """导入文件格式不符合要求（如缺少必要列）"""
+
+
+class ImportStats:
+    """一次导入的统计信息，用于衡量导入吞吐量"""
+
+    def __init__(self):
+        self.rows = 0
+        self.records = 0
+        self.batches = 0
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def __repr__(self):
+        return (f"ImportStats(rows={self.rows}, records={self.records}, batches={self.batches}, "
+                f"seconds={self.seconds:.3f}, rows_per_second={self.rows_per_second:.0f})")
+
+
+def _file_name(file):
+    return file if isinstance(file, str) else getattr(file, "name", "")
+
+
+def _iter_xlsx_chunks(file, chunksize):
+    import pandas as pd
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [str(col).strip() if col is not None else "" for col in header]
+
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunksize:
+                yield pd.DataFrame(chunk, columns=header)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=header)
+    finally:
+        workbook.close()
+
+
+def iter_file_chunks(file, chunksize=DEFAULT_CHUNK_SIZE):
+    """按块读取 Excel/CSV 文件，每块是一个 DataFrame"""
+    import pandas as pd
+
+    name = _file_name(file).lower()
+    if name.endswith('.xlsx'):
+        yield from _iter_xlsx_chunks(file, chunksize)
+    elif name.endswith('.xls'):
+        # 旧版 xls 格式不支持流式读取，整体读取后分块
+        df = pd.read_excel(file)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+    else:  # CSV文件，全部按文本读取，数值列在每块内统一转换
+        yield from pd.read_csv(file, chunksize=chunksize, dtype=str)
+
+
+def _text_column(df, column):
+    if column not in df.columns:
+        return [""] * len(df)
+    return df[column].fillna("").astype(str).tolist()
+
+
+def _score_column(df, column):
+    import pandas as pd
+    return pd.to_numeric(df[column], errors="coerce").fillna(0).astype(int).tolist()
+
+
+def _recruitment_column(df):
+    # 整数人数转换为 int，范围等其他写法（如"2-4"）保留原始字符串；空单元格记为 0
+    import pandas as pd
+    raw = df["招生人数"].fillna(0)
+    numeric = pd.to_numeric(raw, errors="coerce")
+    is_int = numeric.notna() & (numeric == numeric.round())
+    text = raw.astype(str).str.strip()
+    ints = numeric.where(is_int, 0).astype(int)
+    return [
+        int_value if flag else text_value
+        for flag, int_value, text_value in zip(is_int.tolist(), ints.tolist(), text.tolist())
+    ]
+
+
+def records_from_chunk(df, created_at):
+    """将一块 DataFrame 按列整体转换为学校记录列表（id 在写入存储时分配）"""
+    df = df[df["学校名称"].notna()]
+    names = df["学校名称"].astype(str)
+    # 跳过名称为空的行
+    df = df[names != ""]
+    if df.empty:
+        return []
+
+    text = {column: _text_column(df, column) for column in TEXT_COLUMNS}
+    # 每行 8 个分数，顺序与 School.scores 相同
+    score_rows = zip(*(
+        _score_column(df, f"{year}{SCORE_LABELS[kind]}") for year in YEARS for kind in SCORE_KINDS
+    ))
+    recruitment = _recruitment_column(df)
+    # 招生人数在导入时一次性解析为数值字段，之后的统计和筛选不再解析文本
+    import pandas as pd
+    low, high, _, _ = parse_recruitment_series(pd.Series(recruitment, dtype=object))
+
+    return [
+        School(None, name, address, major, count, scores, email, phone, remark, created_at, (low_value, high_value))
+        for name, address, major, count, scores, email, phone, remark, low_value, high_value in zip(
+            text["学校名称"], text["学校地址"], text["调剂专业"], recruitment, score_rows,
+            text["邮箱"], text["电话"], text["备注"], low, high,
+        )
+    ]
+
+
+def iter_import_batches(file, chunksize=DEFAULT_CHUNK_SIZE, stats=None):
+    """流式解析导入文件，逐批产出学校记录列表"""
+    stats = stats if stats is not None else ImportStats()
+    created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    started = time.perf_counter()
+
+    try:
+        for chunk in iter_file_chunks(file, chunksize):
+            if stats.batches == 0:
+                missing_columns = [col for col in REQUIRED_COLUMNS if col not in chunk.columns]
+                if missing_columns:
+                    raise ImportFormatError(f"上传的文件缺少以下必要列：{', '.join(missing_columns)}")
+
+            records = records_from_chunk(chunk, created_at)
+            stats.rows += len(chunk)
+            stats.records += len(records)
+            stats.batches += 1
+            if records:
+                yield records
+    finally:
+        stats.seconds = time.perf_counter() - started
+
+
+# 为记录分配存储中连续的新 id
+def assign_ids(records, storage):
+    first_id = storage.allocate_ids(len(records))
+    for offset, school in enumerate(records):
+        school.id = first_id + offset
+    return records
+
+
+def import_into_storage(file, storage, chunksize=DEFAULT_CHUNK_SIZE):
+    """将导入文件逐批直接写入存储，返回导入统计"""
+    stats = ImportStats()
+    for records in iter_import_batches(file, chunksize, stats):
+        storage.insert_many([school.to_json() for school in assign_ids(records, storage)])
+    return stats
+
+
+class FileResult:
+    """多文件导入中单个文件的解析结果；error 不为空时该文件没有解析出任何记录"""
+
+    def __init__(self, name, records=None, stats=None, error=None):
+        self.name = name
+        self.records = records or []
+        self.stats = stats or ImportStats()
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class BatchImport:
+    """一次多文件导入的解析结果，按上传顺序保存每个文件的结果"""
+
+    def __init__(self, files, seconds=0.0):
+        self.files = files
+        self.seconds = seconds
+
+    @property
+    def records(self):
+        """所有解析成功的文件合并后的记录（id 在写入存储时分配）"""
+        return [school for result in self.files if result.ok for school in result.records]
+
+    @property
+    def failed(self):
+        return [result for result in self.files if not result.ok]
+
+    @property
+    def rows(self):
+        return sum(result.stats.rows for result in self.files)
+
+
+def _zip_member_name(info):
+    # 未设置 UTF-8 标志的文件名按 cp437 解码，Windows 下压缩的中文文件名实际是 GBK
+    if info.flag_bits & 0x800:
+        return info.filename
+    try:
+        return info.filename.encode("cp437").decode("gbk")
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return info.filename
+
+
+def _zip_sources(name, data):
+    """返回压缩包中支持导入的文件 [(压缩包名/文件名, 内容)]，忽略目录和其他文件"""
+    sources = []
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        for info in archive.infolist():
+            member = _zip_member_name(info)
+            base = os.path.basename(member)
+            if info.is_dir() or member.startswith("__MACOSX/") or base.startswith("."):
+                continue
+            if base.lower().endswith(SUPPORTED_EXTENSIONS):
+                sources.append((f"{name}/{member}", archive.read(info)))
+    return sources
+
+
+def _read_bytes(file):
+    if isinstance(file, str):
+        with open(file, "rb") as f:
+            return f.read()
+    if hasattr(file, "getvalue"):
+        return file.getvalue()
+    file.seek(0)
+    return file.read()
+
+
+def _read_source(file):
+    """上传的文件对象读取为字节（才能传给解析进程）；文件路径原样返回，由解析进程自行读取"""
+    return file if isinstance(file, str) else _read_bytes(file)
+
+
+def parse_source(name, source, chunksize=DEFAULT_CHUNK_SIZE):
+    """解析单个文件（在进程池中运行），source 为内容字节或文件路径；错误记入结果而不是抛出"""
+    if isinstance(source, bytes):
+        file = io.BytesIO(source)
+        file.name = name
+    else:
+        file = source
+    stats = ImportStats()
+    try:
+        records = [school for batch in iter_import_batches(file, chunksize, stats) for school in batch]
+    except ImportFormatError as e:
+        return FileResult(name, stats=stats, error=str(e))
+    except Exception as e:
+        return FileResult(name, stats=stats, error=f"导入数据时出错：{str(e)}")
+    return FileResult(name, records, stats)
+
+
+def parse_files(files, max_workers=None, chunksize=DEFAULT_CHUNK_SIZE):
+    """在进程池中并行解析多个文件（zip 压缩包展开为其中的文件），返回 BatchImport"""
+    started = time.perf_counter()
+    results = []
+    pending = []
+    for file in files:
+        name = os.path.basename(_file_name(file))
+        if name.lower().endswith(".zip"):
+            try:
+                sources = _zip_sources(name, _read_bytes(file))
+            except (zipfile.BadZipFile, OSError) as e:
+                results.append(FileResult(name, error=f"无法读取压缩包：{str(e)}"))
+                continue
+            if not sources:
+                results.append(FileResult(name, error="压缩包中没有 Excel/CSV 文件"))
+                continue
+        else:
+            sources = [(name, _read_source(file))]
+        for source in sources:
+            pending.append((len(results), source))
+            results.append(None)
+
+    workers = min(len(pending), max_workers or os.cpu_count() or 1)
+    if workers <= 1:
+        for index, (name, source) in pending:
+            results[index] = parse_source(name, source, chunksize)
+    else:
+        # spawn 启动的子进程不继承 Web 服务的线程和锁
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = [
+                (index, name, pool.submit(parse_source, name, source, chunksize))
+                for index, (name, source) in pending
+            ]
+            for index, name, future in futures:
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    results[index] = FileResult(name, error=f"解析进程出错：{str(e)}")
+
+    return BatchImport(results, time.perf_counter() - started)
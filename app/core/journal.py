@@ -0,0 +1,122 @@
+import os
+import json
+import threading
+
+# 日志操作类型
+OP_ADD = "add"
+OP_DELETE = "delete"
+OP_UPDATE = "update"
+
+
+class ChangeJournal:
+    """追加写入的变更日志（JSON Lines），每行一条变更记录，回放是幂等的"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = None
+        self._size = None
+
+    def _load_stats(self):
+        # 其他进程也会追加或截断日志，文件大小与缓存的不一致时重新统计
+        try:
+            actual = os.path.getsize(self.path)
+        except FileNotFoundError:
+            actual = 0
+        if self._entries is None or actual != self._size:
+            entries, size = 0, 0
+            if os.path.exists(self.path):
+                with open(self.path, 'rb') as f:
+                    for line in f:
+                        size += len(line)
+                        if line.strip():
+                            entries += 1
+            self._entries, self._size = entries, size
+
+    @property
+    def entries(self):
+        with self._lock:
+            self._load_stats()
+            return self._entries
+
+    @property
+    def size(self):
+        with self._lock:
+            self._load_stats()
+            return self._size
+
+    def append(self, *changes):
+        """追加若干条变更，一次顺序写入"""
+        payload = "".join(json.dumps(change, ensure_ascii=False) + "\n" for change in changes).encode('utf-8')
+        with self._lock:
+            self._load_stats()
+            with open(self.path, 'ab') as f:
+                f.write(payload)
+            self._entries += len(changes)
+            self._size += len(payload)
+
+    def read(self, start=0, end=None):
+        """读取 [start, end) 字节范围内的日志内容"""
+        if not os.path.exists(self.path):
+            return b""
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            return f.read() if end is None else f.read(max(0, end - start))
+
+    def truncate_head(self, offset):
+        """丢弃前 offset 字节（已合并进快照的变更），保留之后新追加的变更"""
+        with self._lock:
+            tail = self.read(offset)
+            temp_file = f"{self.path}.{os.getpid()}.temp"
+            with open(temp_file, 'wb') as f:
+                f.write(tail)
+            os.replace(temp_file, self.path)
+            self._entries = sum(1 for line in tail.splitlines() if line.strip())
+            self._size = len(tail)
+
+    def reset(self):
+        with self._lock:
+            with open(self.path, 'wb'):
+                pass
+            self._entries, self._size = 0, 0
+
+
+def apply_changes(records, raw):
+    """将日志内容（bytes）中的变更依次应用到记录上，返回新的记录列表；重复 id 的记录各自保留"""
+    if not raw:
+        return records
+
+    records = list(records)
+    # id -> 该 id 所有记录的位置；删除的位置置为 None，最后统一去掉
+    positions = {}
+    for position, school in enumerate(records):
+        positions.setdefault(school["id"], []).append(position)
+    for line in raw.splitlines():
+        if not line.strip():
+            continue
+        try:
+            change = json.loads(line)
+        except ValueError:
+            # 写入中断留下的不完整行，忽略
+            continue
+
+        op = change.get("op")
+        if op == OP_ADD:
+            for school in change["records"]:
+                # 新增的 id 由分配器发出，已存在说明日志被重复回放，原位替换即可
+                if school["id"] in positions:
+                    for position in positions[school["id"]]:
+                        records[position] = school
+                else:
+                    positions[school["id"]] = [len(records)]
+                    records.append(school)
+        elif op == OP_UPDATE:
+            # 只更新仍然存在的记录，已被删除的记录不会因更新而恢复
+            for school in change["records"]:
+                for position in positions.get(school["id"], ()):
+                    records[position] = school
+        elif op == OP_DELETE:
+            for school_id in change["ids"]:
+                for position in positions.pop(school_id, ()):
+                    records[position] = None
+    return [school for school in records if school is not None]
@@ -0,0 +1,478 @@
+# 内存映射的只读数据快照，同一台机器上的多个服务进程共享同一个按版本生成的文件
+import os
+import mmap
+import hashlib
+import weakref
+import operator
+import threading
+from types import SimpleNamespace
+from bisect import bisect_left
+from functools import partial
+from contextlib import nullcontext
+from collections.abc import MutableMapping, Sequence
+
+import numpy as np
+
+from .columnar import ScoreTable
+from .record import School
+from .search_index import BigramIndex
+from .snapshot import (
+    code_dtype, decode_fields, decode_rows, decode_string, decode_strings, encode_records, map_arrays, parse_header,
+    string_table, write_arrays,
+)
+from .storage import get_data_dir
+from .upsert import add_to_key_index, dedup_key, remove_from_key_index
+
+# 迭代记录时每批解码的行数
+CHUNK_ROWS = 4096
+
+# ScoreTable 中按行存放的数值列
+_NUMERIC_COLUMNS = ("ids", "has_email", "scores_max", "scores_min", "recruitment_low", "recruitment_high")
+_TEXT_COLUMNS = ("names", "addresses", "majors")
+
+
+def encode_image(records):
+    """School 列表 -> (各列类型, 数组字典)：二进制快照的各列加上 ScoreTable 的各列、搜索倒排表和匹配键表"""
+    kinds, arrays = encode_records([school.to_json() for school in records])
+    table = ScoreTable.from_records(records)
+    for column in _NUMERIC_COLUMNS:
+        arrays[f"table.{column}"] = getattr(table, column)
+    for column in _TEXT_COLUMNS:
+        values, codes = table.categories(column)
+        arrays[f"table.{column}.codes"] = codes.reshape(-1).astype(code_dtype(len(values)))
+        arrays[f"table.{column}.offsets"], arrays[f"table.{column}.blob"] = string_table(values.tolist())
+    # 稳定排序后，同一 id 的最后一条记录排在最后，与按 id 建字典时后者覆盖前者一致
+    order = np.argsort(table.ids, kind="stable")
+    arrays["table.id_order"] = order
+    arrays["table.sorted_ids"] = table.ids[order]
+    _encode_postings(records, arrays)
+    _encode_keys(records, table.ids, arrays)
+    return kinds, arrays
+
+
+def _encode_postings(records, arrays):
+    """搜索倒排表：按字符串排序的二元组表，和每个二元组的有序 id 数组首尾相接"""
+    postings = BigramIndex.build(records).postings()
+    grams = sorted(postings)
+    arrays["search.grams.offsets"], arrays["search.grams.blob"] = string_table(grams)
+    offsets = np.zeros(len(grams) + 1, dtype=np.int64)
+    np.cumsum([len(postings[gram]) for gram in grams], out=offsets[1:])
+    arrays["search.offsets"] = offsets
+    arrays["search.ids"] = np.fromiter(
+        (school_id for gram in grams for school_id in sorted(postings[gram])), dtype=np.int64, count=offsets[-1],
+    )
+
+
+def _key_halves(key):
+    """匹配键（128 位十六进制）-> (高 64 位, 低 64 位)"""
+    return int(key[:16], 16), int(key[16:], 16)
+
+
+def _encode_keys(records, ids, arrays):
+    """匹配键表：按 (键, id) 排序的键高低位和 id"""
+    halves = np.array([_key_halves(dedup_key(school)) for school in records], dtype=np.uint64).reshape(-1, 2)
+    order = np.lexsort((ids, halves[:, 1], halves[:, 0]))
+    arrays["keys.high"] = halves[order, 0]
+    arrays["keys.low"] = halves[order, 1]
+    arrays["keys.ids"] = ids[order]
+
+
+class MappedImage:
+    """以只读内存映射打开的快照文件，数组都是映射内存上的视图"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.path = path
+        self.header, data_start = parse_header(self._buffer)
+        self.arrays = map_arrays(self._buffer, self.header, data_start)
+        self.count = self.header["count"]
+        # 生成文件的存储标识和数据版本号
+        self.source = self.header["source"]
+
+    def decode(self, rows):
+        return [School.from_json(data) for data in decode_rows(self.header, self.arrays, rows)]
+
+    def decode_fields(self, rows, fields):
+        """只解码 rows 各行记录的若干文本字段，返回以字段为属性的对象"""
+        return [SimpleNamespace(**values) for values in decode_fields(self.header, self.arrays, rows, fields)]
+
+    def rows_of(self, school_ids):
+        """row_of 的批量版本，不存在的 id 对应 -1"""
+        sorted_ids = self.arrays["table.sorted_ids"]
+        school_ids = np.asarray(school_ids, dtype=np.int64)
+        rows = np.full(len(school_ids), -1, dtype=np.int64)
+        positions = np.searchsorted(sorted_ids, school_ids, side="right") - 1
+        found = positions >= 0
+        found[found] = sorted_ids[positions[found]] == school_ids[found]
+        rows[found] = self.arrays["table.id_order"][positions[found]]
+        return rows
+
+    def row_of(self, school_id):
+        """返回 id 对应记录的行号（重复时取最后一条），不存在时返回 None"""
+        if isinstance(school_id, bool) or not isinstance(school_id, (int, np.integer)):
+            return None
+        sorted_ids = self.arrays["table.sorted_ids"]
+        try:
+            position = int(np.searchsorted(sorted_ids, school_id, side="right")) - 1
+        except OverflowError:
+            return None
+        if position < 0 or sorted_ids[position] != school_id:
+            return None
+        return int(self.arrays["table.id_order"][position])
+
+    def score_table(self):
+        """返回直接使用映射数组的 ScoreTable；文本列在首次使用时只解码不重复取值"""
+        columns = {column: self.arrays[f"table.{column}"] for column in _NUMERIC_COLUMNS}
+        for column in _TEXT_COLUMNS:
+            columns[column] = partial(self._categories, column)
+        return ScoreTable(**columns)
+
+    def _categories(self, column):
+        values = decode_strings(self.arrays[f"table.{column}.offsets"], self.arrays[f"table.{column}.blob"])
+        return np.array(values, dtype=str), self.arrays[f"table.{column}.codes"]
+
+
+class MappedRecords(Sequence):
+    """按需从快照文件解码的只读记录序列；order 的负数 -k-1 表示 extra 中的第 k 条记录"""
+
+    def __init__(self, image, order=None, extra=()):
+        self.image = image
+        self.order = order
+        self.extra = list(extra)
+
+    def __len__(self):
+        if self.order is None:
+            return self.image.count + len(self.extra)
+        return len(self.order)
+
+    def _sources(self, positions):
+        positions = np.asarray(positions, dtype=np.int64)
+        if self.order is None:
+            return np.where(positions < self.image.count, positions, self.image.count - 1 - positions)
+        return self.order[positions]
+
+    def _decode(self, positions):
+        sources = self._sources(positions)
+        from_image = sources >= 0
+        records = [None] * len(sources)
+        for index, school in zip(np.flatnonzero(from_image).tolist(), self.image.decode(sources[from_image])):
+            records[index] = school
+        for index in np.flatnonzero(~from_image).tolist():
+            records[index] = self.extra[-1 - int(sources[index])]
+        return records
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return self._decode(np.arange(len(self))[position])
+        position = operator.index(position)
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("记录位置超出范围")
+        return self._decode([position])[0]
+
+    def __iter__(self):
+        for start in range(0, len(self), CHUNK_ROWS):
+            yield from self._decode(np.arange(start, min(start + CHUNK_ROWS, len(self))))
+
+    def take(self, positions):
+        """一次解码多个位置的记录"""
+        return self._decode(positions)
+
+    def _overlay(self):
+        """返回 (快照中已不在序列里的记录, 序列中叠加的记录)，用于在快照的索引上补上变更"""
+        if self.order is None:
+            return [], list(self.extra)
+        present = np.zeros(self.image.count, dtype=bool)
+        present[self.order[self.order >= 0]] = True
+        added = [self.extra[-1 - source] for source in self.order[self.order < 0].tolist()]
+        return self.image.decode(np.flatnonzero(~present)), added
+
+    def __add__(self, records):
+        records = list(records)
+        order = self.order
+        if order is not None:
+            order = np.concatenate([order, -1 - len(self.extra) - np.arange(len(records))])
+        return MappedRecords(self.image, order, self.extra + records)
+
+    def ids(self):
+        """每个位置的记录 id"""
+        sources = self._sources(np.arange(len(self)))
+        ids = np.empty(len(sources), dtype=np.int64)
+        from_image = sources >= 0
+        ids[from_image] = self.image.arrays["table.ids"][sources[from_image]]
+        ids[~from_image] = [self.extra[-1 - source].id for source in sources[~from_image].tolist()]
+        return ids
+
+    def replaced(self, replacements):
+        """按 id 替换记录，返回 (新序列, 被替换的位置列表)；replacements 为 id -> 新记录"""
+        ids = self.ids()
+        rows = np.flatnonzero(np.isin(ids, np.fromiter(replacements, dtype=np.int64, count=len(replacements))))
+        order = self._sources(np.arange(len(self)))
+        extra = list(self.extra)
+        for row in rows.tolist():
+            order[row] = -1 - len(extra)
+            extra.append(replacements[int(ids[row])])
+        return MappedRecords(self.image, order, extra), rows.tolist()
+
+    def without_ids(self, school_ids):
+        """删除指定 id 的所有记录，返回 (新序列, 被删除的记录列表)"""
+        removed = np.isin(self.ids(), np.fromiter(school_ids, dtype=np.int64, count=len(school_ids)))
+        records = self._decode(np.flatnonzero(removed))
+        order = self._sources(np.flatnonzero(~removed))
+        return MappedRecords(self.image, order, self.extra), records
+
+    def score_table(self):
+        """未叠加变更时返回直接使用映射数组的 ScoreTable，否则返回 None"""
+        if self.order is None and not self.extra:
+            return self.image.score_table()
+        return None
+
+    def id_index(self):
+        index = MappedIdIndex(self.image)
+        removed, added = self._overlay()
+        for school in removed:
+            index.pop(school.id, None)
+        for school in added:
+            index[school.id] = school
+        return index
+
+    def search_index(self):
+        """以映射的倒排表为底层的搜索索引，叠加的变更记在增量层"""
+        index = BigramIndex.over(MappedPostings(self.image), len(self.image.arrays["search.ids"]))
+        removed, added = self._overlay()
+        if removed or added:
+            index = index.copy()
+            for school in removed:
+                index.remove(school)
+            for school in added:
+                index.add(school)
+        return index
+
+    def key_index(self):
+        """以映射的匹配键表为底层的键索引，叠加的变更记在进程内"""
+        index = MappedKeyIndex(self.image)
+        removed, added = self._overlay()
+        for school in removed:
+            remove_from_key_index(index, school)
+        for school in added:
+            add_to_key_index(index, school)
+        return index
+
+
+class MappedIdSet:
+    """映射数组上的有序 id 集合"""
+
+    def __init__(self, ids):
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.ids.tolist())
+
+    def __contains__(self, school_id):
+        position = int(np.searchsorted(self.ids, school_id))
+        return position < len(self.ids) and self.ids[position] == school_id
+
+
+class MappedPostings:
+    """映射文件中的只读倒排表，二元组按字符串顺序排列，查找时二分"""
+
+    def __init__(self, image):
+        arrays = image.arrays
+        self._gram_offsets, self._gram_blob = arrays["search.grams.offsets"], arrays["search.grams.blob"]
+        self._offsets, self._ids = arrays["search.offsets"], arrays["search.ids"]
+        self._count = len(self._offsets) - 1
+
+    def _gram(self, position):
+        return decode_string(self._gram_offsets, self._gram_blob, position)
+
+    def get(self, gram, default=None):
+        position = bisect_left(range(self._count), gram, key=self._gram)
+        if position == self._count or self._gram(position) != gram:
+            return default
+        return MappedIdSet(self._ids[self._offsets[position]:self._offsets[position + 1]])
+
+
+class MappedKeyIndex(MutableMapping):
+    """匹配键 -> 同键记录 id 元组 的索引：快照中的键在映射的有序键表中查找，变更记在进程内"""
+
+    def __init__(self, image, changes=None):
+        self.image = image
+        # 匹配键 -> 新的 id 元组，None 表示已删除
+        self._changes = changes or {}
+
+    def _lookup(self, key):
+        try:
+            high, low = _key_halves(key)
+        except (TypeError, ValueError):
+            return ()
+        arrays = self.image.arrays
+        high = np.uint64(high)
+        start = int(np.searchsorted(arrays["keys.high"], high, side="left"))
+        end = int(np.searchsorted(arrays["keys.high"], high, side="right"))
+        ids = arrays["keys.ids"][start:end][arrays["keys.low"][start:end] == np.uint64(low)]
+        return tuple(ids.tolist())
+
+    def __getitem__(self, key):
+        ids = self._changes[key] if key in self._changes else self._lookup(key)
+        if not ids:
+            raise KeyError(key)
+        return ids
+
+    def __setitem__(self, key, ids):
+        self._changes[key] = ids
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._changes[key] = None
+
+    def __iter__(self):
+        high, low = self.image.arrays["keys.high"], self.image.arrays["keys.low"]
+        starts = np.flatnonzero(np.r_[True, (high[1:] != high[:-1]) | (low[1:] != low[:-1])]) if len(high) else []
+        for position in np.asarray(starts).tolist():
+            key = f"{int(high[position]):016x}{int(low[position]):016x}"
+            if key not in self._changes:
+                yield key
+        for key, ids in self._changes.items():
+            if ids:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def copy(self):
+        return MappedKeyIndex(self.image, dict(self._changes))
+
+
+class MappedIdIndex(MutableMapping):
+    """id -> 记录 的索引：快照中的记录在映射的有序 id 表中查找，变更记在进程内"""
+
+    def __init__(self, image, changes=None):
+        self.image = image
+        # id -> 新记录，None 表示已删除
+        self._changes = changes or {}
+
+    def __getitem__(self, school_id):
+        if school_id in self._changes:
+            school = self._changes[school_id]
+        else:
+            row = self.image.row_of(school_id)
+            school = None if row is None else self.image.decode([row])[0]
+        if school is None:
+            raise KeyError(school_id)
+        return school
+
+    def __setitem__(self, school_id, school):
+        self._changes[school_id] = school
+
+    def get_many(self, school_ids, fields=None):
+        """按 id 取出多条记录，不存在的为 None；快照中的记录一次解码，给出 fields 时只解码这些字段"""
+        records = [self._changes.get(school_id) for school_id in school_ids]
+        pending = [index for index, school_id in enumerate(school_ids) if school_id not in self._changes]
+        rows = self.image.rows_of([school_ids[index] for index in pending])
+        found = rows >= 0
+        decoded = self.image.decode(rows[found]) if fields is None else self.image.decode_fields(rows[found], fields)
+        for index, school in zip(np.flatnonzero(found).tolist(), decoded):
+            records[pending[index]] = school
+        return records
+
+    def __delitem__(self, school_id):
+        if school_id not in self:
+            raise KeyError(school_id)
+        self._changes[school_id] = None
+
+    def __iter__(self):
+        for school_id in np.unique(self.image.arrays["table.sorted_ids"]).tolist():
+            if school_id not in self._changes:
+                yield school_id
+        for school_id, school in self._changes.items():
+            if school is not None:
+                yield school_id
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def copy(self):
+        return MappedIdIndex(self.image, dict(self._changes))
+
+
+class MappedStore:
+    """目录中按存储和数据版本号保存的快照文件，文件名为 <name>.<存储标识>.<版本号>.bin；
+    source 为存储的标识（BaseStorage.key），不同存储的版本号各自计数，文件不能混用"""
+
+    def __init__(self, directory, source, name="schools"):
+        self.directory = directory
+        self.name = name
+        self.tag = hashlib.blake2b(repr(tuple(source)).encode("utf-8"), digest_size=6).hexdigest()
+        # 本进程已映射的文件，同一版本只映射一次
+        self._images = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def path(self, generation):
+        return os.path.join(self.directory, f"{self.name}.{self.tag}.{generation}.bin")
+
+    def _open(self, generation):
+        path = self.path(generation)
+        with self._lock:
+            image = self._images.get(path)
+            if image is None:
+                try:
+                    image = MappedImage(path)
+                except (OSError, ValueError):
+                    return None
+                if image.source != [self.tag, generation]:
+                    return None
+                self._images[path] = image
+            return image
+
+    def load(self, generation, current, load, lock=nullcontext):
+        """返回不旧于 generation 版本的 MappedRecords，需要时在 lock() 内生成该版本的快照文件"""
+        image = self._open(generation) if generation is not None else None
+        if image is None:
+            with lock():
+                latest = current()
+                image = self._open(latest)
+                if image is None:
+                    self._write(latest, load())
+                    image = self._open(latest)
+                    self._remove_older(latest)
+        return MappedRecords(image)
+
+    def _write(self, generation, records):
+        kinds, arrays = encode_image(records)
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(generation)
+        temp_file = f"{path}.{os.getpid()}.temp"
+        write_arrays(temp_file, len(records), kinds, arrays, [self.tag, generation])
+        os.replace(temp_file, path)
+
+    def _remove_older(self, generation):
+        prefix = f"{self.name}.{self.tag}."
+        for entry in os.scandir(self.directory):
+            version = entry.name[len(prefix):-len(".bin")]
+            if entry.name.startswith(prefix) and entry.name.endswith(".bin") and version.isdigit() \
+                    and int(version) < generation:
+                # 仍被其他进程映射的文件在 Windows 上无法删除，留到下次再清理
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+
+_stores_lock = threading.Lock()
+_stores = {}
+
+
+# 获取当前数据目录中 source 存储对应的快照文件（同一进程内复用同一个实例）
+def get_store(source):
+    directory = os.path.join(get_data_dir(), "mapped")
+    source = tuple(source)
+    with _stores_lock:
+        if (directory, source) not in _stores:
+            _stores[directory, source] = MappedStore(directory, source)
+        return _stores[directory, source]
@@ -0,0 +1,189 @@
+# 每次页面运行（rerun）的耗时和计数统计；没有绑定统计对象时计时和计数都是空操作
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+_local = threading.local()
+_sinks = []
+
+
+class Rerun:
+    """一次页面运行的统计：各阶段耗时、计数和缓存命中/未命中次数"""
+
+    def __init__(self, **labels):
+        self.labels = labels
+        self.started_at = datetime.now().isoformat(timespec="milliseconds")
+        self.page = None
+        self.status = None
+        self.total = None
+        self.timers = {}
+        self.counters = {}
+        self.cache = {}
+        self._started = time.perf_counter()
+        self._page_started = None
+
+    @property
+    def finished(self):
+        return self.status is not None
+
+    def add_time(self, name, seconds):
+        calls, total = self.timers.get(name, (0, 0.0))
+        self.timers[name] = (calls + 1, total + seconds)
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def record_cache(self, name, hit):
+        stats = self.cache.setdefault(name, {"hits": 0, "misses": 0})
+        stats["hits" if hit else "misses"] += 1
+
+    def cache_misses(self, name):
+        return self.cache.get(name, {}).get("misses", 0)
+
+    # 记录进入的页面分支，页面耗时从这里计到运行结束
+    def enter_page(self, page):
+        self.page = page
+        self._page_started = time.perf_counter()
+
+    def finish(self, status="ok"):
+        now = time.perf_counter()
+        if self._page_started is not None:
+            self.add_time(f"page.{self.page}", now - self._page_started)
+        self.total = now - self._started
+        self.status = status
+
+    def to_dict(self):
+        return {
+            "started_at": self.started_at,
+            **self.labels,
+            "page": self.page,
+            "status": self.status,
+            "total_ms": round(self.total * 1000, 3) if self.total is not None else None,
+            "timers": {
+                name: {"calls": calls, "ms": round(total * 1000, 3)}
+                for name, (calls, total) in self.timers.items()
+            },
+            "counters": dict(self.counters),
+            "cache": {name: dict(stats) for name, stats in self.cache.items()},
+        }
+
+
+# 获取当前线程正在统计的运行，没有时返回 None
+def current():
+    return getattr(_local, "rerun", None)
+
+
+# 开始统计一次运行并绑定到当前线程
+def start_rerun(**labels):
+    rerun = Rerun(**labels)
+    _local.rerun = rerun
+    return rerun
+
+
+# 结束统计并写入各输出；重复调用不会重复记录
+def finish_rerun(rerun, status="ok"):
+    if current() is rerun:
+        _local.rerun = None
+    if rerun.finished:
+        return rerun
+    rerun.finish(status)
+    record = rerun.to_dict()
+    for sink in list(_sinks):
+        try:
+            sink(record)
+        except Exception as e:
+            print(f"写入性能记录时出错: {str(e)}")
+    return rerun
+
+
+# 注册运行结束后的输出函数，接收 Rerun.to_dict() 的结果
+def add_sink(sink):
+    if sink not in _sinks:
+        _sinks.append(sink)
+
+
+def remove_sink(sink):
+    if sink in _sinks:
+        _sinks.remove(sink)
+
+
+@contextmanager
+def timer(name):
+    rerun = current()
+    if rerun is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        rerun.add_time(name, time.perf_counter() - started)
+
+
+# 计时装饰器，默认以“模块名.函数名”命名
+def timed(name=None):
+    def decorator(func):
+        label = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if current() is None:
+                return func(*args, **kwargs)
+            with timer(label):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def count(name, n=1):
+    rerun = current()
+    if rerun is not None:
+        rerun.count(name, n)
+
+
+def record_cache(name, hit):
+    rerun = current()
+    if rerun is not None:
+        rerun.record_cache(name, hit)
+
+
+class JsonlLog:
+    """按大小轮转的 JSON Lines 日志，每行一次运行的统计，便于离线分析"""
+
+    def __init__(self, path, max_bytes=5 * 1024 * 1024, backup_count=3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._lock = threading.Lock()
+
+    def __call__(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            if self.max_bytes and os.path.exists(self.path) and os.path.getsize(self.path) + len(line) > self.max_bytes:
+                self._rotate()
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+    # perf.jsonl -> perf.jsonl.1 -> ... -> perf.jsonl.N，最旧的一份被丢弃
+    def _rotate(self):
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def __eq__(self, other):
+        return isinstance(other, JsonlLog) and other.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
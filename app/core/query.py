@@ -0,0 +1,244 @@
+# 学校数据的结构化查询：SchoolQuery 规范化筛选条件，run_query 按快照缓存向量化筛选的结果
+import numpy as np
+
+from . import metrics
+from .cache import LRUCache
+from .columnar import SORT_KEYS, YEARS, sorted_rows
+from .search_index import SEARCH_FIELDS
+
+SCORE_KINDS = ("max", "min")
+
+
+def _bound(value):
+    return None if value is None else int(value)
+
+
+def _merge_ranges(ranges):
+    """合并同一键的多个范围（取交集），去掉上下限都不限的范围"""
+    merged = {}
+    for key, low, high in ranges:
+        low, high = _bound(low), _bound(high)
+        if key in merged:
+            old_low, old_high = merged[key]
+            low = old_low if low is None else low if old_low is None else max(low, old_low)
+            high = old_high if high is None else high if old_high is None else min(high, old_high)
+        merged[key] = (low, high)
+    return tuple(
+        (*key, low, high) for key, (low, high) in sorted(merged.items())
+        if low is not None or high is not None
+    )
+
+
+def _keywords(values):
+    return tuple(sorted({str(value).strip() for value in values if str(value).strip()}))
+
+
+class SchoolQuery:
+    """规范化后的筛选条件，可哈希，相等的查询命中同一份缓存"""
+
+    def __init__(self, text="", fields=SEARCH_FIELDS, scores=(), spreads=(), regions=(),
+                 majors=(), recruitment=None, has_email=None):
+        self.text = text.strip()
+        self.fields = tuple(sorted(set(fields))) if self.text else ()
+
+        for year, kind, _, _ in scores:
+            if year not in YEARS or kind not in SCORE_KINDS:
+                raise ValueError(f"不支持的分数条件：{year} {kind}")
+        for year, _, _ in spreads:
+            if year not in YEARS:
+                raise ValueError(f"不支持的年份：{year}")
+        # 分数都不小于 0，下限 0 等于不限
+        self.scores = _merge_ranges(
+            ((year, kind), low if low else None, high) for year, kind, low, high in scores
+        )
+        self.spreads = _merge_ranges(
+            ((year,), low if low else None, high) for year, low, high in spreads
+        )
+
+        self.regions = _keywords(regions)
+        self.majors = _keywords(majors)
+        self.recruitment = None if recruitment is None else tuple(int(value) for value in recruitment)
+        self.has_email = None if has_email is None else bool(has_email)
+
+    @property
+    def key(self):
+        return (self.text, self.fields, self.scores, self.spreads, self.regions,
+                self.majors, self.recruitment, self.has_email)
+
+    def __eq__(self, other):
+        return isinstance(other, SchoolQuery) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f"SchoolQuery{self.key!r}"
+
+    def __bool__(self):
+        """是否包含任何条件"""
+        return any(value not in ("", (), None) for value in self.key)
+
+
+def _range_mask(values, low, high):
+    if low is None:
+        return values <= high
+    if high is None:
+        return values >= low
+    return (values >= low) & (values <= high)
+
+
+def _category_mask(table, column, match):
+    """按文本列的不重复取值计算条件，再映射回每一行"""
+    values, codes = table.categories(column)
+    return match(values)[codes]
+
+
+def compile_query(query):
+    """把查询编译为一组 mask(dataset) 函数，所有掩码的交集即查询结果"""
+    masks = []
+
+    for year, kind, low, high in query.scores:
+        column = YEARS.index(year)
+        scores = "scores_max" if kind == "max" else "scores_min"
+        masks.append(lambda dataset, scores=scores, column=column, low=low, high=high:
+                     _range_mask(getattr(dataset.table, scores)[:, column], low, high))
+
+    for year, low, high in query.spreads:
+        column = YEARS.index(year)
+        masks.append(lambda dataset, column=column, low=low, high=high: _range_mask(
+            dataset.table.scores_max[:, column] - dataset.table.scores_min[:, column], low, high
+        ))
+
+    if query.recruitment is not None:
+        low, high = query.recruitment
+        masks.append(lambda dataset: (dataset.table.recruitment_high >= low)
+                     & (dataset.table.recruitment_low <= high))
+
+    if query.has_email is not None:
+        masks.append(lambda dataset: dataset.table.has_email == query.has_email)
+
+    if query.majors:
+        majors = np.array(query.majors, dtype=str)
+        masks.append(lambda dataset: _category_mask(
+            dataset.table, "majors", lambda values: np.isin(values, majors)
+        ))
+
+    if query.regions:
+        def region_mask(dataset):
+            def match(values):
+                matched = np.zeros(len(values), dtype=bool)
+                for keyword in query.regions:
+                    matched |= np.char.find(values, keyword) >= 0
+                return matched
+            return _category_mask(dataset.table, "addresses", match)
+        masks.append(region_mask)
+
+    # 全文搜索最慢，放在最后
+    if query.text:
+        masks.append(lambda dataset: dataset.search_mask(query.text, query.fields))
+
+    return masks
+
+
+def filter_mask(dataset, query):
+    """返回满足查询的记录行掩码"""
+    mask = None
+    for compute in compile_query(query):
+        current = compute(dataset)
+        mask = current if mask is None else mask & current
+        if not mask.any():
+            break
+    if mask is None:
+        return np.ones(len(dataset), dtype=bool)
+    return mask
+
+
+def filter_rows(dataset, query):
+    """返回满足查询的记录行号（按记录列表顺序）"""
+    return np.flatnonzero(filter_mask(dataset, query))
+
+
+class QueryResult:
+    """一次查询的结果：满足条件的行数，以及按排序方式按需生成的行号"""
+
+    def __init__(self, mask, order=None):
+        self.mask = mask
+        self.count = int(np.count_nonzero(mask))
+        # order 为 None 时按记录列表顺序
+        self._order = order
+        # (已生成的行号, 已扫描的排列长度)，整体替换保证两者一致
+        if order is None:
+            self._prefix = (np.flatnonzero(mask), len(mask))
+        else:
+            self._prefix = (np.empty(0, dtype=np.int64), 0)
+
+    def __len__(self):
+        return self.count
+
+    def head(self, k):
+        """返回前 k 个行号"""
+        k = min(k, self.count)
+        prefix = self._prefix
+        rows, scanned = prefix
+        while len(rows) < k:
+            # 按整体命中率估计还需扫描的长度，通常一次即可凑够
+            needed = k - len(rows)
+            step = needed * len(self.mask) // self.count + needed
+            chunk = self._order[scanned:scanned + step]
+            rows = np.concatenate([rows, chunk[self.mask[chunk]]])
+            scanned += len(chunk)
+        if len(rows) > len(prefix[0]):
+            self._prefix = (rows, scanned)
+        head = rows[:k]
+        head.flags.writeable = False
+        return head
+
+    def rows(self):
+        """返回全部行号"""
+        return self.head(self.count)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            start, stop, _ = item.indices(self.count)
+            return self.head(stop)[item]
+        if item < 0:
+            item += self.count
+        if not 0 <= item < self.count:
+            raise IndexError(item)
+        return self.head(item + 1)[item]
+
+    def __iter__(self):
+        return iter(self.rows())
+
+    def __array__(self, dtype=None, copy=None):
+        rows = self.rows()
+        return rows if dtype is None else rows.astype(dtype)
+
+
+_results = LRUCache(maxsize=128)
+
+
+@metrics.timed()
+def run_query(dataset, query, sort_option=None):
+    """返回满足查询并按 sort_option 排序的 QueryResult，所有会话共用缓存"""
+    key = (dataset.cache_key, query.key, sort_option)
+    result = _results.get(key)
+    metrics.record_cache("query.run_query", result is not None)
+    if result is None:
+        mask = filter_mask(dataset, query)
+        order = None
+        if sort_option in SORT_KEYS:
+            sort_key, descending = SORT_KEYS[sort_option]
+            order = dataset.table.sort_index(sort_key, descending).order
+        mask.flags.writeable = False
+        result = QueryResult(mask, order)
+        _results.put(key, result)
+    return result
+
+
+def run_any(dataset, queries, sort_option=None):
+    """返回满足任一查询的记录行号（并集）"""
+    mask = np.zeros(len(dataset), dtype=bool)
+    for query in queries:
+        mask |= run_query(dataset, query).mask
+    return sorted_rows(dataset.table, mask, sort_option)
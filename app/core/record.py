@@ -0,0 +1,144 @@
+# 内存中的学校记录类型 School，与存储的 JSON 结构之间只在读写存储、导入文件时转换
+import sys
+from array import array
+
+from .recruitment import parse_recruitment, raw_text
+
+YEARS = ("2024", "2023", "2022", "2021")
+SCORE_KINDS = ("max", "min")
+
+# 分数数组的类型码：每个分数一个 32 位整数，按 (2024最高, 2024最低, 2023最高, ...) 排列
+SCORE_TYPECODE = "i"
+
+# JSON 结构中的字段，其余字段保存在 extra 中原样写回
+_JSON_KEYS = {"id", "name", "address", "major", "recruitment_count", "recruitment",
+              "scores", "contact", "remark", "created_at"}
+
+
+def _intern(text):
+    return sys.intern(text) if type(text) is str else text
+
+
+def _score(value):
+    # 旧数据中的分数可能是浮点数或空值
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class School:
+    """一条调剂学校记录；scores 是长度为 8 的整数数组，major、address 为 None 表示 JSON 中没有该字段"""
+
+    __slots__ = ("id", "name", "address", "major", "recruitment_count",
+                 "recruitment_low", "recruitment_high", "scores",
+                 "email", "phone", "remark", "created_at", "extra", "_province")
+
+    def __init__(self, id, name, address, major, recruitment_count, scores,
+                 email="", phone="", remark="", created_at=None, recruitment=None, extra=None):
+        self.id = id
+        self.name = name
+        self.address = _intern(address)
+        self.major = _intern(major)
+        self.recruitment_count = recruitment_count
+        if recruitment is None:
+            recruitment = parse_recruitment(recruitment_count)
+            recruitment = (recruitment["low"], recruitment["high"])
+        self.recruitment_low, self.recruitment_high = recruitment
+        self.scores = scores if type(scores) is array else array(SCORE_TYPECODE, map(_score, scores))
+        self.email = email
+        self.phone = phone
+        self.remark = remark
+        self.created_at = _intern(created_at)
+        self.extra = extra
+        self._province = None
+
+    @classmethod
+    def from_json(cls, data):
+        """由存储中的 JSON 结构创建；没有或过期的 recruitment 字段按招生人数重新解析"""
+        scores = data.get("scores") or {}
+        contact = data.get("contact") or {}
+        recruitment = data.get("recruitment")
+        if recruitment is not None and recruitment.get("raw") == raw_text(data.get("recruitment_count")):
+            recruitment = (recruitment["low"], recruitment["high"])
+        else:
+            recruitment = None
+        extra = None
+        if data.keys() - _JSON_KEYS:
+            extra = {key: value for key, value in data.items() if key not in _JSON_KEYS}
+        return cls(
+            data.get("id"), data.get("name"), data.get("address"), data.get("major"),
+            data.get("recruitment_count"),
+            [(scores.get(year) or {}).get(kind) for year in YEARS for kind in SCORE_KINDS],
+            contact.get("email", ""), contact.get("phone", ""), data.get("remark"),
+            data.get("created_at"), recruitment, extra,
+        )
+
+    def to_json(self):
+        """转换为存储使用的 JSON 结构"""
+        scores = self.scores
+        data = {
+            "id": self.id,
+            "name": self.name,
+            "address": self.address,
+            "major": self.major,
+            "recruitment_count": self.recruitment_count,
+            "recruitment": self.recruitment,
+            "scores": {
+                year: {"max": scores[2 * i], "min": scores[2 * i + 1]} for i, year in enumerate(YEARS)
+            },
+            "contact": {"email": self.email, "phone": self.phone},
+            "remark": self.remark,
+            "created_at": self.created_at,
+        }
+        # 原 JSON 中没有的可选字段不写出
+        for key in ("address", "major", "remark", "created_at"):
+            if data[key] is None:
+                del data[key]
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    @property
+    def recruitment(self):
+        """招生人数的数值字段 {"low", "high", "mid", "raw"}"""
+        low, high = self.recruitment_low, self.recruitment_high
+        return {"low": low, "high": high, "mid": (low + high) / 2, "raw": raw_text(self.recruitment_count)}
+
+    @property
+    def province(self):
+        if self._province is None:
+            from .aggregates import province_of
+            self._province = sys.intern(province_of(self.address))
+        return self._province
+
+    def score(self, year, kind):
+        return self.scores[2 * YEARS.index(year) + SCORE_KINDS.index(kind)]
+
+    def replace(self, **changes):
+        """返回修改了若干字段的副本"""
+        values = {name: getattr(self, name) for name in self.__slots__[:-1]}
+        values["scores"] = array(SCORE_TYPECODE, values["scores"])
+        if "recruitment_count" in changes:
+            values["recruitment_low"] = values["recruitment_high"] = None
+        values.update(changes)
+        low, high = values.pop("recruitment_low"), values.pop("recruitment_high")
+        return School(**values, recruitment=None if low is None else (low, high))
+
+    def _fields(self):
+        return tuple(getattr(self, name) for name in self.__slots__[:-1])
+
+    def __eq__(self, other):
+        if type(other) is not School:
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return (School, (self.id, self.name, self.address, self.major, self.recruitment_count, self.scores,
+                         self.email, self.phone, self.remark, self.created_at,
+                         (self.recruitment_low, self.recruitment_high), self.extra))
+
+    def __repr__(self):
+        return f"School(id={self.id!r}, name={self.name!r}, major={self.major!r})"
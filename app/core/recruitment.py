@@ -0,0 +1,65 @@
+# 招生人数的规范化：保留原始写法，另外解析出 {"low", "high", "mid", "raw"} 数值字段
+import re
+
+# 整数（可带"人"字）或范围，如 "20"、"20人"、"2-4"、"2~4"、"2至4人"
+RANGE_PATTERN = r"^\s*(\d+)\s*(?:[-~～－—至到]\s*(\d+))?\s*人?\s*$"
+_RANGE_RE = re.compile(RANGE_PATTERN)
+
+
+def _fields(low, high, raw):
+    if high < low:
+        low, high = high, low
+    return {"low": low, "high": high, "mid": (low + high) / 2, "raw": raw}
+
+
+def raw_text(value):
+    return "" if value is None else str(value).strip()
+
+
+# 解析单个招生人数值
+def parse_recruitment(value):
+    raw = raw_text(value)
+    if isinstance(value, int) and not isinstance(value, bool):
+        return _fields(value, value, raw)
+    match = _RANGE_RE.match(raw)
+    if not match:
+        return _fields(0, 0, raw)
+    low = int(match.group(1))
+    high = int(match.group(2)) if match.group(2) is not None else low
+    return _fields(low, high, raw)
+
+
+# 返回记录的招生人数字段；旧记录没有 recruitment 字段时现场解析
+def recruitment_fields(school):
+    fields = school.get("recruitment")
+    if fields is None:
+        return parse_recruitment(school.get("recruitment_count"))
+    return fields
+
+
+# 为记录补全或更新 recruitment 字段，返回是否有改动
+def normalize_record(school):
+    raw = raw_text(school.get("recruitment_count"))
+    fields = school.get("recruitment")
+    if fields is not None and fields.get("raw") == raw:
+        return False
+    school["recruitment"] = parse_recruitment(school.get("recruitment_count"))
+    return True
+
+
+# 批量补全，返回有改动的记录数
+def normalize_records(records):
+    return sum(1 for school in records if normalize_record(school))
+
+
+# 向量化解析一列招生人数（pandas Series），返回 (low, high, mid, raw) 四个列表
+def parse_recruitment_series(values):
+    import pandas as pd
+
+    raw = values.map(raw_text)
+    parts = raw.str.extract(RANGE_PATTERN)
+    low = pd.to_numeric(parts[0], errors="coerce").fillna(0).astype(int)
+    high = pd.to_numeric(parts[1], errors="coerce").fillna(low).astype(int)
+    low, high = low.where(low <= high, high), high.where(low <= high, low)
+    mid = (low + high) / 2
+    return low.tolist(), high.tolist(), mid.tolist(), raw.tolist()
@@ -0,0 +1,180 @@
+import os
+from datetime import datetime
+from . import storage, importer
+from .dataset import SchoolDataset, SharedDataset
+from .metrics import timed
+from .record import YEARS, SCORE_KINDS, School
+from .recruitment import normalize_records
+from .upsert import plan_upsert
+
+# 获取数据目录路径
+def get_data_dir():
+    return storage.get_data_dir()
+
+# 获取数据文件路径
+def get_data_file():
+    return os.path.join(get_data_dir(), 'schools.json')
+
+# 获取当前存储后端
+def get_storage():
+    return storage.get_storage()
+
+# 确保数据存储已初始化（数据目录、数据文件或数据库表）
+def ensure_data_store():
+    data_dir = get_data_dir()
+    if not os.path.exists(data_dir):
+        os.makedirs(data_dir)
+    get_storage().ensure_initialized()
+
+# 获取数据版本号（每次写入后递增），用于判断数据是否变化
+@timed()
+def get_data_version():
+    return get_storage().generation()
+
+# 加载数据（应先读取版本号再加载，保证数据不旧于版本号）；
+# 解析结果由 SharedDataset 按版本号持有，这里不再另外缓存
+@timed()
+def load_data(version=None):
+    if storage.mmap_enabled():
+        # 多进程部署：各进程映射同一个按版本生成的快照文件，记录按需解码；
+        # core.mapped 只在启用时导入
+        from . import mapped
+        storage_backend = get_storage()
+        return mapped.get_store(storage_backend.key).load(version, storage_backend.generation, _load_records,
+                                                          storage_backend.write_lock)
+    return _load_records()
+
+def _load_records():
+    # 存储中的 JSON 结构只在这里转换为 School；尚未迁移的旧记录在转换时补全招生人数字段
+    # （python -m core migrate-recruitment 可写回存储）
+    return [School.from_json(school) for school in get_storage().load_all()]
+
+# 创建进程内共享的数据集，页面适配层负责在进程内复用同一个实例
+def create_shared_dataset():
+    return SharedDataset(load_data, get_data_version, write_lock=lambda: get_storage().write_lock())
+
+# 执行存储写操作，失败时打印错误而不是中断调用方
+def _write(operation, *args):
+    try:
+        operation(*args)
+        return True
+    except Exception as e:
+        print(f"保存数据时出错: {str(e)}")
+        return False
+
+
+# 保存数据（整体写入）
+def save_data(data):
+    return _write(get_storage().save_all, [school.to_json() for school in data])
+
+# 添加新学校（写入存储并发布增量更新后的共享快照）
+@timed()
+def add_school(school_data, shared):
+    new_school = School(
+        get_storage().allocate_ids(1),
+        school_data["name"],
+        school_data["address"],
+        school_data["major"],
+        school_data["recruitment_count"],
+        [school_data["scores"][year][kind] for year in YEARS for kind in SCORE_KINDS],
+        school_data["contact"]["email"],
+        school_data["contact"]["phone"],
+        school_data.get("remark", ""),
+        datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    )
+    
+    shared.commit(
+        lambda base: (base.with_added([new_school]), None),
+        lambda updated, _: get_storage().insert(new_school.to_json())
+    )
+    return new_school
+
+# 批量添加学校（用于确认导入）：在提交时分配连续的新 id，一次写入存储（单个事务/单条日志）
+@timed()
+def add_schools(new_schools, shared):
+    def derive(base):
+        importer.assign_ids(new_schools, get_storage())
+        return base.with_added(new_schools), None
+
+    success, _ = shared.commit(
+        derive,
+        lambda updated, _: get_storage().insert_many([school.to_json() for school in new_schools])
+    )
+    return success
+
+# 合并导入：按 (学校名称, 调剂专业) 匹配，已有的更新、新的添加、内容相同的跳过，
+# 一次写入存储；返回 (是否成功, UpsertPlan)。计划在提交时基于最新快照重新计算
+@timed()
+def upsert_schools(new_schools, shared):
+    def derive(base):
+        plan = plan_upsert(base, new_schools)
+        if not plan:
+            return base, plan
+        importer.assign_ids(plan.inserts, get_storage())
+        return base.with_added(plan.inserts).with_updated(plan.updates), plan
+
+    return shared.commit(
+        derive,
+        lambda updated, plan: get_storage().upsert_many(
+            [school.to_json() for school in plan.inserts], [school.to_json() for school in plan.updates]
+        )
+    )
+
+# 预览合并导入的结果（不写入存储）
+def preview_upsert(new_schools, dataset):
+    return plan_upsert(dataset, new_schools)
+
+# 解析导入文件，返回 (学校记录列表, 导入统计)；文件格式错误时抛出 ImportFormatError
+@timed()
+def parse_import_file(file):
+    stats = importer.ImportStats()
+    new_schools = []
+    for batch in importer.iter_import_batches(file, stats=stats):
+        new_schools.extend(batch)
+    return new_schools, stats
+
+# 并行解析多个导入文件（含 zip 压缩包），返回 importer.BatchImport，每个文件的错误单独记录
+@timed()
+def parse_import_files(files, max_workers=None):
+    return importer.parse_files(files, max_workers=max_workers)
+
+# 为存储中缺少招生人数字段的记录补全并写回，返回补全的记录数
+def migrate_recruitment(backend=None):
+    backend = backend or get_storage()
+    records = backend.load_all()
+    changed = normalize_records(records)
+    if changed:
+        backend.save_all(records)
+    return changed
+
+# 删除学校
+@timed()
+def delete_school(school_id, shared):
+    _, removed = shared.commit(
+        lambda base: base.without_ids([school_id]),
+        lambda updated, removed: get_storage().delete_many(removed)
+    )
+    return bool(removed)
+
+# 批量删除学校
+@timed()
+def batch_delete_schools(school_ids, shared):
+    if not school_ids:
+        return 0
+    
+    # 没有找到任何匹配的学校时不会写入存储
+    _, removed = shared.commit(
+        lambda base: base.without_ids(school_ids),
+        lambda updated, removed: get_storage().delete_many(removed)
+    )
+    return len(removed)
+
+# 删除所有学校
+@timed()
+def delete_all_schools(shared):
+    # 直接清空存储，并发布空快照
+    success, _ = shared.commit(
+        lambda base: (SchoolDataset([], dataset_id=base.dataset_id), None),
+        lambda updated, _: get_storage().clear()
+    )
+    return success
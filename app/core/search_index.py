@@ -0,0 +1,178 @@
+from collections import defaultdict
+
+# 参与全文搜索的字段
+SEARCH_FIELDS = ("name", "major", "address", "remark")
+
+# 查看数据页面的搜索范围
+SEARCH_SCOPES = {
+    "全部字段": SEARCH_FIELDS,
+    "学校名称": ("name",),
+    "调剂专业": ("major",),
+    "地区/地址": ("address",),
+    "备注": ("remark",),
+}
+
+
+def _grams(text):
+    """返回文本中的所有单字和相邻二字组合"""
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def _query_grams(query):
+    if len(query) == 1:
+        return {query}
+    return {query[i:i + 2] for i in range(len(query) - 1)}
+
+
+def _merge_deltas(older, newer):
+    """合并两层增量 {二元组: (新增 id, 删除 id)}，效果等于先应用 older 再应用 newer"""
+    merged = dict(older)
+    for gram, (adds, removes) in newer.items():
+        if gram in merged:
+            old_adds, old_removes = merged[gram]
+            merged[gram] = ((old_adds - removes) | adds, old_removes | removes)
+        else:
+            merged[gram] = (adds, removes)
+    return merged
+
+
+def _delta_size(delta):
+    return sum(len(adds) + len(removes) for adds, removes in delta.values())
+
+
+class BigramIndex:
+    """按学校 id 组织的字符二元组倒排索引。
+
+    倒排表分为共享的底层和若干增量层，copy() 的副本只新建一个空的增量层，
+    增删记录只修改本索引的增量层，不复制任何倒排表。底层也可以是映射文件中的只读倒排表。"""
+
+    # 增量累积到底层条目数的这个比例时合并进新的底层
+    FLATTEN_RATIO = 8
+
+    def __init__(self, fields=SEARCH_FIELDS):
+        self.fields = tuple(fields)
+        # 二元组 -> id 集合，与其他副本共享，不再修改
+        self._base = {}
+        self._base_size = 0
+        # 共享的增量层 [(增量, 条目数)]，从旧到新；每层的条目数不超过前一层
+        self._deltas = []
+        # 本索引的增量层 {二元组: (新增 id 集合, 删除 id 集合)}
+        self._own = {}
+
+    @classmethod
+    def build(cls, records, fields=SEARCH_FIELDS):
+        index = cls(fields)
+        base = defaultdict(set)
+        for school in records:
+            for text in index._texts(school):
+                for gram in _grams(text):
+                    base[gram].add(school.id)
+        index._base = dict(base)
+        index._base_size = sum(len(posting) for posting in base.values())
+        return index
+
+    @classmethod
+    def over(cls, base, size, fields=SEARCH_FIELDS):
+        """以只读的底层倒排表创建索引；base.get(二元组, 默认值) 返回支持 len、迭代和 in 的有序 id 集合"""
+        index = cls(fields)
+        index._base, index._base_size = base, size
+        return index
+
+    def copy(self):
+        index = BigramIndex(self.fields)
+        index._base, index._base_size = self._base, self._base_size
+        deltas = list(self._deltas)
+        if self._own:
+            deltas.append((self._own, _delta_size(self._own)))
+        # 与二进制计数器类似地合并相邻的增量层，层数保持在对数级别
+        while len(deltas) >= 2 and deltas[-1][1] >= deltas[-2][1]:
+            newer, older = deltas.pop(), deltas.pop()
+            merged = _merge_deltas(older[0], newer[0])
+            deltas.append((merged, _delta_size(merged)))
+        # 只读的底层不能合并，增量一直留在增量层
+        if isinstance(index._base, dict) \
+                and sum(size for _, size in deltas) * self.FLATTEN_RATIO >= max(index._base_size, 1024):
+            index._flatten(deltas)
+        else:
+            index._deltas = deltas
+        return index
+
+    def postings(self):
+        """返回合并了所有增量层的完整倒排表 {二元组: id 集合}"""
+        grams = set(self._base).union(*(delta for delta, _ in self._deltas), self._own)
+        postings = {gram: set(self._posting(gram)) for gram in grams}
+        return {gram: posting for gram, posting in postings.items() if posting}
+
+    def _flatten(self, deltas):
+        merged = {}
+        for delta, _ in deltas:
+            merged = _merge_deltas(merged, delta)
+        base = dict(self._base)
+        for gram, (adds, removes) in merged.items():
+            posting = (base.get(gram, set()) - removes) | adds
+            if posting:
+                base[gram] = posting
+            else:
+                base.pop(gram, None)
+        self._base = base
+        self._base_size = sum(len(posting) for posting in base.values())
+
+    def _posting(self, gram):
+        posting = self._base.get(gram, ())
+        for delta in [delta for delta, _ in self._deltas] + [self._own]:
+            if gram in delta:
+                adds, removes = delta[gram]
+                posting = (set(posting) - removes) | adds
+        return posting
+
+    def _own_delta(self, gram):
+        delta = self._own.get(gram)
+        if delta is None:
+            delta = self._own[gram] = (set(), set())
+        return delta
+
+    def _texts(self, school):
+        return tuple(str(getattr(school, field) or "").lower() for field in self.fields)
+
+    def add(self, school):
+        """加入一条记录（同一 id 的旧记录应先 remove）"""
+        for text in self._texts(school):
+            for gram in _grams(text):
+                self._own_delta(gram)[0].add(school.id)
+
+    def remove(self, school):
+        """移除一条已加入的记录"""
+        for text in self._texts(school):
+            for gram in _grams(text):
+                adds, removes = self._own_delta(gram)
+                adds.discard(school.id)
+                removes.add(school.id)
+
+    def search(self, query, get_many, fields=None):
+        """返回在指定字段（默认全部字段）中包含 query 的学校 id 集合；get_many(ids, fields) 返回候选记录列表用于校验"""
+        query = query.strip().lower()
+        # 从最短的倒排表开始求交集
+        postings = sorted((self._posting(gram) for gram in _query_grams(query)), key=len)
+        if not postings or not postings[0]:
+            return set()
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            # 候选集不大于后面的倒排表，逐个检查候选即可
+            candidates = {school_id for school_id in candidates if school_id in posting}
+            if not candidates:
+                return candidates
+
+        fields = fields or self.fields
+        # 一两个字的查询本身就是一个二元组，在所有字段中搜索时倒排表就是结果
+        if len(query) <= 2 and set(fields) >= set(self.fields):
+            return candidates
+        candidates = list(candidates)
+        matched = set()
+        for school_id, school in zip(candidates, get_many(candidates, fields)):
+            if school is not None and any(
+                query in str(getattr(school, field) or "").lower() for field in fields
+            ):
+                matched.add(school_id)
+        return matched
@@ -0,0 +1,402 @@
+# 二进制列式快照（schools.snapshot.bin），与 JSON 快照一起写入，加载时优先使用
+import gc
+import os
+import json
+from contextlib import contextmanager
+
+import numpy as np
+
+MAGIC = b"TJSNAP01"
+ALIGN = 64
+_LENGTH = np.dtype("<u8")
+
+YEARS = ("2024", "2023", "2022", "2021")
+SCORE_KINDS = ("max", "min")
+
+# 记录的固定结构：叶子字段路径，列名为用点连接的路径
+LEAVES = (
+    ("id",), ("name",), ("address",), ("major",), ("recruitment_count",),
+    ("recruitment", "low"), ("recruitment", "high"), ("recruitment", "mid"), ("recruitment", "raw"),
+    *(("scores", year, kind) for year in YEARS for kind in SCORE_KINDS),
+    ("contact", "email"), ("contact", "phone"),
+    ("remark",), ("created_at",),
+)
+COLUMNS = tuple(".".join(path) for path in LEAVES)
+
+_TOP_KEYS = {"id", "name", "address", "major", "recruitment_count", "recruitment",
+             "scores", "contact", "remark", "created_at"}
+# 没有 recruitment 字段的旧记录
+_LEGACY_KEYS = _TOP_KEYS - {"recruitment"}
+_LEGACY_RECRUITMENT = {"low": 0, "high": 0, "mid": 0.0, "raw": ""}
+_RECRUITMENT_KEYS = {"low", "high", "mid", "raw"}
+_SCORE_KEYS = set(SCORE_KINDS)
+_CONTACT_KEYS = {"email", "phone"}
+_YEAR_KEYS = set(YEARS)
+
+
+class SnapshotFormatError(ValueError):
+    """文件不是（或不是完整的）二进制快照"""
+
+
+def _conforms(school):
+    """记录是否符合固定结构（字段取值的类型不限）"""
+    if type(school) is not dict:
+        return False
+    keys = school.keys()
+    if keys == _TOP_KEYS:
+        recruitment = school["recruitment"]
+        if type(recruitment) is not dict or recruitment.keys() != _RECRUITMENT_KEYS:
+            return False
+    elif keys != _LEGACY_KEYS:
+        return False
+    scores, contact = school["scores"], school["contact"]
+    return (
+        type(contact) is dict and contact.keys() == _CONTACT_KEYS
+        and type(scores) is dict and scores.keys() == _YEAR_KEYS
+        and all(type(score) is dict and score.keys() == _SCORE_KEYS for score in scores.values())
+    )
+
+
+def _leaf_values(records, path):
+    if len(path) == 1:
+        key, = path
+        return [school[key] for school in records]
+    if path[0] == "recruitment":
+        _, inner = path
+        return [school.get("recruitment", _LEGACY_RECRUITMENT)[inner] for school in records]
+    if len(path) == 2:
+        outer, inner = path
+        return [school[outer][inner] for school in records]
+    outer, middle, inner = path
+    return [school[outer][middle][inner] for school in records]
+
+
+def _int_dtype(values):
+    low, high = int(values.min()), int(values.max())
+    for dtype in ("<i1", "<i2", "<i4", "<i8"):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+
+
+def code_dtype(count):
+    for dtype in ("<u1", "<u2", "<u4"):
+        if count <= np.iinfo(dtype).max:
+            return dtype
+    return "<u8"
+
+
+def string_table(strings):
+    """字符串列表 -> (偏移数组, UTF-8 字节数组)"""
+    encoded = [text.encode("utf-8") for text in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(data) for data in encoded], out=offsets[1:])
+    dtype = "<u4" if offsets[-1] <= np.iinfo("<u4").max else "<u8"
+    return offsets.astype(dtype), np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def _encode_column(name, values, arrays):
+    """编码一列取值，数组写入 arrays，返回列类型"""
+    types = set(map(type, values))
+    if types == {int}:
+        try:
+            data = np.array(values, dtype=np.int64)
+        except OverflowError:
+            pass
+        else:
+            arrays[name] = data.astype(_int_dtype(data)) if len(data) else data
+            return "int"
+    if types == {float}:
+        arrays[name] = np.array(values, dtype="<f8")
+        return "float"
+
+    kind = "str" if types <= {str} else "json"
+    if kind == "json":
+        values = [json.dumps(value, ensure_ascii=False) for value in values]
+    index = {}
+    codes = [index.setdefault(value, len(index)) for value in values]
+    arrays[f"{name}.codes"] = np.array(codes, dtype=code_dtype(len(index)))
+    arrays[f"{name}.offsets"], arrays[f"{name}.blob"] = string_table(index)
+    return kind
+
+
+def encode_records(records):
+    """记录列表 -> (各列类型, 数组字典)"""
+    conforming, extras = [], []
+    for position, school in enumerate(records):
+        if _conforms(school):
+            conforming.append(school)
+        else:
+            extras.append(position)
+
+    arrays = {}
+    kinds = {name: _encode_column(name, _leaf_values(conforming, path), arrays)
+             for name, path in zip(COLUMNS, LEAVES)}
+    legacy = [position for position, school in enumerate(conforming) if "recruitment" not in school]
+    if legacy:
+        arrays["recruitment.missing"] = np.array(legacy, dtype="<u8")
+    if extras:
+        arrays["extras.positions"] = np.array(extras, dtype="<u8")
+        arrays["extras.offsets"], arrays["extras.blob"] = string_table(
+            [json.dumps(records[position], ensure_ascii=False) for position in extras]
+        )
+    return kinds, arrays
+
+
+def _align(offset):
+    return -(-offset // ALIGN) * ALIGN
+
+
+def write_snapshot(path, records, source=None):
+    """把记录写成二进制快照；source 为对应 JSON 快照的文件标识"""
+    kinds, arrays = encode_records(records)
+    write_arrays(path, len(records), kinds, arrays, source)
+
+
+def write_arrays(path, count, kinds, arrays, source=None):
+    """按快照格式写入记录数、各列类型和数组"""
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        offset = _align(offset)
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += array.nbytes
+
+    header = json.dumps({
+        "count": count,
+        "source": source,
+        "kinds": kinds,
+        "arrays": layout,
+    }).encode("utf-8")
+    data_start = _align(len(MAGIC) + _LENGTH.itemsize + len(header))
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.array(len(header), dtype=_LENGTH).tobytes())
+        f.write(header)
+        for name, array in arrays.items():
+            f.write(b"\0" * (data_start + layout[name]["offset"] - f.tell()))
+            f.write(np.ascontiguousarray(array).tobytes())
+
+
+_PREFIX = len(MAGIC) + _LENGTH.itemsize
+
+
+def _header_length(prefix):
+    if len(prefix) < _PREFIX or bytes(prefix[:len(MAGIC)]) != MAGIC:
+        raise SnapshotFormatError("不是二进制快照文件")
+    return int(np.frombuffer(prefix, dtype=_LENGTH, count=1, offset=len(MAGIC))[0])
+
+
+def parse_header(buffer):
+    """从 buffer（bytes、mmap 等）开头解析头部，返回 (头部, 数据区起始偏移)"""
+    length = _header_length(buffer[:_PREFIX])
+    if len(buffer) < _PREFIX + length:
+        raise SnapshotFormatError("二进制快照头部不完整")
+    return json.loads(bytes(buffer[_PREFIX:_PREFIX + length])), _align(_PREFIX + length)
+
+
+def snapshot_source(path):
+    """返回二进制快照记录的 JSON 快照标识，文件不存在或损坏时返回 None"""
+    try:
+        with open(path, "rb") as f:
+            prefix = f.read(_PREFIX)
+            header, _ = parse_header(prefix + f.read(_header_length(prefix)))
+    except (OSError, ValueError):
+        return None
+    source = header.get("source")
+    return None if source is None else tuple(source)
+
+
+def map_arrays(buffer, header, data_start):
+    """在 buffer（bytes、mmap 等）上零拷贝地取出各数组"""
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        start = data_start + spec["offset"]
+        if start + count * dtype.itemsize > len(buffer):
+            raise SnapshotFormatError("二进制快照数据不完整")
+        arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count, offset=start).reshape(spec["shape"])
+    return arrays
+
+
+def decode_strings(offsets, blob):
+    data = blob.tobytes()
+    bounds = offsets.tolist()
+    return [data[start:end].decode("utf-8") for start, end in zip(bounds, bounds[1:])]
+
+
+def decode_string(offsets, blob, index):
+    """只解码字符串表中的第 index 个字符串"""
+    return bytes(blob[int(offsets[index]):int(offsets[index + 1])]).decode("utf-8")
+
+
+def _column_values(name, kind, arrays):
+    """解码一列，返回每行取值的列表"""
+    if kind in ("int", "float"):
+        return arrays[name].tolist()
+    table = decode_strings(arrays[f"{name}.offsets"], arrays[f"{name}.blob"])
+    codes = arrays[f"{name}.codes"]
+    if kind == "json":
+        texts, table = table, [json.loads(text) for text in table]
+        if any(isinstance(value, (dict, list)) for value in table):
+            # 可变的取值不能在记录之间共享
+            return [json.loads(texts[code]) for code in codes.tolist()]
+    values = np.empty(len(table), dtype=object)
+    values[:] = table
+    return values[codes].tolist()
+
+
+@contextmanager
+def _gc_paused():
+    # 一次性创建数百万个字典时，循环垃圾回收会被反复触发而占用大部分时间；
+    # 新建的记录之间没有循环引用，解码期间暂停回收
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _build_records(columns):
+    """由各列取值的列表组装固定结构的记录"""
+    return [
+        {
+            "id": school_id,
+            "name": name,
+            "address": address,
+            "major": major,
+            "recruitment_count": recruitment_count,
+            "recruitment": {"low": low, "high": high, "mid": mid, "raw": raw},
+            "scores": {
+                "2024": {"max": max_2024, "min": min_2024},
+                "2023": {"max": max_2023, "min": min_2023},
+                "2022": {"max": max_2022, "min": min_2022},
+                "2021": {"max": max_2021, "min": min_2021},
+            },
+            "contact": {"email": email, "phone": phone},
+            "remark": remark,
+            "created_at": created_at,
+        }
+        for (school_id, name, address, major, recruitment_count, low, high, mid, raw,
+             max_2024, min_2024, max_2023, min_2023, max_2022, min_2022, max_2021, min_2021,
+             email, phone, remark, created_at) in zip(*(columns[name] for name in COLUMNS))
+    ]
+
+
+def decode_records(header, arrays):
+    """由头部和数组还原记录列表"""
+    with _gc_paused():
+        return _decode_records(header, arrays)
+
+
+def _decode_records(header, arrays):
+    records = _build_records({name: _column_values(name, header["kinds"][name], arrays) for name in COLUMNS})
+
+    if "recruitment.missing" in arrays:
+        for position in arrays["recruitment.missing"].tolist():
+            del records[position]["recruitment"]
+
+    if "extras.positions" in arrays:
+        extras = iter([json.loads(text) for text in decode_strings(arrays["extras.offsets"], arrays["extras.blob"])])
+        is_extra = np.zeros(len(records) + len(arrays["extras.positions"]), dtype=bool)
+        is_extra[arrays["extras.positions"]] = True
+        conforming = iter(records)
+        records = [next(extras) if flag else next(conforming) for flag in is_extra.tolist()]
+    return records
+
+
+def _column_rows(name, kind, arrays, rows):
+    """只解码一列中 rows 各行的取值，字符串表中只解码用到的字符串"""
+    if kind in ("int", "float"):
+        return arrays[name][rows].tolist()
+    offsets, blob = arrays[f"{name}.offsets"], arrays[f"{name}.blob"]
+    codes, inverse = np.unique(arrays[f"{name}.codes"][rows], return_inverse=True)
+    strings = [decode_string(offsets, blob, code) for code in codes.tolist()]
+    if kind == "json":
+        # 每行单独解析，可变的取值不在记录之间共享
+        return [json.loads(strings[code]) for code in inverse.reshape(-1).tolist()]
+    values = np.empty(len(strings), dtype=object)
+    values[:] = strings
+    return values[inverse.reshape(-1)].tolist()
+
+
+def _sorted_contains(sorted_values, values):
+    """values 中每个值是否在升序数组 sorted_values 中（二分查找，不复制 sorted_values）"""
+    values = values.astype(sorted_values.dtype)
+    slots = np.searchsorted(sorted_values, values)
+    found = slots < len(sorted_values)
+    found[found] = sorted_values[slots[found]] == values[found]
+    return found
+
+
+def _locate_rows(arrays, rows):
+    """返回 (rows, 是否非固定结构记录, 每行之前的非固定结构记录数)"""
+    rows = np.asarray(rows, dtype=np.int64)
+    is_extra = np.zeros(len(rows), dtype=bool)
+    slots = np.zeros(len(rows), dtype=np.int64)
+    positions = arrays.get("extras.positions")
+    if positions is not None:
+        # slots 为每行之前的非固定结构记录数，固定结构记录在各列中的行号 = 位置 - slots
+        slots = np.searchsorted(positions, rows.astype(positions.dtype))
+        is_extra = _sorted_contains(positions, rows)
+    return rows, is_extra, slots
+
+
+def decode_rows(header, arrays, rows):
+    """只解码记录列表中 rows 各位置的记录，按 rows 的顺序返回"""
+    rows, is_extra, slots = _locate_rows(arrays, rows)
+    records = [None] * len(rows)
+    conforming = (rows - slots)[~is_extra]
+    if len(conforming):
+        with _gc_paused():
+            decoded = _build_records({
+                name: _column_rows(name, header["kinds"][name], arrays, conforming) for name in COLUMNS
+            })
+        if "recruitment.missing" in arrays:
+            for index in np.flatnonzero(_sorted_contains(arrays["recruitment.missing"], conforming)).tolist():
+                del decoded[index]["recruitment"]
+        for index, school in zip(np.flatnonzero(~is_extra).tolist(), decoded):
+            records[index] = school
+    for index in np.flatnonzero(is_extra).tolist():
+        records[index] = json.loads(decode_string(arrays["extras.offsets"], arrays["extras.blob"], slots[index]))
+    return records
+
+
+def decode_fields(header, arrays, rows, fields):
+    """只解码 rows 各位置记录的若干顶层字段（name、remark 等），返回每行 {字段: 取值} 的列表"""
+    rows, is_extra, slots = _locate_rows(arrays, rows)
+    values = [None] * len(rows)
+    conforming = (rows - slots)[~is_extra]
+    columns = [_column_rows(field, header["kinds"][field], arrays, conforming) for field in fields]
+    for index, row in zip(np.flatnonzero(~is_extra).tolist(), zip(*columns)):
+        values[index] = dict(zip(fields, row))
+    for index in np.flatnonzero(is_extra).tolist():
+        school = json.loads(decode_string(arrays["extras.offsets"], arrays["extras.blob"], slots[index]))
+        values[index] = {field: school.get(field) for field in fields}
+    return values
+
+
+def decode_snapshot(buffer):
+    """解析整个二进制快照文件的内容，返回记录列表"""
+    header, data_start = parse_header(buffer)
+    records = decode_records(header, map_arrays(buffer, header, data_start))
+    if len(records) != header["count"]:
+        raise SnapshotFormatError("二进制快照记录数不一致")
+    return records
+
+
+def read_snapshot(path):
+    with open(path, "rb") as f:
+        return decode_snapshot(f.read())
+
+
+def file_stamp(path):
+    """文件标识 (inode, 修改时间, 大小)，文件被替换或修改后改变；不存在时返回 None"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
@@ -0,0 +1,635 @@
+import os
+import json
+import sqlite3
+import threading
+from functools import partial
+from .filelock import FileLock
+from . import snapshot
+from .journal import ChangeJournal, OP_ADD, OP_DELETE, OP_UPDATE, apply_changes
+from .recruitment import raw_text, recruitment_fields
+
+# 存储后端选择：通过环境变量 TIAOJI_STORAGE 指定 "json"（默认）或 "sqlite"
+STORAGE_ENV = "TIAOJI_STORAGE"
+DATA_DIR_ENV = "TIAOJI_DATA_DIR"
+# 设为 1 时各进程共享内存映射的快照（多进程部署时使用，见 core.mapped）
+MMAP_ENV = "TIAOJI_MMAP"
+
+YEARS = ("2024", "2023", "2022", "2021")
+
+# 获取数据目录路径（可通过环境变量 TIAOJI_DATA_DIR 覆盖）
+def get_data_dir():
+    return os.environ.get(DATA_DIR_ENV) or os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+
+# 是否启用内存映射的共享快照
+def mmap_enabled():
+    return os.environ.get(MMAP_ENV, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+class BaseStorage:
+    """存储后端基类：写操作在跨进程写锁内完成，每次成功后数据版本号加一，id 只增不减"""
+
+    name = "base"
+
+    @property
+    def key(self):
+        return (self.name, self.path)
+
+    def write_lock(self):
+        """返回跨进程写锁（可重入的上下文管理器）"""
+        return self._write_lock
+
+    def ensure_initialized(self):
+        raise NotImplementedError
+
+    def generation(self):
+        raise NotImplementedError
+
+    def allocate_ids(self, count=1):
+        """预留 count 个连续的新 id，返回第一个"""
+        raise NotImplementedError
+
+    def load_all(self):
+        raise NotImplementedError
+
+    def save_all(self, data):
+        raise NotImplementedError
+
+    def insert_many(self, records, data=None):
+        raise NotImplementedError
+
+    def insert(self, record, data=None):
+        return self.insert_many([record], data)
+
+    def update_many(self, records, data=None):
+        """按 id 整条替换已有记录"""
+        return self.upsert_many((), records, data)
+
+    def upsert_many(self, inserts, updates, data=None):
+        """在同一次写入中插入新记录并更新已有记录，版本号只增加一次"""
+        raise NotImplementedError
+
+    def delete_many(self, ids, data=None):
+        raise NotImplementedError
+
+    def clear(self):
+        return self.save_all([])
+
+
+class JsonStorage(BaseStorage):
+    """schools.json 快照（附带二进制快照 schools.snapshot.bin）+ 追加写入的变更日志"""
+
+    name = "json"
+
+    # 触发日志压缩的阈值
+    COMPACT_MAX_ENTRIES = 1000
+    COMPACT_MAX_BYTES = 8 * 1024 * 1024
+
+    def __init__(self, path=None, compact_max_entries=None, compact_max_bytes=None):
+        self.path = path or os.path.join(get_data_dir(), 'schools.json')
+        self.journal = ChangeJournal(os.path.splitext(self.path)[0] + '.journal.jsonl')
+        self.meta_path = os.path.splitext(self.path)[0] + '.meta.json'
+        self.binary_path = os.path.splitext(self.path)[0] + '.snapshot.bin'
+        self._write_lock = FileLock(f"{self.path}.lock")
+        self.compact_max_entries = compact_max_entries or self.COMPACT_MAX_ENTRIES
+        self.compact_max_bytes = compact_max_bytes or self.COMPACT_MAX_BYTES
+        # 同一进程内只允许一个线程写快照文件（整体保存或压缩）
+        self._compact_lock = threading.Lock()
+        self._compact_thread = None
+
+    def ensure_initialized(self):
+        # 每次页面运行都会调用，已检查过 id 的存储只读取元数据
+        if os.path.exists(self.path) and self.read_meta().get("unique_ids"):
+            return
+        # 多个进程同时首次启动时只有一个创建空快照；已有的日志保留，加载时回放
+        with self._compact_lock, self._write_lock:
+            if not os.path.exists(self.path):
+                self._install_snapshot(self._write_snapshot([]))
+                self._bump_generation()
+            if not self.read_meta().get("unique_ids"):
+                self._renumber_duplicate_ids()
+
+    def _renumber_duplicate_ids(self):
+        """为 id 重复的旧记录分配新 id 并写回快照（须持有压缩锁和写锁），改动记录在元数据中"""
+        records = self.load_all()
+        meta = self.read_meta()
+        next_id = max(meta.get("next_id", 1), max((school["id"] for school in records), default=0) + 1)
+        renumbered = renumber_duplicate_ids(records, next_id)
+        if renumbered:
+            # 日志已回放进 records，写入新快照后清空
+            self._install_snapshot(self._write_snapshot(records))
+            self.journal.reset()
+            self._bump_generation(records)
+            meta = self.read_meta()
+            meta["renumbered_ids"] = meta.get("renumbered_ids", []) + renumbered
+        meta["unique_ids"] = True
+        self._write_meta(meta)
+
+    def read_meta(self):
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write_meta(self, meta):
+        temp_file = f"{self.meta_path}.{os.getpid()}.temp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(temp_file, self.meta_path)
+
+    def generation(self):
+        return self.read_meta().get("generation", 0)
+
+    def _bump_generation(self, records=()):
+        with self._write_lock:
+            meta = self.read_meta()
+            meta["generation"] = meta.get("generation", 0) + 1
+            # 写入的记录自带 id 时（如迁移、整体保存），保证分配器不会再发出这些 id
+            max_id = max((school["id"] for school in records), default=0)
+            if max_id >= meta.get("next_id", 1):
+                meta["next_id"] = max_id + 1
+            self._write_meta(meta)
+            return meta["generation"]
+
+    def allocate_ids(self, count=1):
+        with self._write_lock:
+            meta = self.read_meta()
+            next_id = meta.get("next_id")
+            if next_id is None:
+                # 旧数据没有记录分配器状态，从现有最大 id 之后开始
+                next_id = max((school["id"] for school in self.load_all()), default=0) + 1
+            meta["next_id"] = next_id + count
+            self._write_meta(meta)
+            return next_id
+
+    def _read_snapshot(self, refresh_binary=True):
+        """在写锁内读取快照文件，返回 (解析函数, JSON 快照标识)，解析在锁外进行；
+        解析函数返回 None 表示二进制快照损坏、而 JSON 快照已被替换，需要重新读取"""
+        stamp = snapshot.file_stamp(self.path)
+        if stamp is None:
+            return list, None
+        if snapshot.snapshot_source(self.binary_path) == stamp:
+            try:
+                with open(self.binary_path, 'rb') as f:
+                    buffer = f.read()
+                # 先检查文件结构完整，损坏时改为读取 JSON
+                header, data_start = snapshot.parse_header(buffer)
+                snapshot.map_arrays(buffer, header, data_start)
+                return partial(self._decode_binary, buffer, stamp, refresh_binary), stamp
+            except (OSError, ValueError) as e:
+                print(f"读取二进制快照时出错，改为读取 JSON: {str(e)}")
+        with open(self.path, 'rb') as f:
+            raw = f.read()
+        return partial(self._parse_json, raw, stamp, refresh_binary), stamp
+
+    def _parse_json(self, raw, stamp, refresh_binary):
+        records = json.loads(raw) if raw else []
+        if refresh_binary:
+            self._refresh_binary(records, stamp)
+        return records
+
+    def _decode_binary(self, buffer, stamp, refresh_binary):
+        try:
+            return snapshot.decode_snapshot(buffer)
+        except (ValueError, IndexError, KeyError) as e:
+            print(f"读取二进制快照时出错，改为读取 JSON: {str(e)}")
+        # 在锁外读取 JSON：文件标识不变时内容与锁内读到的日志仍然对应
+        try:
+            with open(self.path, 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return None
+        if snapshot.file_stamp(self.path) != stamp:
+            return None
+        return self._parse_json(raw, stamp, refresh_binary)
+
+    def _refresh_binary(self, records, stamp):
+        # 只是加速下次加载，失败或正在写快照时跳过
+        if not self._compact_lock.acquire(blocking=False):
+            return
+        try:
+            temp_file = self._write_binary(records, stamp)
+            if temp_file is None:
+                return
+            with self._write_lock:
+                if snapshot.file_stamp(self.path) == stamp:
+                    os.replace(temp_file, self.binary_path)
+                else:
+                    os.remove(temp_file)
+        finally:
+            self._compact_lock.release()
+
+    def _write_binary(self, data, stamp):
+        temp_file = f"{self.binary_path}.{os.getpid()}.temp"
+        try:
+            snapshot.write_snapshot(temp_file, data, source=stamp)
+            return temp_file
+        except Exception as e:
+            print(f"写入二进制快照时出错: {str(e)}")
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            return None
+
+    def _write_snapshot(self, data):
+        """写入 JSON 快照和二进制快照的临时文件，返回 (JSON 临时文件, 二进制临时文件)"""
+        data_dir = os.path.dirname(self.path)
+        # 确保数据目录存在
+        if not os.path.exists(data_dir):
+            os.makedirs(data_dir)
+
+        # 先写入临时文件，成功后再替换，防止数据损坏
+        temp_file = f"{self.path}.{os.getpid()}.temp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+        # 重命名不改变文件标识，二进制快照直接记录临时文件的标识
+        return temp_file, self._write_binary(data, snapshot.file_stamp(temp_file))
+
+    def _install_snapshot(self, temp_files):
+        """用临时文件替换快照（须持有写锁）；先替换二进制快照，中途失败时它与旧 JSON 不对应而被忽略"""
+        temp_file, binary_temp_file = temp_files
+        if binary_temp_file is not None:
+            os.replace(binary_temp_file, self.binary_path)
+        os.replace(temp_file, self.path)
+
+    def _discard_snapshot(self, temp_files):
+        for temp_file in temp_files:
+            if temp_file is not None:
+                os.remove(temp_file)
+
+    def load_all(self):
+        # 锁内只读取文件内容，解析在锁外进行
+        while True:
+            with self._write_lock:
+                parse, _ = self._read_snapshot()
+                changes = self.journal.read()
+            records = parse()
+            if records is not None:
+                return apply_changes(records, changes)
+
+    def save_all(self, data):
+        with self._compact_lock:
+            temp_files = self._write_snapshot(data)
+            with self._write_lock:
+                self._install_snapshot(temp_files)
+                self.journal.reset()
+                return self._bump_generation(data)
+
+    def _append(self, changes, records=()):
+        """追加变更并更新版本号，两者在同一次加锁内完成"""
+        with self._write_lock:
+            self.journal.append(*changes)
+            generation = self._bump_generation(records)
+        self._maybe_compact()
+        return generation
+
+    def insert_many(self, records, data=None):
+        if not records:
+            return self.generation()
+        return self._append([{"op": OP_ADD, "records": list(records)}], records)
+
+    def upsert_many(self, inserts, updates, data=None):
+        changes = []
+        if inserts:
+            changes.append({"op": OP_ADD, "records": list(inserts)})
+        if updates:
+            changes.append({"op": OP_UPDATE, "records": list(updates)})
+        if not changes:
+            return self.generation()
+        # 两条变更一次写入日志
+        return self._append(changes, inserts)
+
+    def delete_many(self, ids, data=None):
+        if not ids:
+            return self.generation()
+        return self._append([{"op": OP_DELETE, "ids": list(ids)}])
+
+    def clear(self):
+        return self.save_all([])
+
+    def needs_compaction(self):
+        return (self.journal.entries >= self.compact_max_entries
+                or self.journal.size >= self.compact_max_bytes)
+
+    def compact(self):
+        """将日志合并进新的快照；快照已被其他进程替换时放弃本次压缩"""
+        with self._compact_lock:
+            with self._write_lock:
+                offset = self.journal.size
+                if offset == 0:
+                    return False
+                parse, stamp = self._read_snapshot(refresh_binary=False)
+                changes = self.journal.read(0, offset)
+            data = parse()
+            if data is None:
+                return False
+            data = apply_changes(data, changes)
+            temp_files = self._write_snapshot(data)
+            with self._write_lock:
+                if snapshot.file_stamp(self.path) != stamp:
+                    self._discard_snapshot(temp_files)
+                    return False
+                self._install_snapshot(temp_files)
+                self.journal.truncate_head(offset)
+            return True
+
+    def _maybe_compact(self):
+        if not self.needs_compaction():
+            return
+        if self._compact_thread is not None and self._compact_thread.is_alive():
+            return
+        self._compact_thread = threading.Thread(target=self._compact_in_background, daemon=True)
+        self._compact_thread.start()
+
+    def _compact_in_background(self):
+        try:
+            self.compact()
+        except Exception as e:
+            print(f"压缩变更日志时出错: {str(e)}")
+
+
+# SQLite 表结构：分数线按年份展开为独立列，便于建立索引
+_SCORE_COLUMNS = [f"score_{year}_{kind}" for year in YEARS for kind in ("max", "min")]
+
+# 招生人数解析后的数值列，旧数据库在连接时通过 ALTER TABLE 补齐
+_RECRUITMENT_COLUMNS = {
+    "recruitment_low": "INTEGER",
+    "recruitment_high": "INTEGER",
+    "recruitment_mid": "REAL",
+}
+
+_COLUMNS = [
+    "id", "name", "address", "major", "recruitment_count",
+    *_RECRUITMENT_COLUMNS,
+    *_SCORE_COLUMNS,
+    "email", "phone", "remark", "created_at",
+]
+
+# created_at 可以为空：没有该字段的记录不存为空字符串，与 JSON 存储读出的结构一致
+_SCHOOLS_TABLE = f"""
+CREATE TABLE IF NOT EXISTS schools (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    address TEXT NOT NULL DEFAULT '',
+    major TEXT NOT NULL DEFAULT '',
+    recruitment_count,
+    {", ".join(f"{col} {kind}" for col, kind in _RECRUITMENT_COLUMNS.items())},
+    {", ".join(f"{col} INTEGER NOT NULL DEFAULT 0" for col in _SCORE_COLUMNS)},
+    email TEXT NOT NULL DEFAULT '',
+    phone TEXT NOT NULL DEFAULT '',
+    remark TEXT NOT NULL DEFAULT '',
+    created_at TEXT
+)"""
+
+_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_schools_name ON schools(name)",
+    "CREATE INDEX IF NOT EXISTS idx_schools_major ON schools(major)",
+    "CREATE INDEX IF NOT EXISTS idx_schools_address ON schools(address)",
+    "CREATE INDEX IF NOT EXISTS idx_schools_2024_min ON schools(score_2024_min)",
+    "CREATE INDEX IF NOT EXISTS idx_schools_2024_max ON schools(score_2024_max)",
+]
+
+_META_TABLE = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+)"""
+
+_SCHEMA = ";\n".join([_SCHOOLS_TABLE, *_INDEXES, _META_TABLE]) + ";\n"
+
+# 普通 INSERT：id 重复时报错，不会静默覆盖已有的行
+_INSERT_SQL = f"INSERT INTO schools ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})"
+
+# 按 id 更新其余所有列，参数顺序与 _update_params 一致
+_UPDATE_SQL = f"UPDATE schools SET {', '.join(f'{col} = ?' for col in _COLUMNS[1:])} WHERE id = ?"
+
+
+def _record_to_row(school):
+    scores = school["scores"]
+    recruitment = recruitment_fields(school)
+    return (
+        school["id"],
+        school["name"],
+        school.get("address", ""),
+        school.get("major", ""),
+        school.get("recruitment_count", 0),
+        recruitment["low"],
+        recruitment["high"],
+        recruitment["mid"],
+        *(scores[year][kind] for year in YEARS for kind in ("max", "min")),
+        school["contact"].get("email", ""),
+        school["contact"].get("phone", ""),
+        school.get("remark", ""),
+        school.get("created_at"),
+    )
+
+
+def _update_params(school):
+    row = _record_to_row(school)
+    return (*row[1:], row[0])
+
+
+def _row_to_record(row):
+    record = {
+        "id": row["id"],
+        "name": row["name"],
+        "address": row["address"],
+        "major": row["major"],
+        "recruitment_count": row["recruitment_count"],
+        "scores": {
+            year: {"max": row[f"score_{year}_max"], "min": row[f"score_{year}_min"]}
+            for year in YEARS
+        },
+        "contact": {
+            "email": row["email"],
+            "phone": row["phone"]
+        },
+        "remark": row["remark"]
+    }
+    # 没有创建时间的记录不写出该字段（旧版本存为空字符串）
+    if row["created_at"]:
+        record["created_at"] = row["created_at"]
+    # 迁移前写入的行没有数值列，由加载方补全
+    if row["recruitment_low"] is not None:
+        record["recruitment"] = {
+            "low": row["recruitment_low"],
+            "high": row["recruitment_high"],
+            "mid": row["recruitment_mid"],
+            "raw": raw_text(row["recruitment_count"]),
+        }
+    return record
+
+
+class SqliteStorage(BaseStorage):
+    """SQLite（WAL 模式）存储，插入和删除都是单行操作"""
+
+    name = "sqlite"
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(get_data_dir(), 'schools.db')
+        # 数据变更本身由 SQLite 事务保证原子性，写锁用于调用方的版本检查
+        self._write_lock = FileLock(f"{self.path}.lock")
+        # Streamlit 每个会话在独立线程中运行脚本，连接按线程复用
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            data_dir = os.path.dirname(self.path)
+            if not os.path.exists(data_dir):
+                os.makedirs(data_dir)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._upgrade_schema(conn)
+            self._local.conn = conn
+        return conn
+
+    def _needs_upgrade(self, conn):
+        existing = {row["name"]: row for row in conn.execute("PRAGMA table_info(schools)")}
+        return any(column not in existing for column in _RECRUITMENT_COLUMNS) or existing["created_at"]["notnull"]
+
+    def _upgrade_schema(self, conn):
+        if not self._needs_upgrade(conn):
+            return
+        with conn:
+            # 在写事务内重新检查，多个进程同时连接旧数据库时只升级一次
+            conn.execute("BEGIN IMMEDIATE")
+            existing = {row["name"]: row for row in conn.execute("PRAGMA table_info(schools)")}
+            for column, kind in _RECRUITMENT_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE schools ADD COLUMN {column} {kind}")
+            # 旧版本的 created_at 列不可为空，重建表（SQLite 不能直接修改列约束）
+            if existing["created_at"]["notnull"]:
+                columns = ", ".join(_COLUMNS)
+                conn.execute("ALTER TABLE schools RENAME TO schools_old")
+                conn.execute(_SCHOOLS_TABLE)
+                conn.execute(f"INSERT INTO schools ({columns}) SELECT {columns} FROM schools_old")
+                conn.execute("DROP TABLE schools_old")
+                for statement in _INDEXES:
+                    conn.execute(statement)
+
+    def ensure_initialized(self):
+        self._connect()
+
+    def generation(self):
+        row = self._connect().execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return row[0] if row else 0
+
+    def _bump_generation(self, conn, records=(), next_id=None):
+        # 与数据变更处于同一事务中；下一个 id 不小于 next_id 和写入记录的最大 id + 1
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('generation', 1) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+        )
+        next_id = max(next_id or 0, max((school["id"] for school in records), default=0) + 1)
+        if next_id > 1:
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('next_id', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = MAX(value, excluded.value)",
+                (next_id,)
+            )
+        return conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+
+    def allocate_ids(self, count=1):
+        conn = self._connect()
+        # 立即获取写锁，避免多个连接读到同一个 next_id
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'next_id'").fetchone()
+            if row:
+                next_id = row[0]
+            else:
+                next_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM schools").fetchone()[0]
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('next_id', ?)", (next_id + count,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return next_id
+
+    def load_all(self):
+        rows = self._connect().execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM schools ORDER BY id"
+        ).fetchall()
+        return [_row_to_record(row) for row in rows]
+
+    def save_all(self, data, next_id=None):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM schools")
+            conn.executemany(_INSERT_SQL, (_record_to_row(school) for school in data))
+            return self._bump_generation(conn, data, next_id)
+
+    def insert_many(self, records, data=None):
+        conn = self._connect()
+        with conn:
+            conn.executemany(_INSERT_SQL, (_record_to_row(school) for school in records))
+            return self._bump_generation(conn, records)
+
+    def upsert_many(self, inserts, updates, data=None):
+        conn = self._connect()
+        with conn:
+            conn.executemany(_INSERT_SQL, (_record_to_row(school) for school in inserts))
+            conn.executemany(_UPDATE_SQL, (_update_params(school) for school in updates))
+            return self._bump_generation(conn, inserts)
+
+    def delete_many(self, ids, data=None):
+        conn = self._connect()
+        with conn:
+            conn.executemany("DELETE FROM schools WHERE id = ?", ((school_id,) for school_id in ids))
+            return self._bump_generation(conn)
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM schools")
+            return self._bump_generation(conn)
+
+
+# 为重复 id 的记录（保留第一条的 id）依次分配从 next_id 开始的新 id，返回 [[旧 id, 新 id], ...]
+def renumber_duplicate_ids(records, next_id):
+    seen = set()
+    renumbered = []
+    for school in records:
+        if school["id"] in seen:
+            renumbered.append([school["id"], next_id])
+            school["id"] = next_id
+            next_id += 1
+        seen.add(school["id"])
+    return renumbered
+
+
+_BACKENDS = {
+    JsonStorage.name: JsonStorage,
+    SqliteStorage.name: SqliteStorage,
+}
+
+_storage_lock = threading.Lock()
+_storages = {}
+
+# 获取当前配置的存储后端（同一进程内复用同一个实例）
+def get_storage(backend=None):
+    backend = (backend or os.environ.get(STORAGE_ENV) or JsonStorage.name).lower()
+    if backend not in _BACKENDS:
+        raise ValueError(f"未知的存储后端：{backend}，可选值：{', '.join(_BACKENDS)}")
+
+    key = (backend, get_data_dir())
+    with _storage_lock:
+        if key not in _storages:
+            _storages[key] = _BACKENDS[backend]()
+        return _storages[key]
+
+# 一次性将 schools.json 中的数据迁移到 SQLite 数据库，返回 (数据库中的行数, 重新编号的 [旧 id, 新 id] 列表)；
+# SQLite 以 id 为主键，id 重复的旧记录先重新编号再写入，下一个 id 随数据一起写入，已删除的 id 不会被重新分配
+def migrate_json_to_sqlite(json_path=None, db_path=None):
+    source = JsonStorage(json_path)
+    target = SqliteStorage(db_path)
+    data = source.load_all()
+    next_id = max(source.read_meta().get("next_id", 1), max((school["id"] for school in data), default=0) + 1)
+    renumbered = renumber_duplicate_ids(data, next_id)
+    target.save_all(data, next_id)
+    count = target._connect().execute("SELECT COUNT(*) FROM schools").fetchone()[0]
+    return count, renumbered
+
@@ -0,0 +1,111 @@
+# 按规范化后的 (学校名称, 调剂专业) 匹配键合并导入数据
+import hashlib
+import re
+import unicodedata
+
+_SPACES = re.compile(r"\s+")
+
+# 比较内容时使用的字段；id、created_at 和由招生人数派生的招生人数上下限不参与比较，
+# 名称和专业已经由匹配键比较过
+CONTENT_FIELDS = ("address", "recruitment_count", "scores", "email", "phone", "remark")
+# 可选的文本字段，缺失（None）与空字符串视为相同
+_OPTIONAL_TEXT_FIELDS = ("address", "email", "phone", "remark")
+
+
+def _normalize(text):
+    text = unicodedata.normalize("NFKC", "" if text is None else str(text))
+    return _SPACES.sub("", text).casefold()
+
+
+# 记录的匹配键：规范化后的 (名称, 专业) 的哈希
+def dedup_key(school):
+    text = f"{_normalize(school.name)}\x1f{_normalize(school.major)}"
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def build_key_index(records):
+    """返回 匹配键 -> 同键记录 id 的元组（按 id 排序）"""
+    index = {}
+    for school in records:
+        index.setdefault(dedup_key(school), []).append(school.id)
+    return {key: tuple(sorted(ids)) for key, ids in index.items()}
+
+
+# 在键索引中加入一条记录
+def add_to_key_index(index, school):
+    key = dedup_key(school)
+    index[key] = tuple(sorted(index.get(key, ()) + (school.id,)))
+
+
+# 从键索引中移除一条记录
+def remove_from_key_index(index, school):
+    key = dedup_key(school)
+    ids = list(index.get(key, ()))
+    if school.id in ids:
+        ids.remove(school.id)
+    if ids:
+        index[key] = tuple(ids)
+    else:
+        index.pop(key, None)
+
+
+# 参与比较的内容（可哈希），可选文本字段的 None 按空字符串处理
+def _content(school):
+    values = []
+    for field in CONTENT_FIELDS:
+        value = getattr(school, field)
+        if field == "scores":
+            value = tuple(value)
+        elif value is None and field in _OPTIONAL_TEXT_FIELDS:
+            value = ""
+        values.append(value)
+    return tuple(values)
+
+
+def _same_content(old, new):
+    return _content(old) == _content(new)
+
+
+class UpsertPlan:
+    """一次合并导入的执行计划：新增的记录、替换已有记录的新记录和跳过的条数"""
+
+    def __init__(self, inserts, updates, skipped):
+        self.inserts = inserts
+        self.updates = updates
+        self.skipped = skipped
+
+    def __bool__(self):
+        return bool(self.inserts or self.updates)
+
+    def __repr__(self):
+        return f"UpsertPlan(inserts={len(self.inserts)}, updates={len(self.updates)}, skipped={self.skipped})"
+
+
+def plan_upsert(dataset, new_records):
+    """按匹配键把导入记录分为新增、更新和跳过三类；本批中键和内容都相同的重复行只保留第一行"""
+    inserts, updates = [], []
+    skipped = 0
+    key_index = dataset.key_index
+    # 每个键在本批中已经出现的次数，和本批中已经出现过的 (键, 内容)
+    seen = {}
+    seen_contents = set()
+    for school in new_records:
+        key = dedup_key(school)
+        content = (key, _content(school))
+        if content in seen_contents:
+            skipped += 1
+            continue
+        seen_contents.add(content)
+        occurrence = seen.get(key, 0)
+        seen[key] = occurrence + 1
+
+        existing_ids = key_index.get(key, ())
+        if occurrence >= len(existing_ids):
+            inserts.append(school)
+            continue
+        existing = dataset.get(existing_ids[occurrence])
+        if _same_content(existing, school):
+            skipped += 1
+        else:
+            updates.append(school.replace(id=existing.id, created_at=existing.created_at or school.created_at))
+    return UpsertPlan(inserts, updates, skipped)
@@ -1,10 +1,12 @@
 import streamlit as st
 import pandas as pd
-import os
 import json
 from datetime import datetime
 import plotly.express as px
-from components import utils, ui
+from components import utils, ui, instrumentation
+from core import aggregates, columnar, metrics
+from core.query import SchoolQuery
+from core.search_index import SEARCH_SCOPES
 
 # 设置页面配置
 st.set_page_config(
@@ -19,48 +21,44 @@ st.set_page_config(
     }
 )
 
+# 开始统计本次运行的耗时（侧边栏可打开性能面板查看）
+instrumentation.begin_rerun()
+
 # 加载CSS样式
 ui.load_css()
 
-# 确保数据目录存在
-data_dir = utils.get_data_dir()
-if not os.path.exists(data_dir):
-    os.makedirs(data_dir)
+# 确保数据目录和数据存储存在（JSON 文件或 SQLite 数据库）
+utils.ensure_data_store()
 
-# 检查数据文件是否存在，如果不存在则创建一个空文件
-if not os.path.exists(utils.get_data_file()):
-    utils.save_data([])
+# 获取进程内共享的数据快照：会话只保存快照引用，数据被写入后才会换成新快照
+@metrics.timed("main.reload_data")
+def reload_data():
+    dataset = utils.get_dataset()
+    if st.session_state.get('dataset') is not dataset:
+        st.session_state.dataset = dataset
+        st.session_state.schools_data = dataset.records
+        st.session_state.last_reload_time = datetime.now()
 
-# 初始化会话状态
-if 'schools_data' not in st.session_state:
-    st.session_state.schools_data = utils.load_data()
-if 'last_reload_time' not in st.session_state:
-    st.session_state.last_reload_time = datetime.now()
+# 初始化会话状态；之后每次运行只检查数据版本号，版本不变时直接复用当前快照
+reload_data()
 if 'needs_rerun' not in st.session_state:
     st.session_state.needs_rerun = False
 
-# 定义重新加载数据的函数
-def reload_data():
-    st.session_state.schools_data = utils.load_data()
-    st.session_state.last_reload_time = datetime.now()
-
-# 只在会话开始或明确需要时重新加载数据
-if (datetime.now() - st.session_state.last_reload_time).total_seconds() > 60:
-    reload_data()
-
-# 数据变更后的回调函数，用于避免多次重新运行
+# 数据变更后的回调函数，用于避免多次重新运行；本次运行后续的渲染立即引用新快照
 def schedule_rerun():
+    reload_data()
     st.session_state.needs_rerun = True
 
-# 检查是否需要重新运行
+# 检查是否需要重新运行（写入时已发布增量更新的共享快照，无需重新加载）
 if st.session_state.needs_rerun:
     st.session_state.needs_rerun = False
-    reload_data()
     st.rerun()
 
 # 侧边栏导航
 st.sidebar.markdown('<h2 class="sub-header">考研调剂系统</h2>', unsafe_allow_html=True)
 app_mode = st.sidebar.selectbox("选择功能", ["首页", "添加学校", "查看数据", "删除学校", "数据导入", "数据分析"])
+instrumentation.enter_page(app_mode)
+instrumentation.display_panel()
 
 # 首页
 if app_mode == "首页":
@@ -174,7 +172,7 @@ elif app_mode == "添加学校":
             }
             
             # 添加到数据列表并保存
-            utils.add_school(new_school, st.session_state.schools_data)
+            utils.add_school(new_school)
             schedule_rerun()
             
             st.success(f"成功添加学校：{school_name}")
@@ -190,23 +188,51 @@ elif app_mode == "查看数据":
         # 搜索和筛选
         st.markdown('<div class="card">', unsafe_allow_html=True)
         st.markdown("### 搜索和筛选")
-        col1, col2, col3, col4 = st.columns([2, 2, 2, 1])
+        col1, col_scope, col2, col3, col4 = st.columns([2, 1, 2, 2, 1])
         
         with col1:
-            search_query = st.text_input("搜索学校名称", "")
+            search_query = st.text_input("搜索学校、专业或地区", "")
+        
+        with col_scope:
+            search_scope = st.selectbox("搜索范围", list(SEARCH_SCOPES))
         
         with col2:
             min_score = st.number_input("2024年最低分不低于", min_value=0, value=0)
         
         with col3:
-            sort_option = st.selectbox(
-                "排序方式",
-                ["名称 (A-Z)", "名称 (Z-A)", "2024最高分 (高-低)", "2024最低分 (高-低)"]
-            )
+            sort_option = st.selectbox("排序方式", columnar.SORT_OPTIONS)
             
         with col4:
             # 添加显示删除按钮的选项
             show_delete = st.checkbox("显示删除", False)
+        
+        col_mode, col_recruitment = st.columns([1, 2])
+        
+        with col_mode:
+            # 表格模式用一个表格显示全部结果，翻页时不需要重新渲染多个卡片
+            view_mode = st.radio("显示方式", ["卡片", "表格"], horizontal=True)
+        
+        with col_recruitment:
+            # 招生人数范围筛选（范围形式的招生人数与所选区间有交集即保留）
+            max_recruitment = int(st.session_state.dataset.table.recruitment_high.max())
+            recruitment_range = None
+            if max_recruitment > 0:
+                selected_range = st.slider("招生人数", 0, max_recruitment, (0, max_recruitment))
+                if selected_range != (0, max_recruitment):
+                    recruitment_range = selected_range
+        
+        # 所有条件组合为一个结构化查询
+        advanced = ui.advanced_filters(st.session_state.dataset, "view")
+        query = SchoolQuery(
+            text=search_query,
+            fields=SEARCH_SCOPES[search_scope],
+            scores=[("2024", "min", min_score, None)] + advanced["scores"],
+            spreads=advanced["spreads"],
+            regions=advanced["regions"],
+            majors=advanced["majors"],
+            recruitment=recruitment_range,
+            has_email=advanced["has_email"],
+        )
             
         st.markdown("</div>", unsafe_allow_html=True)
         
@@ -214,44 +240,32 @@ elif app_mode == "查看数据":
         results_container = st.container()
         
         with results_container:
-            # 过滤数据
-            @st.cache_data(ttl=30, show_spinner=False)
-            def filter_and_sort_schools(schools_data, search_query, min_score, sort_option):
-                filtered_data = schools_data.copy()
-                
-                if search_query:
-                    filtered_data = [
-                        school for school in filtered_data
-                        if search_query.lower() in school["name"].lower()
-                    ]
-                
-                if min_score > 0:
-                    filtered_data = [
-                        school for school in filtered_data
-                        if school["scores"]["2024"]["min"] >= min_score
-                    ]
-                
-                # 排序数据
-                if sort_option == "名称 (A-Z)":
-                    filtered_data = sorted(filtered_data, key=lambda x: x["name"])
-                elif sort_option == "名称 (Z-A)":
-                    filtered_data = sorted(filtered_data, key=lambda x: x["name"], reverse=True)
-                elif sort_option == "2024最高分 (高-低)":
-                    filtered_data = sorted(filtered_data, key=lambda x: x["scores"]["2024"]["max"], reverse=True)
-                elif sort_option == "2024最低分 (高-低)":
-                    filtered_data = sorted(filtered_data, key=lambda x: x["scores"]["2024"]["min"], reverse=True)
-                
-                return filtered_data
+            # 查询编译为列式分数表上的向量化掩码（全文条件走倒排索引），得到排序后的记录行号
+            dataset = st.session_state.dataset
+            with metrics.timer("view.filter_sort"):
+                filtered_rows = utils.filter_rows(dataset, query, sort_option)
+            metrics.count("view.matches", len(filtered_rows))
+            
+            # 筛选条件变化后，表格模式重新从第一块开始加载
+            filter_key = (query.key, sort_option, dataset.version)
+            if st.session_state.get("table_filter_key") != filter_key:
+                st.session_state.table_filter_key = filter_key
+                st.session_state.table_loaded_rows = ui.TABLE_BLOCK_SIZE
+                # 表格的选中行只对当前结果有效，结果变化（含删除）后换用新的表格 key 清除选择
+                st.session_state.table_generation = st.session_state.get("table_generation", 0) + 1
             
-            # 使用缓存过滤和排序
-            filtered_data = filter_and_sort_schools(st.session_state.schools_data, search_query, min_score, sort_option)
+            # 导出全部筛选结果（按当前排序）
+            if len(filtered_rows) > 0:
+                ui.export_panel(dataset, filtered_rows, "view")
             
             # 显示学校卡片
-            if not filtered_data:
+            if len(filtered_rows) == 0:
                 st.info("没有找到符合条件的学校。")
+            elif view_mode == "表格":
+                ui.display_results_table(st.session_state.schools_data, filtered_rows, show_delete, schedule_rerun)
             else:
                 # 添加分页功能
-                total_schools = len(filtered_data)
+                total_schools = len(filtered_rows)
                 schools_per_page = 6
                 total_pages = (total_schools + schools_per_page - 1) // schools_per_page  # 向上取整
                 
@@ -269,7 +283,8 @@ elif app_mode == "查看数据":
                 # 计算当前页的学校
                 start_idx = (st.session_state.current_page - 1) * schools_per_page
                 end_idx = min(start_idx + schools_per_page, total_schools)
-                current_page_schools = filtered_data[start_idx:end_idx]
+                current_page_schools = [st.session_state.schools_data[row] for row in filtered_rows[start_idx:end_idx]]
+                metrics.count("view.cards", len(current_page_schools))
                 
                 # 每行显示2个学校卡片
                 for i in range(0, len(current_page_schools), 2):
@@ -278,14 +293,14 @@ elif app_mode == "查看数据":
                     # 第一个卡片
                     if i < len(current_page_schools):
                         if show_delete:
-                            ui.display_school_card_with_delete(current_page_schools[i], cols[0], st.session_state.schools_data)
+                            ui.display_school_card_with_delete(current_page_schools[i], cols[0], schedule_rerun)
                         else:
                             ui.display_school_card(current_page_schools[i], cols[0])
                     
                     # 第二个卡片
                     if i + 1 < len(current_page_schools):
                         if show_delete:
-                            ui.display_school_card_with_delete(current_page_schools[i + 1], cols[1], st.session_state.schools_data)
+                            ui.display_school_card_with_delete(current_page_schools[i + 1], cols[1], schedule_rerun)
                         else:
                             ui.display_school_card(current_page_schools[i + 1], cols[1])
                 
@@ -331,30 +346,26 @@ elif app_mode == "删除学校":
             st.markdown("请选择要删除的学校：")
             
             # 创建学校选择下拉框
-            @st.cache_data(ttl=30, show_spinner=False)
-            def get_school_options(schools_data):
-                return [f"{school['id']} - {school['name']} - {school.get('major', '无专业')}" for school in schools_data]
-            
-            school_options = get_school_options(st.session_state.schools_data)
+            school_options = list(utils.school_options(st.session_state.dataset))
             selected_school = st.selectbox("选择要删除的学校", school_options)
             
             if selected_school:
                 school_id = int(selected_school.split(" - ")[0])
                 
                 # 查找选中的学校详情
-                selected_school_data = next((school for school in st.session_state.schools_data if school["id"] == school_id), None)
+                selected_school_data = st.session_state.dataset.get(school_id)
                 
                 if selected_school_data:
                     # 显示学校详情
                     st.markdown("#### 学校详情")
-                    st.markdown(f"**学校名称**: {selected_school_data['name']}")
-                    st.markdown(f"**专业**: {selected_school_data.get('major', '无专业')}")
-                    st.markdown(f"**地址**: {selected_school_data['address']}")
+                    st.markdown(f"**学校名称**: {selected_school_data.name}")
+                    st.markdown(f"**专业**: {'无专业' if selected_school_data.major is None else selected_school_data.major}")
+                    st.markdown(f"**地址**: {selected_school_data.address}")
                     
                     # 删除确认
                     if st.button("确认删除", key="single_delete"):
-                        if utils.delete_school(school_id, st.session_state.schools_data):
-                            st.success(f"已成功删除学校：{selected_school_data['name']}")
+                        if utils.delete_school(school_id):
+                            st.success(f"已成功删除学校：{selected_school_data.name}")
                             schedule_rerun()
                         else:
                             st.error("删除失败，请重试。")
@@ -364,11 +375,7 @@ elif app_mode == "删除学校":
             st.markdown("请选择要删除的学校：")
             
             # 创建学校多选框
-            @st.cache_data(ttl=30, show_spinner=False)
-            def get_school_options_dict(schools_data):
-                return {f"{school['id']} - {school['name']} - {school.get('major', '无专业')}": school["id"] for school in schools_data}
-            
-            school_options_dict = get_school_options_dict(st.session_state.schools_data)
+            school_options_dict = utils.school_options(st.session_state.dataset)
             selected_schools = st.multiselect("选择要删除的学校（可多选）", list(school_options_dict.keys()))
             
             if selected_schools:
@@ -377,7 +384,7 @@ elif app_mode == "删除学校":
                 
                 # 删除确认
                 if st.button("确认批量删除", key="batch_delete"):
-                    deleted_count = utils.batch_delete_schools(selected_school_ids, st.session_state.schools_data)
+                    deleted_count = utils.batch_delete_schools(selected_school_ids)
                     if deleted_count > 0:
                         st.success(f"已成功删除 {deleted_count} 所学校")
                         schedule_rerun()
@@ -387,41 +394,50 @@ elif app_mode == "删除学校":
             # 按条件批量删除
             st.markdown("### 按条件批量删除")
             
-            # 将数据转换为DataFrame进行筛选
-            schools_df = utils.json_to_dataframe(st.session_state.schools_data)
-            
             col1, col2 = st.columns(2)
             with col1:
                 min_score_filter = st.number_input("2024年最低分低于", min_value=0, value=0)
             with col2:
                 max_score_filter = st.number_input("2024年最高分低于", min_value=0, value=0)
             
-            if min_score_filter > 0 or max_score_filter > 0:
-                # 筛选出符合条件的学校
-                @st.cache_data(ttl=30, show_spinner=False)
-                def filter_schools_by_score(schools_data, min_score_filter, max_score_filter):
-                    filtered_schools = []
-                    for school in schools_data:
-                        if (min_score_filter > 0 and school["scores"]["2024"]["min"] < min_score_filter) or \
-                           (max_score_filter > 0 and school["scores"]["2024"]["max"] < max_score_filter):
-                            filtered_schools.append(school)
-                    return filtered_schools
-                
-                filtered_schools = filter_schools_by_score(st.session_state.schools_data, min_score_filter, max_score_filter)
+            # 还可以叠加高级筛选条件
+            advanced = ui.advanced_filters(st.session_state.dataset, "delete")
+            
+            # 最低分、最高分两个条件满足其一即可，各自再与高级筛选条件同时满足
+            conditions = []
+            if min_score_filter > 0:
+                conditions.append(("2024", "min", None, min_score_filter - 1))
+            if max_score_filter > 0:
+                conditions.append(("2024", "max", None, max_score_filter - 1))
+            queries = [
+                SchoolQuery(
+                    scores=[condition] + advanced["scores"],
+                    spreads=advanced["spreads"],
+                    regions=advanced["regions"],
+                    majors=advanced["majors"],
+                    has_email=advanced["has_email"],
+                )
+                for condition in conditions
+            ]
+            
+            if queries:
+                # 筛选出符合条件的学校（与查看数据页面共用查询引擎和结果缓存）
+                filtered_rows = utils.filter_rows_any(st.session_state.dataset, queries)
+                filtered_schools = [st.session_state.schools_data[row] for row in filtered_rows]
                 
                 if filtered_schools:
                     st.markdown(f"#### 符合条件的学校（共 {len(filtered_schools)} 所）")
                     
                     # 显示符合条件的学校列表
-                    filtered_df = utils.json_to_dataframe(filtered_schools)
+                    filtered_df = utils.records_to_dataframe(filtered_schools)
                     st.dataframe(filtered_df[["学校名称", "调剂专业", "2024最高分", "2024最低分"]], hide_index=True)
                     
                     # 获取符合条件的学校ID列表
-                    filtered_school_ids = [school["id"] for school in filtered_schools]
+                    filtered_school_ids = [school.id for school in filtered_schools]
                     
                     # 删除确认
                     if st.button("确认批量删除符合条件的学校", key="condition_delete"):
-                        deleted_count = utils.batch_delete_schools(filtered_school_ids, st.session_state.schools_data)
+                        deleted_count = utils.batch_delete_schools(filtered_school_ids)
                         if deleted_count > 0:
                             st.success(f"已成功删除 {deleted_count} 所学校")
                             schedule_rerun()
@@ -445,10 +461,9 @@ elif app_mode == "删除学校":
             if confirm_delete:
                 st.markdown('<div class="delete-all-button">', unsafe_allow_html=True)
                 if st.button("确认全部删除", key="delete_all_button"):
+                    deleted_total = len(st.session_state.schools_data)
                     if utils.delete_all_schools():
-                        st.success(f"已成功删除所有学校数据（共 {len(st.session_state.schools_data)} 所）")
-                        # 清空本地变量
-                        st.session_state.schools_data.clear()
+                        st.success(f"已成功删除所有学校数据（共 {deleted_total} 所）")
                         schedule_rerun()
                     else:
                         st.error("删除操作失败，请重试。")
@@ -468,51 +483,87 @@ elif app_mode == "数据导入":
     1. 必须包含以下列：`学校名称`, `学校地址`, `招生人数`, `2024最高分`, `2024最低分`, `2023最高分`, `2023最低分`, `2022最高分`, `2022最低分`, `2021最高分`, `2021最低分`, `邮箱`, `电话`
     2. 第一行必须是列名
     3. Excel文件请保存为`.xlsx`或`.xls`格式，CSV文件请保存为`.csv`格式
+    4. 可以一次选择多个文件，也可以把多个文件打包成`.zip`压缩包上传
     """)
     
-    # 创建模板
-    df_template = utils.create_template_data()
-    
-    # 创建一个临时Excel文件作为模板
-    template_file = os.path.join(data_dir, "template.xlsx")
-    df_template.to_excel(template_file, index=False)
-    
-    with open(template_file, "rb") as file:
-        st.download_button(
-            label="📥 下载导入模板",
-            data=file,
-            file_name="调剂学校数据导入模板.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+    # 模板文件内容在进程内生成一次后直接从内存提供，打开页面不写磁盘
+    st.download_button(
+        label="📥 下载导入模板",
+        data=utils.template_bytes(),
+        file_name="调剂学校数据导入模板.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
     
-    # 文件上传
-    uploaded_file = st.file_uploader("上传Excel/CSV文件", type=["xlsx", "xls", "csv"])
+    # 文件上传（可一次选择多个文件，或上传包含多个文件的 zip 压缩包）
+    uploaded_files = st.file_uploader(
+        "上传Excel/CSV文件或zip压缩包（可多选）",
+        type=["xlsx", "xls", "csv", "zip"],
+        accept_multiple_files=True
+    )
     st.markdown("</div>", unsafe_allow_html=True)
     
-    if uploaded_file is not None:
-        # 尝试导入文件
-        success, message, new_schools = utils.import_from_file(uploaded_file, st.session_state.schools_data)
+    if uploaded_files:
+        # 同一批上传只解析一次，之后的页面运行直接使用保存的结果
+        upload_key = tuple(file.file_id for file in uploaded_files)
+        if st.session_state.get("import_upload_key") != upload_key:
+            with st.spinner(f"正在解析 {len(uploaded_files)} 个文件..."):
+                st.session_state.import_result = utils.import_from_files(uploaded_files)
+            st.session_state.import_upload_key = upload_key
+        success, message, new_schools, file_results = st.session_state.import_result
         
         if not success:
             st.error(message)
         else:
             st.success(message)
+        
+        # 多个文件时逐个显示解析结果和错误原因
+        if len(file_results) > 1:
+            st.dataframe(utils.import_report(file_results), hide_index=True)
+        
+        # 预览导入的数据
+        if new_schools and len(new_schools) > 0:
+            preview_df = utils.preview_dataframe(new_schools)
+            st.dataframe(preview_df, hide_index=True)
             
-            # 预览导入的数据
-            if new_schools and len(new_schools) > 0:
-                preview_df = utils.json_to_dataframe(new_schools)
-                st.dataframe(preview_df.head(5), hide_index=True)
+            # 导入方式：默认与原来一样全部追加，也可按学校名称+专业合并（已有的更新、内容相同的跳过）
+            import_mode = st.radio(
+                "导入方式",
+                ["全部追加为新学校", "更新已有学校（按学校名称+专业匹配）"],
+                index=0,
+                horizontal=True
+            )
+            upsert = import_mode.startswith("更新")
+            
+            if upsert:
+                # 同一批文件、同一数据版本只计算一次
+                plan_key = (st.session_state.import_upload_key, st.session_state.dataset.cache_key)
+                if st.session_state.get("upsert_plan_key") != plan_key:
+                    st.session_state.upsert_plan = utils.preview_upsert(new_schools, st.session_state.dataset)
+                    st.session_state.upsert_plan_key = plan_key
+                plan = st.session_state.upsert_plan
+                col_insert, col_update, col_skip = st.columns(3)
+                col_insert.metric("新增", len(plan.inserts))
+                col_update.metric("更新", len(plan.updates))
+                col_skip.metric("跳过（无变化或重复）", plan.skipped)
+            
+            if st.button("确认导入数据"):
+                # 所有文件的数据在同一次提交中写入存储，并在提交时分配 id
+                if upsert:
+                    success, plan = utils.upsert_schools(new_schools)
+                    message = f"新增 {len(plan.inserts)} 所、更新 {len(plan.updates)} 所、跳过 {plan.skipped} 所学校数据"
+                else:
+                    success = utils.add_schools(new_schools)
+                    message = f"导入 {len(new_schools)} 所学校数据"
                 
-                if st.button("确认导入数据"):
-                    # 添加到现有数据
-                    st.session_state.schools_data.extend(new_schools)
-                    
-                    # 保存数据
-                    utils.save_data(st.session_state.schools_data)
+                if success:
+                    # 已导入的这批文件不再显示确认按钮，避免重复导入
+                    st.session_state.import_result = (True, f"已{message}", None, file_results)
                     schedule_rerun()
                     
-                    st.success(f"成功导入 {len(new_schools)} 所学校数据！")
+                    st.success(f"成功{message}！")
                     st.balloons()
+                else:
+                    st.error("导入失败，请重试。")
 
 # 数据分析页面
 elif app_mode == "数据分析":
@@ -521,11 +572,12 @@ elif app_mode == "数据分析":
     if not st.session_state.schools_data:
         st.warning("当前没有学校数据，请先添加学校或导入数据。")
     else:
-        # 转换为DataFrame进行分析
-        schools_df = utils.json_to_dataframe(st.session_state.schools_data)
+        # 图表和统计都以数据快照为参数缓存，学校名称选项同样按快照缓存
+        dataset = st.session_state.dataset
+        school_names = utils.school_names(dataset)
         
         # 分析TAB
-        tab1, tab2, tab3 = st.tabs(["分数线趋势", "学校对比", "招生人数分析"])
+        tab1, tab2, tab3, tab4 = st.tabs(["分数线趋势", "学校对比", "招生人数分析", "分组统计"])
         
         with tab1:
             st.markdown('<div class="card">', unsafe_allow_html=True)
@@ -534,13 +586,11 @@ elif app_mode == "数据分析":
             # 选择学校
             selected_school = st.selectbox(
                 "选择学校查看历年分数线趋势",
-                schools_df["学校名称"].tolist()
+                school_names
             )
             
-            school_data = schools_df[schools_df["学校名称"] == selected_school].iloc[0]
-            
             # 创建折线图
-            fig = ui.create_score_trend_chart(school_data)
+            fig = ui.create_score_trend_chart(dataset, selected_school)
             st.plotly_chart(fig, use_container_width=True)
             st.markdown("</div>", unsafe_allow_html=True)
         
@@ -551,7 +601,7 @@ elif app_mode == "数据分析":
             # 选择多个学校进行对比
             selected_schools = st.multiselect(
                 "选择要对比的学校 (最多5所)",
-                schools_df["学校名称"].tolist(),
+                school_names,
                 max_selections=5
             )
             
@@ -564,7 +614,7 @@ elif app_mode == "数据分析":
                 
                 # 创建对比图表
                 fig, compare_df = ui.create_school_comparison_chart(
-                    schools_df, selected_schools, compare_year
+                    dataset, selected_schools, compare_year
                 )
                 st.plotly_chart(fig, use_container_width=True)
                 
@@ -581,11 +631,45 @@ elif app_mode == "数据分析":
             st.markdown("### 招生人数分析")
             
             # 创建招生人数图表
-            fig = ui.create_recruitment_chart(schools_df)
+            fig = ui.create_recruitment_chart(dataset)
             st.plotly_chart(fig, use_container_width=True)
             
             # 招生人数统计
             st.markdown("#### 招生人数统计")
-            ui.display_recruitment_stats(schools_df)
+            ui.display_recruitment_stats(dataset)
             
-            st.markdown("</div>", unsafe_allow_html=True) 
\ No newline at end of file
+            st.markdown("</div>", unsafe_allow_html=True)
+        
+        with tab4:
+            st.markdown('<div class="card">', unsafe_allow_html=True)
+            st.markdown("### 按省份/专业/年份分组统计")
+            st.caption("统计表在数据变更时增量维护，分数为 0（未填写）的记录不参与统计")
+            
+            col_dimension, col_year, col_kind = st.columns(3)
+            with col_dimension:
+                dimension_label = st.selectbox("分组方式", ["省份", "专业", "年份"])
+            with col_year:
+                # 按年份分组时汇总全部年份
+                summary_year = st.selectbox(
+                    "年份", ["2024", "2023", "2022", "2021"], disabled=dimension_label == "年份"
+                )
+            with col_kind:
+                kind_label = st.selectbox("分数", list(aggregates.SCORE_KINDS.values()))
+            
+            dimension = {"省份": "province", "专业": "major", "年份": "all"}[dimension_label]
+            if dimension == "all":
+                summary_year = None
+            kind = {label: kind for kind, label in aggregates.SCORE_KINDS.items()}[kind_label]
+            
+            summary_df = utils.score_summary(dataset, dimension, summary_year, kind)
+            if summary_df.empty:
+                st.info("没有可统计的分数数据")
+            else:
+                fig = ui.create_score_summary_chart(dataset, dimension, summary_year, kind)
+                st.plotly_chart(fig, use_container_width=True)
+                st.dataframe(summary_df, hide_index=True, use_container_width=True)
+            
+            st.markdown("</div>", unsafe_allow_html=True)
+
+# 结束本次运行的统计
+instrumentation.end_rerun()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 测试按页面的方式导入 core / components（app 目录在 sys.path 中）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,26 @@
+# 测试用的 JSON 结构学校记录
+def school_json(school_id, name):
+    return {
+        "id": school_id,
+        "name": name,
+        "address": "",
+        "major": "",
+        "recruitment_count": 1,
+        "scores": {year: {"max": 0, "min": 0} for year in ("2024", "2023", "2022", "2021")},
+        "contact": {"email": "", "phone": ""},
+        "remark": "",
+        "created_at": "",
+    }
+
+
+def names(records):
+    return [school["name"] for school in records]
+
+
+# 测试用的 School 记录，分数按年份从 2024 到 2021 依次为 (最高分, 最低分)
+def school(school_id, name, address="", major="", recruitment_count=1, scores=(), email=""):
+    from core.record import School
+
+    scores = list(scores) + [(0, 0)] * (4 - len(scores))
+    return School(school_id, name, address, major, recruitment_count,
+                  [value for pair in scores for value in pair], email)
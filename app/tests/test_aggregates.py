@@ -0,0 +1,52 @@
+from core.aggregates import DIMENSIONS, ScoreAggregates
+from core.columnar import YEARS, ScoreTable
+
+from records import school
+
+
+def _records():
+    return [
+        school(1, "北京大学", "北京市海淀区", "软件工程", scores=[(390, 350), (385, 345)]),
+        school(2, "清华大学", "北京市海淀区", "计算机科学与技术", scores=[(400, 360)]),
+        school(3, "复旦大学", "上海市杨浦区", "软件工程", scores=[(380, 350), (0, 0), (370, 330)]),
+    ]
+
+
+def _summaries(aggregates):
+    return {
+        (dimension, year, kind): aggregates.summary(dimension, year, kind)
+        for dimension in DIMENSIONS for year in (*YEARS, None) for kind in ("max", "min")
+    }
+
+
+def _assert_matches_rebuilt(aggregates, records):
+    assert _summaries(aggregates) == _summaries(ScoreAggregates.from_table(ScoreTable.from_records(records)))
+
+
+def test_added_and_removed_match_from_table():
+    records = _records()
+    aggregates = ScoreAggregates.from_table(ScoreTable.from_records(records))
+    _assert_matches_rebuilt(aggregates, records)
+
+    added = [school(4, "南京大学", "江苏省南京市", "软件工程", scores=[(390, 340)]),
+             school(5, "北京大学", "北京市海淀区", "软件工程", scores=[(390, 350)])]
+    aggregates = aggregates.added(added)
+    records = records + added
+    _assert_matches_rebuilt(aggregates, records)
+
+    removed = [records[0], records[2]]
+    aggregates = aggregates.removed(removed)
+    records = [s for s in records if s not in removed]
+    _assert_matches_rebuilt(aggregates, records)
+
+    # 删除某个分组的全部记录后该分组不再出现
+    aggregates = aggregates.removed([s for s in records if s.address.startswith("北京")])
+    groups = [row["group"] for row in aggregates.summary("province", "2024", "max")]
+    assert groups == ["江苏"]
+
+
+def test_added_and_removed_are_inverse():
+    base = ScoreAggregates.from_records(_records())
+    extra = [school(6, "浙江大学", "浙江省杭州市", "软件工程", scores=[(395, 355)])]
+    assert _summaries(base.added(extra).removed(extra)) == _summaries(base)
+    assert base.added([]) is base and base.removed([]) is base
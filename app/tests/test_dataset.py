@@ -0,0 +1,145 @@
+import numpy as np
+
+from core.dataset import SchoolDataset, SharedDataset
+
+from records import school
+
+
+def _base():
+    return SchoolDataset([
+        school(1, "北京大学", "北京市海淀区", "软件工程", scores=[(390, 350)]),
+        school(2, "复旦大学", "上海市杨浦区", "计算机科学与技术", scores=[(380, 340)]),
+        school(3, "南京大学", "江苏省南京市", "软件工程", scores=[(370, 330)]),
+    ], version=1)
+
+
+def _build_all(dataset):
+    return dataset.table, dataset.search_index, dataset.key_index, dataset.aggregates
+
+
+def _assert_matches_rebuilt(dataset):
+    rebuilt = SchoolDataset(list(dataset.records))
+    assert np.array_equal(dataset.table.ids, rebuilt.table.ids)
+    assert np.array_equal(dataset.table.scores_max, rebuilt.table.scores_max)
+    for text in ("大学", "软件", "上海"):
+        assert np.array_equal(dataset.search_mask(text), rebuilt.search_mask(text))
+    assert dataset.key_index == rebuilt.key_index
+
+
+def test_derived_snapshots_update_built_structures():
+    base = _base()
+    _build_all(base)
+
+    added = base.with_added([school(4, "浙江大学", "浙江省杭州市", "软件工程", scores=[(360, 320)])])
+    _assert_matches_rebuilt(added)
+    updated = added.with_updated([school(2, "复旦大学", "上海市", "软件工程", scores=[(400, 345)])])
+    _assert_matches_rebuilt(updated)
+    removed, ids = updated.without_ids([1, 99])
+    _assert_matches_rebuilt(removed)
+
+    assert ids == [1]
+    assert [s.id for s in removed] == [2, 3, 4]
+    assert removed.get(2).major == "软件工程"
+    # 原快照不受影响
+    assert [s.id for s in base] == [1, 2, 3] and base.get(2).major == "计算机科学与技术"
+
+
+def test_without_ids_removes_duplicate_ids():
+    dataset = SchoolDataset([school(1, "A"), school(2, "B"), school(1, "C")])
+    removed, ids = dataset.without_ids([1])
+    assert ids == [1]
+    assert [s.name for s in removed] == ["B"]
+
+
+def test_cache_key_follows_version():
+    base = _base()
+    derived = base.with_added([school(4, "D")])
+    assert base.cache_key == (base.dataset_id, 1)
+    assert derived.version is None and derived.cache_key != base.cache_key
+
+
+def test_shared_dataset_commit_publishes_derived_snapshot():
+    state = {"version": 1, "records": list(_base().records)}
+    loads = []
+
+    def load(version):
+        loads.append(version)
+        return list(state["records"])
+
+    def write(updated, result):
+        state["records"] = list(updated.records)
+        state["version"] += 1
+        return state["version"]
+
+    shared = SharedDataset(load, lambda: state["version"])
+    base = shared.snapshot()
+    success, ids = shared.commit(lambda dataset: dataset.without_ids([3]), write)
+    assert success and ids == [3]
+    current = shared.snapshot()
+    assert current is not base and current.version == 2
+    assert [s.id for s in current] == [1, 2]
+    # 写入后直接发布派生的快照，不重新加载
+    assert loads == [1]
+
+
+def test_shared_dataset_reloads_after_external_write():
+    state = {"version": 1, "records": list(_base().records)}
+    shared = SharedDataset(lambda version: list(state["records"]), lambda: state["version"])
+    first = shared.snapshot()
+    assert shared.snapshot() is first
+
+    state["records"] = state["records"][:1]
+    state["version"] = 2
+    assert [s.id for s in shared.snapshot()] == [1]
+
+
+def _conflicting_store(conflicts):
+    """每次派生时（未持有写锁时）模拟其他进程先写入一次，共 conflicts 次的存储"""
+    state = {"version": 1, "records": list(_base().records), "locked": [], "conflicts": conflicts}
+
+    def write(updated, result):
+        state["records"] = list(updated.records)
+        state["version"] += 1
+        return state["version"]
+
+    def derive(dataset):
+        holding = state.get("depth", 0) > 0
+        state["locked"].append(holding)
+        # 持有写锁时其他进程无法写入
+        if state["conflicts"] and not holding:
+            state["conflicts"] -= 1
+            write(dataset.with_added([school(100 + state["version"], "其他进程")]), None)
+        new_id = max(s.id for s in dataset) + 1
+        return dataset.with_added([school(new_id, "本会话")]), new_id
+
+    # 可重入的写锁，记录持有的层数
+    class WriteLock:
+        def __enter__(self):
+            state["depth"] = state.get("depth", 0) + 1
+
+        def __exit__(self, *exc_info):
+            state["depth"] -= 1
+
+    shared = SharedDataset(lambda version: list(state["records"]), lambda: state["version"],
+                           write_lock=WriteLock)
+    return shared, derive, write, state
+
+
+def test_commit_rederives_after_concurrent_write():
+    shared, derive, write, state = _conflicting_store(1)
+    success, new_id = shared.commit(derive, write)
+    assert success
+    # 第一次派生时其他进程写入了，重新派生后两边的记录都在
+    assert [s.name for s in state["records"]][-2:] == ["其他进程", "本会话"]
+    assert new_id == state["records"][-1].id and state["locked"] == [False, False]
+
+
+def test_commit_derives_under_write_lock_on_last_attempt():
+    attempts = SharedDataset.MAX_OPTIMISTIC_ATTEMPTS
+    shared, derive, write, state = _conflicting_store(attempts)
+    success, _ = shared.commit(derive, write)
+    assert success
+    assert state["locked"] == [False] * (attempts - 1) + [True]
+    # 最后一次在写锁内派生并写入，不会再丢失其他进程的记录
+    assert [s.name for s in state["records"]].count("其他进程") == attempts - 1
+    assert state["records"][-1].name == "本会话"
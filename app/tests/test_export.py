@@ -0,0 +1,58 @@
+import io
+
+import pandas as pd
+import pytest
+
+from core import export
+from core.importer import iter_import_batches
+
+from records import school
+
+
+def _records():
+    return [
+        school(1, "北京大学", "北京市海淀区", "软件工程", 20, scores=[(390, 350), (385, 345)], email="a@pku.edu.cn"),
+        school(2, "复旦大学", "上海市杨浦区", "计算机科学与技术", "2-4", scores=[(380, 340)]),
+        school(3, "南京大学", "江苏省南京市", "软件工程", 5),
+    ]
+
+
+def _content(school):
+    return (school.name, school.address, school.major, school.recruitment_count,
+            list(school.scores), school.email, school.phone, school.remark or "")
+
+
+def _export(export_format, records, rows=None):
+    file = io.BytesIO()
+    assert export.export_records(records, file, export_format, rows, chunk_rows=2) == len(rows or records)
+    file.seek(0)
+    return file
+
+
+@pytest.mark.parametrize("export_format", ["csv", "xlsx"])
+def test_export_round_trips_through_importer(export_format):
+    records = _records()
+    file = _export(export_format, records)
+    file.name = f"export{export.FORMATS[export_format][0]}"
+    imported = [s for batch in iter_import_batches(file) for s in batch]
+    assert [_content(s) for s in imported] == [_content(s) for s in records]
+
+
+def test_export_writes_selected_rows_in_order():
+    file = _export("csv", _records(), [2, 0])
+    file.name = "export.csv"
+    assert [s.name for batch in iter_import_batches(file) for s in batch] == ["南京大学", "北京大学"]
+
+
+def test_parquet_export_keeps_columns():
+    pytest.importorskip("pyarrow")
+    frame = pd.read_parquet(_export("parquet", _records()))
+    assert list(frame.columns) == export.EXPORT_COLUMNS
+    assert frame["学校名称"].tolist() == ["北京大学", "复旦大学", "南京大学"]
+    assert frame["招生人数"].tolist() == ["20", "2-4", "5"]
+    assert frame["2024最高分"].tolist() == [390, 380, 0]
+
+
+def test_empty_export_writes_header():
+    frame = pd.read_csv(_export("csv", []), encoding="utf-8-sig")
+    assert list(frame.columns) == export.EXPORT_COLUMNS and frame.empty
@@ -0,0 +1,37 @@
+import os
+
+from core.figure_cache import FigureCache, fingerprint
+
+
+def test_fingerprint_hits_only_for_equal_content(tmp_path):
+    cache = FigureCache(str(tmp_path))
+    cache.put(fingerprint("scatter", {"year": "2024", "kind": "max"}, [1, 2]), '{"data": []}')
+    assert cache.get(fingerprint("scatter", {"kind": "max", "year": "2024"}, [1, 2])) == '{"data": []}'
+    assert cache.get(fingerprint("scatter", {"year": "2024", "kind": "min"}, [1, 2])) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = FigureCache(str(tmp_path), max_bytes=30)
+    for key in ("a", "b", "c"):
+        cache.put(key, "x" * 10)
+    assert cache.get("a") is not None
+    cache.put("d", "x" * 10)
+    # b 最久未用，先被淘汰；a 刚被读取过，保留
+    assert cache.get("b") is None
+    assert [key for key in "acd" if cache.get(key) is not None] == ["a", "c", "d"]
+    assert cache.size == 30 and sorted(os.listdir(tmp_path)) == ["a.json", "c.json", "d.json"]
+
+
+def test_oversized_payload_is_not_cached(tmp_path):
+    cache = FigureCache(str(tmp_path), max_bytes=5)
+    cache.put("big", "x" * 6)
+    assert cache.get("big") is None and len(cache) == 0
+
+
+def test_entries_written_by_other_processes_are_tracked(tmp_path):
+    FigureCache(str(tmp_path)).put("shared", "x" * 10)
+    cache = FigureCache(str(tmp_path), max_bytes=15)
+    assert cache.get("shared") == "x" * 10
+    cache.put("new", "y" * 10)
+    assert len(cache) == 1 and cache.get("shared") is None
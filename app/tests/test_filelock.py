@@ -0,0 +1,39 @@
+import threading
+
+from core.filelock import FileLock
+
+
+def _acquire_in_thread(lock):
+    acquired = threading.Event()
+
+    def run():
+        with lock:
+            acquired.set()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread, acquired
+
+
+def test_lock_is_reentrant_and_released_by_outermost_exit(tmp_path):
+    path = str(tmp_path / "data" / "schools.json.lock")
+    lock = FileLock(path)
+    with lock:
+        with lock:
+            # 另一个锁对象（相当于另一个进程）打开同一个锁文件，要等到最外层释放
+            thread, acquired = _acquire_in_thread(FileLock(path))
+        assert not acquired.wait(0.2)
+    assert acquired.wait(5)
+    thread.join(5)
+
+
+def test_other_threads_wait_for_the_holder(tmp_path):
+    lock = FileLock(str(tmp_path / "schools.json.lock"))
+    with lock:
+        thread, acquired = _acquire_in_thread(lock)
+        assert not acquired.wait(0.2)
+    assert acquired.wait(5)
+    thread.join(5)
+    # 释放后可以再次获得
+    with lock:
+        pass
@@ -0,0 +1,84 @@
+import io
+import zipfile
+
+import pytest
+
+from core.importer import REQUIRED_COLUMNS, ImportFormatError, iter_import_batches, parse_files
+
+
+def _csv(rows, columns=REQUIRED_COLUMNS):
+    lines = [",".join(columns)] + [",".join(row) for row in rows]
+    file = io.BytesIO("\n".join(lines).encode("utf-8"))
+    file.name = "schools.csv"
+    return file
+
+
+def _row(name, count):
+    return [name, "北京", "软件工程", count, *["350"] * 8, "", ""]
+
+
+def _import(rows):
+    return [school for batch in iter_import_batches(_csv(rows)) for school in batch]
+
+
+def test_recruitment_count_keeps_ints_and_ranges():
+    records = _import([_row("A", "20"), _row("B", "2-4"), _row("C", "")])
+    assert [school.recruitment_count for school in records] == [20, "2-4", 0]
+    assert (records[1].recruitment["low"], records[1].recruitment["high"]) == (2, 4)
+
+
+def test_rows_without_name_are_skipped():
+    records = _import([_row("", "5"), _row("A", "5")])
+    assert [school.name for school in records] == ["A"]
+    assert records[0].id is None
+
+
+def test_missing_columns_raise():
+    with pytest.raises(ImportFormatError, match="招生人数"):
+        list(iter_import_batches(_csv([], [column for column in REQUIRED_COLUMNS if column != "招生人数"])))
+
+
+def test_parse_files_reports_errors_per_file():
+    bad = _csv([], ["学校名称"])
+    bad.name = "bad.csv"
+    result = parse_files([_csv([_row("A", "5")]), bad])
+    assert [school.name for school in result.records] == ["A"]
+    assert [failed.name for failed in result.failed] == ["bad.csv"]
+
+
+def _zip(members):
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, "w") as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    file = io.BytesIO(data.getvalue())
+    file.name = "schools.zip"
+    return file
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_parse_files_expands_zip_and_keeps_upload_order(tmp_path, max_workers):
+    path = tmp_path / "path.csv"
+    path.write_bytes(_csv([_row("D", "1")]).getvalue())
+    archive = _zip({
+        "北京/a.csv": _csv([_row("A", "5"), _row("B", "6")]).getvalue(),
+        "上海/b.csv": _csv([_row("C", "7")]).getvalue(),
+        "说明.txt": "忽略",
+        "__MACOSX/北京/._a.csv": "忽略",
+    })
+    result = parse_files([archive, _csv([_row("E", "2")]), str(path)], max_workers=max_workers)
+    assert [file.name for file in result.files] == [
+        "schools.zip/北京/a.csv", "schools.zip/上海/b.csv", "schools.csv", "path.csv",
+    ]
+    assert [school.name for school in result.records] == ["A", "B", "C", "E", "D"]
+    assert result.rows == 5 and not result.failed
+
+
+def test_parse_files_reports_bad_and_empty_zips():
+    bad = io.BytesIO(b"not a zip")
+    bad.name = "bad.zip"
+    empty = _zip({"readme.txt": "无"})
+    empty.name = "empty.zip"
+    result = parse_files([bad, empty, _csv([_row("A", "5")])])
+    assert [failed.name for failed in result.failed] == ["bad.zip", "empty.zip"]
+    assert [school.name for school in result.records] == ["A"]
@@ -0,0 +1,63 @@
+import json
+
+from core.journal import OP_ADD, OP_DELETE, OP_UPDATE, apply_changes
+from core.storage import JsonStorage
+
+from records import names, school_json
+
+
+def _journal(*changes):
+    return "".join(json.dumps(change, ensure_ascii=False) + "\n" for change in changes).encode("utf-8")
+
+
+def test_replay_keeps_duplicate_ids_and_order():
+    records = [school_json(1, "A"), school_json(2, "B"), school_json(2, "C")]
+    replayed = apply_changes(records, _journal({"op": OP_ADD, "records": [school_json(3, "D")]}))
+    assert names(replayed) == ["A", "B", "C", "D"]
+
+
+def test_replay_updates_and_deletes_every_record_with_the_id():
+    records = [school_json(1, "A"), school_json(2, "B"), school_json(2, "C"), school_json(3, "D")]
+    raw = _journal(
+        {"op": OP_UPDATE, "records": [school_json(2, "B2")]},
+        {"op": OP_DELETE, "ids": [1]},
+    )
+    assert names(apply_changes(records, raw)) == ["B2", "B2", "D"]
+    raw = _journal({"op": OP_DELETE, "ids": [2, 99]})
+    assert names(apply_changes(records, raw)) == ["A", "D"]
+
+
+def test_replay_is_idempotent():
+    records = [school_json(1, "A")]
+    raw = _journal(
+        {"op": OP_ADD, "records": [school_json(2, "B")]},
+        {"op": OP_UPDATE, "records": [school_json(2, "B2")]},
+    )
+    once = apply_changes(records, raw)
+    assert names(once) == ["A", "B2"]
+    # 压缩中断后日志可能在已合并的快照上再次回放
+    assert apply_changes(once, raw) == once
+
+
+def test_update_does_not_restore_deleted_record():
+    raw = _journal(
+        {"op": OP_DELETE, "ids": [1]},
+        {"op": OP_UPDATE, "records": [school_json(1, "A2")]},
+    )
+    assert apply_changes([school_json(1, "A")], raw) == []
+
+
+def test_incomplete_line_is_ignored():
+    raw = _journal({"op": OP_ADD, "records": [school_json(2, "B")]}) + b'{"op": "add", "rec'
+    assert names(apply_changes([school_json(1, "A")], raw)) == ["A", "B"]
+
+
+def test_storage_keeps_legacy_duplicates_after_append(tmp_path):
+    path = tmp_path / "schools.json"
+    path.write_text(json.dumps([school_json(1, "A"), school_json(2, "B"), school_json(2, "C")]), encoding="utf-8")
+    storage = JsonStorage(str(path))
+    storage.insert(school_json(storage.allocate_ids(1), "D"))
+    # 另一个进程（新的存储实例）读到的数据与写入方一致
+    assert names(JsonStorage(str(path)).load_all()) == ["A", "B", "C", "D"]
+    assert JsonStorage(str(path)).compact()
+    assert names(JsonStorage(str(path)).load_all()) == ["A", "B", "C", "D"]
@@ -0,0 +1,74 @@
+import numpy as np
+
+from core.dataset import SchoolDataset
+from core.mapped import MappedRecords, MappedStore
+from core.upsert import dedup_key
+
+from records import school
+
+
+def _records():
+    return [
+        school(1, "北京大学", "北京市海淀区", "软件工程", scores=[(390, 350)]),
+        school(2, "复旦大学", "上海市杨浦区", "计算机科学与技术", scores=[(380, 340)]),
+        school(3, "南京大学", "江苏省南京市", "软件工程", scores=[(370, 330)]),
+        school(4, "北京大学", "北京市海淀区", "软件工程", scores=[(360, 320)]),
+    ]
+
+
+def _load(tmp_path, records, source=("json", "schools.json"), generation=1):
+    return MappedStore(str(tmp_path), source).load(generation, lambda: generation, lambda: records)
+
+
+def _assert_same(mapped, plain):
+    assert list(mapped) == list(plain)
+    assert np.array_equal(mapped.ids(), [s.id for s in plain])
+    mapped_dataset, plain_dataset = SchoolDataset(mapped), SchoolDataset(list(plain))
+    for text in ("大学", "北京", "软件", "上海", "浙江"):
+        assert np.array_equal(mapped_dataset.search_mask(text), plain_dataset.search_mask(text)), text
+    assert dict(mapped_dataset.key_index) == plain_dataset.key_index
+
+
+def test_stores_of_different_backends_do_not_share_files(tmp_path):
+    json_records = _load(tmp_path, _records()[:2], ("json", "schools.json"))
+    sqlite_records = _load(tmp_path, _records()[2:], ("sqlite", "schools.db"))
+    assert [s.id for s in json_records] == [1, 2]
+    assert [s.id for s in sqlite_records] == [3, 4]
+    # 重新映射时仍按存储区分
+    assert [s.id for s in _load(tmp_path, [], ("json", "schools.json"))] == [1, 2]
+
+
+def test_overlays_match_plain_list(tmp_path):
+    plain = _records()
+    mapped = _load(tmp_path, plain)
+    _assert_same(mapped, plain)
+
+    replacement = school(2, "浙江大学", "浙江省杭州市", "软件工程")
+    mapped, rows = mapped.replaced({2: replacement})
+    plain = [replacement if s.id == 2 else s for s in plain]
+    assert rows == [1]
+    _assert_same(mapped, plain)
+
+    added = [school(5, "复旦大学", "上海市", "计算机科学与技术")]
+    mapped, plain = mapped + added, plain + added
+    _assert_same(mapped, plain)
+
+    mapped, removed = mapped.without_ids({1, 5})
+    assert [s.id for s in removed] == [1, 5]
+    plain = [s for s in plain if s.id not in (1, 5)]
+    _assert_same(mapped, plain)
+
+
+def test_indexes_are_read_from_the_image(tmp_path):
+    records = _records()
+    mapped = _load(tmp_path, records)
+
+    def decode(rows):
+        raise AssertionError("不应解码记录")
+
+    mapped.image.decode = decode
+    by_id = {s.id: s for s in records}
+    assert mapped.search_index().search("北京", lambda ids, fields: [by_id[school_id] for school_id in ids]) == {1, 4}
+    key_index = mapped.key_index()
+    assert key_index[dedup_key(school(0, "北京大学", major="软件工程"))] == (1, 4)
+    assert len(key_index) == 3
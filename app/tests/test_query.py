@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from core.dataset import SchoolDataset
+from core.query import SchoolQuery, filter_rows, run_any, run_query
+
+from records import school
+
+
+@pytest.fixture
+def dataset():
+    return SchoolDataset([
+        school(1, "北京大学", "北京市海淀区", "软件工程", 5, [(390, 350), (385, 340)], "a@pku.edu.cn"),
+        school(2, "复旦大学", "上海市杨浦区", "计算机科学与技术", "2-4", [(380, 340), (370, 360)]),
+        school(3, "南京大学", "江苏省南京市", "软件工程", 10, [(370, 330), (360, 300)]),
+        school(4, "北京理工大学", "北京市海淀区", "计算机科学与技术", 1, [(360, 300), (350, 310)], "b@bit.edu.cn"),
+    ], version=1)
+
+
+def _ids(dataset, rows):
+    return [dataset.records[row].id for row in np.asarray(rows).tolist()]
+
+
+def test_equivalent_queries_share_key():
+    assert SchoolQuery(regions=["北京", " 上海", "北京"]) == SchoolQuery(regions=["上海", "北京"])
+    assert SchoolQuery(scores=[("2024", "min", 0, None)]) == SchoolQuery()
+    merged = SchoolQuery(scores=[("2024", "min", 300, None), ("2024", "min", None, 360)])
+    assert merged.scores == (("2024", "min", 300, 360),)
+    assert not SchoolQuery(text="  ") and SchoolQuery(has_email=False)
+    with pytest.raises(ValueError):
+        SchoolQuery(scores=[("2020", "min", 1, None)])
+
+
+@pytest.mark.parametrize("query, expected", [
+    (SchoolQuery(), [1, 2, 3, 4]),
+    (SchoolQuery(scores=[("2024", "min", 340, None)]), [1, 2]),
+    (SchoolQuery(spreads=[("2023", None, 20)]), [2]),
+    (SchoolQuery(regions=["北京", "江苏"]), [1, 3, 4]),
+    (SchoolQuery(majors=["软件工程"]), [1, 3]),
+    (SchoolQuery(recruitment=(3, 4)), [2]),
+    (SchoolQuery(has_email=True), [1, 4]),
+    (SchoolQuery(text="北京", fields=("name",), majors=["计算机科学与技术"]), [4]),
+])
+def test_filter_rows(dataset, query, expected):
+    assert _ids(dataset, filter_rows(dataset, query)) == expected
+
+
+def test_run_query_sorts_lazily_and_caches(dataset):
+    query = SchoolQuery(regions=["北京", "江苏"])
+    result = run_query(dataset, query, "2024最高分 (高-低)")
+    assert len(result) == 3
+    assert _ids(dataset, result[:1]) == [1]
+    assert _ids(dataset, result) == [1, 3, 4]
+    assert _ids(dataset, [result[-1]]) == [4]
+    with pytest.raises(IndexError):
+        result[3]
+    assert run_query(dataset, SchoolQuery(regions=["江苏", "北京"]), "2024最高分 (高-低)") is result
+
+
+def test_run_any_returns_union(dataset):
+    rows = run_any(dataset, [SchoolQuery(majors=["软件工程"]), SchoolQuery(has_email=True)], "名称 (A-Z)")
+    assert sorted(_ids(dataset, rows)) == [1, 3, 4]
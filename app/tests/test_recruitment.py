@@ -0,0 +1,36 @@
+import pandas as pd
+import pytest
+
+from core.recruitment import normalize_record, parse_recruitment, parse_recruitment_series
+
+
+@pytest.mark.parametrize("value, expected", [
+    (20, (20, 20, 20.0, "20")),
+    ("20人", (20, 20, 20.0, "20人")),
+    (" 2-4 ", (2, 4, 3.0, "2-4")),
+    ("2～4", (2, 4, 3.0, "2～4")),
+    ("5至3人", (3, 5, 4.0, "5至3人")),
+    ("若干", (0, 0, 0.0, "若干")),
+    (None, (0, 0, 0.0, "")),
+    (True, (0, 0, 0.0, "True")),
+])
+def test_parse_recruitment(value, expected):
+    fields = parse_recruitment(value)
+    assert (fields["low"], fields["high"], fields["mid"], fields["raw"]) == expected
+
+
+def test_series_parsing_matches_single_values():
+    values = [20, "20人", " 2-4 ", "2～4", "5至3人", "若干", None, ""]
+    low, high, mid, raw = parse_recruitment_series(pd.Series(values, dtype=object))
+    expected = [parse_recruitment(value) for value in values]
+    assert list(zip(low, high, mid, raw)) == [
+        (fields["low"], fields["high"], fields["mid"], fields["raw"]) for fields in expected
+    ]
+
+
+def test_normalize_record_reparses_only_when_raw_changes():
+    school = {"recruitment_count": "2-4"}
+    assert normalize_record(school) and school["recruitment"]["high"] == 4
+    assert not normalize_record(school)
+    school["recruitment_count"] = 6
+    assert normalize_record(school) and school["recruitment"]["low"] == 6
@@ -0,0 +1,31 @@
+from core.search_index import BigramIndex
+
+from records import school
+
+
+def _search(index, records, query, fields=None):
+    by_id = {s.id: s for s in records}
+    return index.search(query, lambda ids, fields: [by_id.get(school_id) for school_id in ids], fields)
+
+
+def test_copies_match_rebuild_and_leave_original_unchanged():
+    records = [school(i, f"第{i}大学", "北京市" if i % 2 else "上海市", "软件工程") for i in range(1, 41)]
+    base = BigramIndex.build(records)
+    index, current = base, list(records)
+    for i in range(41, 61):
+        index = index.copy()
+        added = school(i, f"新建{i}学院", "江苏省", "计算机")
+        index.add(added)
+        removed = current.pop(0)
+        index.remove(removed)
+        current.append(added)
+        # 副本不复制倒排表，增量层数保持在对数级别
+        assert len(index._deltas) <= 6
+
+    rebuilt = BigramIndex.build(current)
+    for query in ("大学", "学院", "北京", "江苏", "第3", "新建5", "软件"):
+        assert _search(index, current, query) == _search(rebuilt, current, query)
+    assert _search(index, current, "北京", ("name",)) == set()
+    # 原索引不受副本修改的影响
+    assert _search(base, records, "学院") == set()
+    assert len(_search(base, records, "大学")) == 40
@@ -0,0 +1,41 @@
+import pytest
+
+from core.snapshot import SnapshotFormatError, decode_snapshot, read_snapshot, snapshot_source, write_snapshot
+
+from records import school_json
+
+
+def _records():
+    legacy = school_json(2, "旧记录")
+    extra = dict(school_json(3, "额外字段"), tags=["a"])
+    current = dict(school_json(1, "北京大学"), recruitment={"low": 2, "high": 4, "mid": 3.0, "raw": "2-4"})
+    current["recruitment_count"] = "2-4"
+    current["scores"]["2024"] = {"max": 390, "min": 351}
+    return [current, legacy, extra]
+
+
+def test_round_trip_keeps_records_and_positions(tmp_path):
+    path = tmp_path / "schools.snapshot.bin"
+    records = _records()
+    write_snapshot(path, records, source=(1, 2, 3))
+    assert read_snapshot(path) == records
+    assert snapshot_source(path) == (1, 2, 3)
+
+
+def test_empty_snapshot(tmp_path):
+    path = tmp_path / "schools.snapshot.bin"
+    write_snapshot(path, [])
+    assert read_snapshot(path) == []
+    assert snapshot_source(path) is None
+
+
+def test_truncated_snapshot_is_rejected(tmp_path):
+    path = tmp_path / "schools.snapshot.bin"
+    write_snapshot(path, _records(), source=(1, 2, 3))
+    data = path.read_bytes()
+    with pytest.raises(SnapshotFormatError):
+        decode_snapshot(data[:len(data) // 2])
+    with pytest.raises(SnapshotFormatError):
+        decode_snapshot(b"schools.json")
+    path.write_bytes(data[:10])
+    assert snapshot_source(path) is None
@@ -0,0 +1,53 @@
+import numpy as np
+
+from core.columnar import SORT_KEYS, ScoreTable
+
+from records import school
+
+
+def _records():
+    # 含重复的名称和分数，检查键值相同的行按行号升序
+    return [
+        school(1, "南京大学", scores=[(370, 330)]),
+        school(2, "北京大学", scores=[(390, 350)]),
+        school(3, "安徽大学", scores=[(370, 320)]),
+        school(4, "北京大学", scores=[(360, 350)]),
+    ]
+
+
+def _build_all(table):
+    for sort_key, descending in SORT_KEYS.values():
+        table.sort_index(sort_key, descending)
+    return table
+
+
+def _assert_matches_rebuilt(table, records):
+    rebuilt = ScoreTable.from_records(records)
+    for option, (sort_key, descending) in SORT_KEYS.items():
+        assert np.array_equal(table.sort_index(sort_key, descending).order,
+                              rebuilt.sort_index(sort_key, descending).order), option
+
+
+def test_sort_indexes_follow_inserts_updates_and_deletes():
+    records = _records()
+    table = _build_all(ScoreTable.from_records(records))
+
+    added = [school(5, "北京大学", scores=[(370, 350)]), school(6, "中山大学", scores=[(400, 300)])]
+    records = records + added
+    table = table.extended(added)
+    _assert_matches_rebuilt(table, records)
+
+    records[2] = school(3, "厦门大学", scores=[(395, 355)])
+    table = _build_all(table.with_rows([2], [records[2]]))
+    _assert_matches_rebuilt(table, records)
+
+    table = table.without_ids([2, 5])
+    records = [s for s in records if s.id not in (2, 5)]
+    _assert_matches_rebuilt(table, records)
+
+
+def test_select_keeps_sorted_order():
+    table = ScoreTable.from_records(_records())
+    index = table.sort_index(("max", "2024"), True)
+    mask = np.array([True, False, True, True])
+    assert table.ids[index.select(mask)].tolist() == [1, 3, 4]
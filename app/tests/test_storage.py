@@ -0,0 +1,117 @@
+import json
+import sqlite3
+
+import pytest
+
+from core.record import School
+from core.storage import JsonStorage, SqliteStorage, migrate_json_to_sqlite, renumber_duplicate_ids
+
+from records import names, school_json
+
+
+def _write(path, records):
+    path.write_text(json.dumps(records, ensure_ascii=False), encoding="utf-8")
+
+
+def test_renumber_keeps_first_id_and_uses_next_id():
+    records = [school_json(1, "A"), school_json(2, "B"), school_json(2, "C"), school_json(1, "D")]
+    assert renumber_duplicate_ids(records, 10) == [[2, 10], [1, 11]]
+    assert [school["id"] for school in records] == [1, 2, 10, 11]
+
+
+def test_initialize_renumbers_duplicate_ids_once(tmp_path):
+    path = tmp_path / "schools.json"
+    _write(path, [school_json(1, "A"), school_json(2, "B"), school_json(2, "C")])
+    storage = JsonStorage(str(path))
+    storage.ensure_initialized()
+
+    records = JsonStorage(str(path)).load_all()
+    assert names(records) == ["A", "B", "C"]
+    assert [school["id"] for school in records] == [1, 2, 3]
+    meta = storage.read_meta()
+    assert meta["unique_ids"] and meta["renumbered_ids"] == [[2, 3]]
+    assert storage.allocate_ids(1) == 4
+
+    generation = storage.generation()
+    storage.ensure_initialized()
+    assert storage.generation() == generation
+
+
+def test_initialize_replays_journal_before_renumbering(tmp_path):
+    path = tmp_path / "schools.json"
+    _write(path, [school_json(1, "A"), school_json(1, "B")])
+    storage = JsonStorage(str(path))
+    storage.insert(school_json(storage.allocate_ids(1), "C"))
+    storage.ensure_initialized()
+    records = JsonStorage(str(path)).load_all()
+    assert [(school["id"], school["name"]) for school in records] == [(1, "A"), (3, "B"), (2, "C")]
+    assert storage.journal.entries == 0
+
+
+def test_new_store_starts_empty(tmp_path):
+    storage = JsonStorage(str(tmp_path / "data" / "schools.json"))
+    storage.ensure_initialized()
+    assert storage.load_all() == []
+    assert storage.read_meta()["unique_ids"]
+
+
+def test_migrate_to_sqlite_keeps_duplicate_id_records(tmp_path):
+    path = tmp_path / "schools.json"
+    _write(path, [school_json(1, "A"), school_json(2, "B"), school_json(2, "C")])
+    count, renumbered = migrate_json_to_sqlite(str(path), str(tmp_path / "schools.db"))
+    assert count == 3 and renumbered == [[2, 3]]
+    target = SqliteStorage(str(tmp_path / "schools.db"))
+    assert [(school["id"], school["name"]) for school in target.load_all()] == [(1, "A"), (2, "B"), (3, "C")]
+    assert target.allocate_ids(1) == 4
+
+
+def test_migrate_to_sqlite_does_not_reuse_deleted_ids(tmp_path):
+    path = tmp_path / "schools.json"
+    source = JsonStorage(str(path))
+    source.ensure_initialized()
+    source.save_all([school_json(1, "A"), school_json(2, "B"), school_json(3, "C")])
+    source.delete_many([3])
+    migrate_json_to_sqlite(str(path), str(tmp_path / "schools.db"))
+    assert SqliteStorage(str(tmp_path / "schools.db")).allocate_ids(1) == 4
+
+
+def test_backends_round_trip_records_identically(tmp_path):
+    legacy = school_json(1, "A")
+    del legacy["created_at"]
+    records = [legacy, dict(school_json(2, "B"), created_at="2024-03-01 10:00:00")]
+    json_store = JsonStorage(str(tmp_path / "schools.json"))
+    json_store.ensure_initialized()
+    json_store.save_all(records)
+    sqlite_store = SqliteStorage(str(tmp_path / "schools.db"))
+    sqlite_store.save_all(records)
+
+    def to_json(storage):
+        return [School.from_json(school).to_json() for school in storage.load_all()]
+
+    assert to_json(sqlite_store) == to_json(json_store)
+    assert "created_at" not in sqlite_store.load_all()[0]
+
+
+def test_corrupt_binary_snapshot_falls_back_to_json(tmp_path):
+    path = tmp_path / "schools.json"
+    storage = JsonStorage(str(path))
+    storage.ensure_initialized()
+    storage.save_all([school_json(1, "北京大学"), school_json(2, "复旦大学")])
+    storage.insert(school_json(3, "南京大学"))
+    # 头部和数组布局完好，只有字符串内容损坏，解码时才会出错
+    binary = (tmp_path / "schools.snapshot.bin").read_bytes()
+    name = "复旦大学".encode("utf-8")
+    assert name in binary
+    (tmp_path / "schools.snapshot.bin").write_bytes(binary.replace(name, b"\xff" * len(name)))
+
+    assert names(JsonStorage(str(path)).load_all()) == ["北京大学", "复旦大学", "南京大学"]
+    # 回退读取 JSON 后重新生成了二进制快照
+    assert "复旦大学".encode("utf-8") in (tmp_path / "schools.snapshot.bin").read_bytes()
+
+
+def test_sqlite_insert_rejects_existing_id(tmp_path):
+    target = SqliteStorage(str(tmp_path / "schools.db"))
+    target.save_all([school_json(1, "A")])
+    with pytest.raises(sqlite3.IntegrityError):
+        target.insert(school_json(1, "B"))
+    assert names(target.load_all()) == ["A"]
@@ -0,0 +1,35 @@
+from core.dataset import SchoolDataset
+from core.upsert import plan_upsert
+
+from records import school
+
+
+def _dataset():
+    existing = school(1, "北京大学", "北京市", "软件工程", scores=[(390, 350)])
+    existing.remark = None
+    return SchoolDataset([existing, school(2, "复旦大学", "上海市", "软件工程")])
+
+
+def test_plan_splits_inserts_updates_and_skips():
+    plan = plan_upsert(_dataset(), [
+        school(None, "北京大学", "北京市", "软件工程", scores=[(390, 350)]),
+        school(None, " 复旦大学", "上海市", "软件工程", scores=[(380, 340)]),
+        school(None, "南京大学", "南京市", "软件工程"),
+    ])
+    assert plan.skipped == 1
+    assert [(s.id, s.scores[0]) for s in plan.updates] == [(2, 380)]
+    assert [s.name for s in plan.inserts] == ["南京大学"]
+
+
+def test_missing_remark_equals_empty_remark():
+    new = school(None, "北京大学", "北京市", "软件工程", scores=[(390, 350)])
+    assert new.remark == ""
+    plan = plan_upsert(_dataset(), [new])
+    assert not plan and plan.skipped == 1
+
+
+def test_identical_rows_in_batch_are_skipped():
+    row = school(None, "南京大学", "南京市", "软件工程")
+    plan = plan_upsert(_dataset(), [row, row.replace(), row.replace(address="江苏省南京市")])
+    assert [s.address for s in plan.inserts] == ["南京市", "江苏省南京市"]
+    assert plan.skipped == 1
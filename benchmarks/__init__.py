@@ -0,0 +1,8 @@
+# 考研调剂系统性能测试，用法见 README
+import os
+import sys
+
+# 应用代码位于 app/ 目录下，以 `core`、`components` 包的形式导入
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
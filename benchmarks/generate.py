@@ -0,0 +1,99 @@
+# 生成与 schools.json 结构一致的合成调剂数据
+import json
+import random
+import argparse
+from datetime import datetime, timedelta
+
+YEARS = ("2024", "2023", "2022", "2021")
+
+PROVINCES = [
+    "北京市", "天津市", "上海市", "重庆市", "河北省", "山西省", "辽宁省", "吉林省",
+    "黑龙江省", "江苏省", "浙江省", "安徽省", "福建省", "江西省", "山东省", "河南省",
+    "湖北省", "湖南省", "广东省", "海南省", "四川省", "贵州省", "云南省", "陕西省",
+    "甘肃省", "青海省", "内蒙古自治区", "广西壮族自治区", "西藏自治区",
+    "宁夏回族自治区", "新疆维吾尔自治区",
+]
+
+CITY_PREFIXES = [
+    "北京", "天津", "上海", "重庆", "石家庄", "太原", "沈阳", "长春", "哈尔滨", "南京",
+    "杭州", "合肥", "福州", "南昌", "济南", "郑州", "武汉", "长沙", "广州", "海口",
+    "成都", "贵阳", "昆明", "西安", "兰州", "西宁", "呼和浩特", "南宁", "拉萨", "银川",
+    "乌鲁木齐", "苏州", "宁波", "厦门", "青岛", "大连", "深圳", "闽江", "湘潭", "桂林",
+]
+
+SCHOOL_SUFFIXES = [
+    "大学", "理工大学", "师范大学", "科技大学", "工业大学", "农业大学", "医科大学",
+    "财经大学", "交通大学", "邮电大学", "石油大学", "学院", "工程学院", "信息工程学院",
+]
+
+MAJORS = [
+    "计算机科学与技术", "软件工程", "控制工程", "电子信息", "机械工程", "材料科学与工程",
+    "化学工程与技术", "土木工程", "电气工程", "通信工程", "数学", "物理学", "生物学",
+    "环境科学与工程", "管理科学与工程", "会计", "金融", "法律（非法学）", "新闻与传播",
+    "农业工程", "食品科学与工程", "临床医学", "药学", "公共管理", "应用统计",
+]
+
+REMARKS = ["", "", "", "270-310分", "300分左右", "优先一志愿211", "需加试", "接受跨专业"]
+
+
+def generate_school(school_id, rng, created_at):
+    """生成一条学校记录：部分年份分数为0，部分招生人数为范围形式"""
+    scores = {}
+    base = rng.randint(260, 380)
+    for offset, year in enumerate(YEARS):
+        # 约三成的年份没有分数线数据，以0填充
+        if rng.random() < 0.3:
+            scores[year] = {"max": 0, "min": 0}
+        else:
+            low = max(0, base - offset * rng.randint(0, 8) + rng.randint(-10, 10))
+            scores[year] = {"max": low + rng.randint(0, 60), "min": low}
+
+    if rng.random() < 0.25:
+        low = rng.randint(1, 10)
+        recruitment_count = f"{low}-{low + rng.randint(1, 5)}"
+    else:
+        recruitment_count = rng.randint(0, 60)
+
+    domain = f"{rng.choice('abcdefghijklmnopqrstuvwxyz')}{rng.randint(1, 999)}.edu.cn"
+    return {
+        "id": school_id,
+        "name": rng.choice(CITY_PREFIXES) + rng.choice(SCHOOL_SUFFIXES),
+        "address": rng.choice(PROVINCES),
+        "major": rng.choice(MAJORS),
+        "recruitment_count": recruitment_count,
+        "scores": scores,
+        "contact": {
+            "email": f"yz@{domain}" if rng.random() < 0.8 else "",
+            "phone": f"0{rng.randint(10, 999)}-{rng.randint(1000000, 99999999)}" if rng.random() < 0.6 else ""
+        },
+        "created_at": created_at,
+        "remark": rng.choice(REMARKS)
+    }
+
+
+def generate_schools(count, seed=0):
+    """生成 count 条记录，相同 seed 生成的数据完全一致"""
+    rng = random.Random(seed)
+    start = datetime(2025, 3, 1)
+    created_at = [
+        (start + timedelta(minutes=i)).strftime('%Y-%m-%d %H:%M:%S') for i in range(min(count, 1440))
+    ]
+    return [
+        generate_school(i + 1, rng, created_at[i % len(created_at)]) for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成合成调剂数据（schools.json 格式）")
+    parser.add_argument("count", type=int, help="记录条数，如 1000/10000/100000/1000000")
+    parser.add_argument("-o", "--output", default="schools.json", help="输出文件路径")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(generate_schools(args.count, args.seed), f, ensure_ascii=False, indent=4)
+    print(f"已生成 {args.count} 条记录：{args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,430 @@
+# 运行性能测试场景，并将结果写入 JSON 文件以便跨版本比较
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime
+
+from . import APP_DIR
+from .generate import generate_schools
+
+DEFAULT_SIZES = [1000, 10000]
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# 生成 xlsx 本身很慢，超过该规模时跳过 xlsx 导入场景
+DEFAULT_XLSX_LIMIT = 100000
+
+
+class NamedBytesIO(io.BytesIO):
+    """模拟 Streamlit 上传文件对象（带文件名的字节流）"""
+
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+
+
+class NullWriter(io.RawIOBase):
+    """丢弃写入内容的二进制文件对象，导出场景只测量转换和编码"""
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        return len(data)
+
+
+class BenchContext:
+    """单个数据规模下各场景共享的数据和临时文件"""
+
+    def __init__(self, size, work_dir, xlsx_limit):
+        from core import analytics
+        from core.record import School
+
+        self.size = size
+        self.work_dir = work_dir
+        self.xlsx_limit = xlsx_limit
+        self.records = generate_schools(size)
+        self.json_path = os.path.join(work_dir, "schools.json")
+        with open(self.json_path, 'w', encoding='utf-8') as f:
+            json.dump(self.records, f, ensure_ascii=False, indent=4)
+        # 存储场景使用 JSON 结构，数据集、DataFrame 和图表场景使用内存中的 School
+        self.schools = [School.from_json(school) for school in self.records]
+        self.dataframe = analytics.records_to_dataframe(self.schools)
+        # 图表磁盘缓存写到临时目录，不影响应用数据目录
+        os.environ["TIAOJI_FIGURE_CACHE_DIR"] = os.path.join(work_dir, "figure_cache")
+        self._csv_bytes = None
+        self._xlsx_bytes = None
+
+    @property
+    def csv_bytes(self):
+        if self._csv_bytes is None:
+            self._csv_bytes = self.dataframe.to_csv(index=False).encode('utf-8')
+        return self._csv_bytes
+
+    @property
+    def xlsx_bytes(self):
+        if self._xlsx_bytes is None:
+            buffer = io.BytesIO()
+            self.dataframe.to_excel(buffer, index=False)
+            self._xlsx_bytes = buffer.getvalue()
+        return self._xlsx_bytes
+
+
+# 每个场景接收 BenchContext，返回被计时的无参函数；返回 None 表示跳过
+# JSON 后端加载：保存时已生成二进制快照，加载读取二进制快照
+def scenario_load_json(ctx):
+    from core.storage import JsonStorage
+    storage = JsonStorage(os.path.join(ctx.work_dir, "load", "schools.json"))
+    storage.save_all(ctx.records)
+    return storage.load_all
+
+
+# 对比：直接解析缩进排版的 schools.json（没有二进制快照时的加载方式）
+def scenario_load_json_text(ctx):
+    def run():
+        with open(ctx.json_path, 'r', encoding='utf-8') as f:
+            json.load(f)
+    return run
+
+
+# 内存映射快照：文件已由其他进程生成，本进程只需映射，记录按需解码
+def scenario_load_mapped(ctx):
+    from core.mapped import MappedStore
+    directory = os.path.join(ctx.work_dir, "mapped")
+    source = ("benchmark", directory)
+    MappedStore(directory, source).load(0, lambda: 0, lambda: ctx.schools)
+    # 每次使用新的 MappedStore，不复用进程内已映射的文件
+    return lambda: MappedStore(directory, source).load(0, lambda: 0, lambda: ctx.schools)
+
+
+def scenario_save_json(ctx):
+    from core.storage import JsonStorage
+    storage = JsonStorage(os.path.join(ctx.work_dir, "save", "schools.json"))
+    return lambda: storage.save_all(ctx.records)
+
+
+def scenario_load_sqlite(ctx):
+    from core.storage import SqliteStorage
+    storage = SqliteStorage(os.path.join(ctx.work_dir, "schools.db"))
+    storage.save_all(ctx.records)
+    return storage.load_all
+
+
+def _single_insert(storage, ctx):
+    school = dict(ctx.records[0])
+
+    def run():
+        school["id"] = storage.allocate_ids(1)
+        storage.insert(school)
+    return run
+
+
+def scenario_add_school_json(ctx):
+    from core.storage import JsonStorage
+    storage = JsonStorage(os.path.join(ctx.work_dir, "add", "schools.json"))
+    storage.save_all(ctx.records)
+    return _single_insert(storage, ctx)
+
+
+def scenario_add_school_sqlite(ctx):
+    from core.storage import SqliteStorage
+    storage = SqliteStorage(os.path.join(ctx.work_dir, "add", "schools.db"))
+    storage.save_all(ctx.records)
+    return _single_insert(storage, ctx)
+
+
+def scenario_json_to_dataframe(ctx):
+    from core import analytics
+    return lambda: analytics.records_to_dataframe(ctx.schools)
+
+
+def scenario_import_csv(ctx):
+    from components import utils
+    data = ctx.csv_bytes
+    return lambda: utils.import_from_file(NamedBytesIO(data, "bench.csv"))
+
+
+def scenario_import_xlsx(ctx):
+    from components import utils
+    if ctx.size > ctx.xlsx_limit:
+        return None
+    data = ctx.xlsx_bytes
+    return lambda: utils.import_from_file(NamedBytesIO(data, "bench.xlsx"))
+
+
+# 同一份 CSV 拆成 4 个文件，经进程池并行解析（进程数为 CPU 核数）
+def scenario_import_files_parallel(ctx):
+    from core import importer
+
+    header, _, body = ctx.csv_bytes.partition(b"\n")
+    lines = body.splitlines(keepends=True)
+    step = (len(lines) + 3) // 4
+    parts = [header + b"\n" + b"".join(lines[i:i + step]) for i in range(0, len(lines), step)]
+    return lambda: importer.parse_files([NamedBytesIO(part, f"bench{i}.csv") for i, part in enumerate(parts)])
+
+
+# 流式导出全部记录（按当前顺序分块写出）
+def _export(ctx, export_format):
+    from core import export
+    return lambda: export.export_records(ctx.schools, NullWriter(), export_format)
+
+
+def scenario_export_csv(ctx):
+    return _export(ctx, "csv")
+
+
+def scenario_export_xlsx(ctx):
+    if ctx.size > ctx.xlsx_limit:
+        return None
+    return _export(ctx, "xlsx")
+
+
+def scenario_export_parquet(ctx):
+    return _export(ctx, "parquet")
+
+
+def scenario_view_build(ctx):
+    from core.dataset import SchoolDataset
+
+    def run():
+        dataset = SchoolDataset(ctx.schools)
+        dataset.table
+        dataset.search_index
+    return run
+
+
+def scenario_view_filter_sort(ctx):
+    from core import columnar
+    from core.dataset import SchoolDataset
+
+    dataset = SchoolDataset(ctx.schools)
+    dataset.table
+    dataset.search_index
+
+    def run():
+        mask = dataset.search_mask("大学")
+        for sort_option in columnar.SORT_OPTIONS:
+            columnar.filter_and_sort(dataset.table, 300, sort_option, mask)
+    return run
+
+
+# 多条件组合查询（不经过结果缓存，测量编译后的掩码计算和排序）
+def scenario_view_query(ctx):
+    from core import columnar
+    from core.dataset import SchoolDataset
+    from core.query import SchoolQuery, filter_rows
+
+    dataset = SchoolDataset(ctx.schools)
+    dataset.table
+    dataset.search_index
+    query = SchoolQuery(
+        text="大学",
+        scores=[("2024", "min", 300, None), ("2023", "max", None, 400)],
+        spreads=[("2022", 0, 40)],
+        regions=["北京", "江苏", "广东"],
+        recruitment=(2, 10),
+        has_email=True,
+    )
+
+    def run():
+        rows = filter_rows(dataset, query)
+        for sort_option in columnar.SORT_OPTIONS:
+            columnar.sort_rows(dataset.table, rows, sort_option)
+    return run
+
+
+# 排序结果只取第一页（6 行）：掩码与预排好的排列求交集，扫描到凑够为止
+def scenario_view_first_page(ctx):
+    from core import columnar
+    from core.dataset import SchoolDataset
+    from core.query import QueryResult, SchoolQuery, filter_mask
+
+    dataset = SchoolDataset(ctx.schools)
+    query = SchoolQuery(scores=[("2024", "min", 300, None)], has_email=True)
+    orders = []
+    for sort_option in columnar.SORT_OPTIONS:
+        sort_key, descending = columnar.SORT_KEYS[sort_option]
+        orders.append(dataset.table.sort_index(sort_key, descending).order)
+
+    def run():
+        mask = filter_mask(dataset, query)
+        for order in orders:
+            QueryResult(mask, order).head(6)
+    return run
+
+
+# 分组统计：整表构建直方图，以及增量加入 100 条记录后的汇总
+def scenario_aggregates(ctx):
+    from core.aggregates import ScoreAggregates
+    from core.dataset import SchoolDataset
+
+    table = SchoolDataset(ctx.schools).table
+    extra = ctx.schools[:100]
+
+    def run():
+        aggregates = ScoreAggregates.from_table(table).added(extra)
+        aggregates.summary("province", "2024", "min")
+        aggregates.summary("major", "2024", "max")
+    return run
+
+
+# 图表函数以数据快照为参数；除第一次外都命中磁盘图表缓存（相当于服务重启后
+# 首次打开页面），[cold] 场景每次先清空缓存，测量构建图表本身的耗时
+def _dataset(ctx):
+    from core.dataset import SchoolDataset
+    return SchoolDataset(ctx.schools, version=0)
+
+
+def scenario_chart_score_trend(ctx):
+    from components import ui
+    dataset = _dataset(ctx)
+    school_name = ctx.schools[0].name
+    return lambda: ui.create_score_trend_chart.__wrapped__(dataset, school_name)
+
+
+def scenario_chart_comparison(ctx):
+    from components import ui
+    dataset = _dataset(ctx)
+    selected = ctx.dataframe["学校名称"].drop_duplicates().head(5).tolist()
+    return lambda: ui.create_school_comparison_chart.__wrapped__(dataset, selected, "2024")
+
+
+def scenario_chart_recruitment(ctx):
+    from components import ui
+    dataset = _dataset(ctx)
+    return lambda: ui.create_recruitment_chart.__wrapped__(dataset)
+
+
+def scenario_chart_recruitment_cold(ctx):
+    from components import ui
+    from core.figure_cache import get_figure_cache
+    dataset = _dataset(ctx)
+
+    def run():
+        get_figure_cache().clear()
+        ui.create_recruitment_chart.__wrapped__(dataset)
+    return run
+
+
+def scenario_recruitment_stats(ctx):
+    from components import ui
+    dataset = _dataset(ctx)
+    return lambda: ui._calculate_recruitment_stats.__wrapped__(dataset)
+
+
+SCENARIOS = {
+    "load_data[json]": scenario_load_json,
+    "load_data[json-text]": scenario_load_json_text,
+    "load_data[mmap]": scenario_load_mapped,
+    "save_data[json]": scenario_save_json,
+    "load_data[sqlite]": scenario_load_sqlite,
+    "add_school[json]": scenario_add_school_json,
+    "add_school[sqlite]": scenario_add_school_sqlite,
+    "json_to_dataframe": scenario_json_to_dataframe,
+    "import_from_file[csv]": scenario_import_csv,
+    "import_from_file[xlsx]": scenario_import_xlsx,
+    "import_files[parallel]": scenario_import_files_parallel,
+    "export[csv]": scenario_export_csv,
+    "export[xlsx]": scenario_export_xlsx,
+    "export[parquet]": scenario_export_parquet,
+    "view.build_indexes": scenario_view_build,
+    "view.filter_sort": scenario_view_filter_sort,
+    "view.query": scenario_view_query,
+    "view.first_page": scenario_view_first_page,
+    "analysis.aggregates": scenario_aggregates,
+    "ui.create_score_trend_chart": scenario_chart_score_trend,
+    "ui.create_school_comparison_chart": scenario_chart_comparison,
+    "ui.create_recruitment_chart": scenario_chart_recruitment,
+    "ui.create_recruitment_chart[cold]": scenario_chart_recruitment_cold,
+    "ui.recruitment_stats": scenario_recruitment_stats,
+}
+
+
+def time_call(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return {
+        "repeat": repeat,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=os.path.dirname(APP_DIR), stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _package_versions():
+    versions = {}
+    for name in ("numpy", "pandas", "openpyxl", "plotly", "streamlit"):
+        try:
+            versions[name] = __import__(name).__version__
+        except ImportError:
+            versions[name] = None
+    return versions
+
+
+def run_benchmarks(sizes, scenario_names, repeat, xlsx_limit=DEFAULT_XLSX_LIMIT, log=print):
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory(prefix="tiaoji-bench-") as work_dir:
+            log(f"== {size} 条记录")
+            ctx = BenchContext(size, work_dir, xlsx_limit)
+            for name in scenario_names:
+                func = SCENARIOS[name](ctx)
+                if func is None:
+                    log(f"   {name:<36} 跳过")
+                    continue
+                timing = time_call(func, repeat)
+                results.append({"scenario": name, "size": size, **timing})
+                log(f"   {name:<36} {timing['median'] * 1000:10.2f} ms")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="运行考研调剂系统性能测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="数据规模，如 1000 10000 100000 1000000")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS),
+                        help="只运行指定场景")
+    parser.add_argument("--repeat", type=int, default=3, help="每个场景重复次数")
+    parser.add_argument("--xlsx-limit", type=int, default=DEFAULT_XLSX_LIMIT,
+                        help="超过该规模时跳过 xlsx 导入场景")
+    parser.add_argument("-o", "--output", default=None, help="结果 JSON 文件路径")
+    args = parser.parse_args(argv)
+
+    started_at = datetime.now()
+    results = run_benchmarks(args.sizes, args.scenarios, args.repeat, args.xlsx_limit)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"bench-{started_at.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    report = {
+        "started_at": started_at.isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "packages": _package_versions(),
+        "results": results,
+    }
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {output}")
+
+
+if __name__ == "__main__":
+    main()
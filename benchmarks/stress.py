@@ -0,0 +1,165 @@
+# 多进程并发写入压力测试：验证多个进程同时写同一份数据时不会丢失更新
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import multiprocessing
+
+from .generate import generate_school, generate_schools
+
+# 压缩阈值调低，让压缩与并发写入交错发生
+DEFAULT_COMPACT_ENTRIES = 25
+
+
+def _school(rng, name):
+    from core.record import School
+
+    school = generate_school(0, rng, "2025-03-01 00:00:00")
+    school["name"] = name
+    return School.from_json(school)
+
+
+def _writer(worker, ops, data_dir, backend, compact_entries, use_mmap, barrier, results):
+    os.environ["TIAOJI_DATA_DIR"] = data_dir
+    os.environ["TIAOJI_STORAGE"] = backend
+    os.environ["TIAOJI_MMAP"] = "1" if use_mmap else ""
+    from core import schools, storage
+
+    storage.JsonStorage.COMPACT_MAX_ENTRIES = compact_entries
+    shared = schools.create_shared_dataset()
+    # expected: 学校名称 -> 预期的备注（None 表示已删除）
+    report = {"worker": worker, "expected": {}, "writes": 0, "error": None}
+
+    barrier.wait()
+    try:
+        _write_ops(worker, ops, shared, random.Random(worker), report)
+    except Exception as e:
+        # 出错时也要报告，主进程不会一直等待
+        report["error"] = f"{type(e).__name__}: {e}"
+    results.put(report)
+
+
+def _write_ops(worker, ops, shared, rng, report):
+    from core import schools
+
+    expected = report["expected"]
+    for i in range(ops):
+        alive = [name for name, remark in expected.items() if remark is not None]
+        op = rng.random()
+        if op < 0.35 or not alive:
+            school = _school(rng, f"压测{worker}-{i}")
+            # add_school 接收表单数据（JSON 结构）
+            schools.add_school(school.to_json(), shared)
+            expected[school.name] = school.remark
+        elif op < 0.55:
+            batch = [_school(rng, f"压测{worker}-{i}-{k}") for k in range(3)]
+            if not schools.add_schools(batch, shared):
+                raise AssertionError("批量添加失败")
+            expected.update((school.name, school.remark) for school in batch)
+        elif op < 0.8:
+            name = rng.choice(alive)
+            current = next(school for school in shared.snapshot().records if school.name == name)
+            updated = current.replace(remark=f"更新{worker}-{i}")
+            success, plan = schools.upsert_schools([updated], shared)
+            if not success or len(plan.updates) != 1:
+                raise AssertionError(f"更新 {name} 失败：{plan!r}")
+            expected[name] = updated.remark
+        else:
+            name = rng.choice(alive)
+            school_id = next(school.id for school in shared.snapshot().records if school.name == name)
+            if not schools.delete_school(school_id, shared):
+                raise AssertionError(f"删除 {name} 失败")
+            expected[name] = None
+        report["writes"] += 1
+
+
+def run_stress(writers, ops, backend="json", seed_size=1000, compact_entries=DEFAULT_COMPACT_ENTRIES,
+               use_mmap=False):
+    """运行压力测试，返回 (问题列表, 统计信息)"""
+    from core import storage
+
+    with tempfile.TemporaryDirectory(prefix="tiaoji-stress-") as data_dir:
+        seed = generate_schools(seed_size)
+        initial = storage._BACKENDS[backend](
+            os.path.join(data_dir, "schools.db" if backend == "sqlite" else "schools.json")
+        )
+        initial.save_all(seed)
+        initial_generation = initial.generation()
+
+        context = multiprocessing.get_context("spawn")
+        barrier = context.Barrier(writers)
+        results = context.Queue()
+        processes = [
+            context.Process(target=_writer, args=(worker, ops, data_dir, backend, compact_entries, use_mmap,
+                                                  barrier, results))
+            for worker in range(writers)
+        ]
+        started = time.perf_counter()
+        for process in processes:
+            process.start()
+        reports = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        seconds = time.perf_counter() - started
+
+        problems = [f"写入进程 {report['worker']} 出错：{report['error']}" for report in reports if report["error"]]
+        final = storage._BACKENDS[backend](initial.path).load_all()
+        by_name = {}
+        for school in final:
+            by_name.setdefault(school["name"], []).append(school)
+
+        ids = [school["id"] for school in final]
+        if len(ids) != len(set(ids)):
+            problems.append(f"id 重复：{len(ids) - len(set(ids))} 条")
+
+        missing_seed = {school["id"] for school in seed} - set(ids)
+        if missing_seed:
+            problems.append(f"初始数据丢失 {len(missing_seed)} 条")
+
+        writes = 0
+        for report in reports:
+            writes += report["writes"]
+            for name, remark in report["expected"].items():
+                found = by_name.get(name, [])
+                if remark is None and found:
+                    problems.append(f"{name} 已删除但仍然存在")
+                elif remark is not None and len(found) != 1:
+                    problems.append(f"{name} 应有 1 条，实际 {len(found)} 条")
+                elif remark is not None and found[0]["remark"] != remark:
+                    problems.append(f"{name} 的更新丢失：{found[0]['remark']!r} != {remark!r}")
+
+        generation = storage._BACKENDS[backend](initial.path).generation()
+        if generation - initial_generation != writes:
+            problems.append(f"版本号增加 {generation - initial_generation}，写入次数 {writes}")
+
+        stats = {"writes": writes, "records": len(final), "seconds": seconds}
+        return problems, stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="多进程并发写入压力测试")
+    parser.add_argument("--writers", type=int, default=8, help="并发写入进程数")
+    parser.add_argument("--ops", type=int, default=40, help="每个进程的写操作次数")
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json", help="存储后端")
+    parser.add_argument("--seed-size", type=int, default=1000, help="初始数据条数")
+    parser.add_argument("--compact-entries", type=int, default=DEFAULT_COMPACT_ENTRIES,
+                        help="JSON 后端触发日志压缩的条数")
+    parser.add_argument("--mmap", action="store_true", help="各进程共享内存映射的快照")
+    args = parser.parse_args(argv)
+
+    problems, stats = run_stress(args.writers, args.ops, args.backend, args.seed_size, args.compact_entries,
+                                 args.mmap)
+    print(f"{args.writers} 个进程共写入 {stats['writes']} 次，用时 {stats['seconds']:.2f} 秒，"
+          f"最终 {stats['records']} 条记录")
+    for problem in problems[:20]:
+        print(f"  {problem}")
+    if problems:
+        print(f"发现 {len(problems)} 个问题")
+        sys.exit(1)
+    print("没有丢失任何更新")
+
+
+if __name__ == "__main__":
+    main()